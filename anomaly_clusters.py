@@ -0,0 +1,177 @@
+import argparse
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import catalog
+
+# ───────────── Temporal anomaly-cluster engine ───────────── #
+# Finds contiguous periods of unusually high or low daily anomaly rates and
+# scores each against a local baseline: the BASELINE_DAYS just before it.
+#
+# 1. anomaly_z = standardized anomaly_rate, smoothed with a centered SMOOTH_DAYS mean.
+# 2. Runs of days with smoothed z at or beyond ±RATE_Z (same sign) are merged
+#    across gaps of up to MAX_GAP_DAYS and kept if at least MIN_DAYS long.
+# 3. For volume, fare, distance and duration: local z = (cluster mean − baseline mean) / baseline std,
+#    with composite_z as their mean.
+#
+# Everything is prefix sums and run-length arithmetic over the daily arrays, so
+# the full 2020–present history takes a few milliseconds.
+#
+#   python anomaly_clusters.py                                  # -> data/anomaly_clusters_detected.csv
+#   python anomaly_clusters.py --start 2022-01-01 --end 2022-12-31 --output clusters_2022.csv
+DAILY_INPUTS = ["data/anomaly_daily.parquet", "data/daily_summary_full.csv"]
+# Never the curated data/filtered_clusters_with_local_z.csv, which is committed with the repo;
+# visuals/vis1.py prefers this file once it exists
+OUTPUT_CSV = "data/anomaly_clusters_detected.csv"
+
+SMOOTH_DAYS = 7
+RATE_Z = 0.75
+MAX_GAP_DAYS = 2
+MIN_DAYS = 7
+BASELINE_DAYS = 28
+
+# Column in the daily table -> prefix of its local z column
+METRICS = {
+    "total_trips": "volume",
+    "avg_fare": "fare",
+    "avg_trip_distance": "distance",
+    "avg_trip_duration": "duration",
+}
+
+COLUMNS = ["cluster_start", "cluster_end", "cluster_days", "n_anomalies", "anomaly_z",
+           "fare_z", "distance_z", "duration_z", "volume_z", "composite_z"]
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+def load_daily(path=None):
+    path = path or next(p for p in DAILY_INPUTS if os.path.exists(p))
+    if path.endswith(".parquet"):
+        daily = pd.read_parquet(path)
+    else:
+        daily = pd.read_csv(path, parse_dates=["pickup_date"])
+    return daily.sort_values("pickup_date").reset_index(drop=True)
+
+
+def _prefix(x):
+    return np.concatenate([[0.0], np.cumsum(x)])
+
+
+def _window_sum(csum, lo, hi):
+    # Sum over [lo, hi) for arrays of bounds
+    return csum[hi] - csum[lo]
+
+
+def _runs(mask):
+    # (start, end) index pairs, end exclusive, of each run of True
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def _periods(mask, days):
+    # Runs merged across short gaps (in calendar days), keeping those of MIN_DAYS or more
+    starts, ends = _runs(mask)
+    if not len(starts):
+        return starts, ends
+    gaps = days[starts[1:]] - days[ends[:-1] - 1] - 1
+    group = np.concatenate([[0], np.cumsum(gaps > MAX_GAP_DAYS)])
+    first = np.flatnonzero(np.diff(np.concatenate([[-1], group])))
+    starts = starts[first]
+    ends = ends[np.concatenate([first[1:] - 1, [len(group) - 1]])]
+    keep = days[ends - 1] - days[starts] + 1 >= MIN_DAYS
+    return starts[keep], ends[keep]
+
+
+def detect_clusters(daily, rate_stats=None):
+    # daily needs pickup_date, n_anomalies, total_trips and the METRICS columns
+    dates = daily["pickup_date"].to_numpy("datetime64[D]")
+    days = dates.astype(np.int64)
+    rate = (daily["n_anomalies"] / daily["total_trips"]).to_numpy(float)
+    mean, std = (rate_stats["mean"], rate_stats["std"]) if rate_stats else (np.nanmean(rate), np.nanstd(rate, ddof=1))
+    z = (rate - mean) / std
+
+    # Centered rolling mean over days, with partial windows at the edges
+    csum, ccount = _prefix(np.nan_to_num(z)), _prefix(~np.isnan(z))
+    idx = np.arange(len(z))
+    lo = np.maximum(idx - SMOOTH_DAYS // 2, 0)
+    hi = np.minimum(idx + SMOOTH_DAYS // 2 + 1, len(z))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        smooth = _window_sum(csum, lo, hi) / _window_sum(ccount, lo, hi)
+
+    starts, ends = [], []
+    for sign in (1, -1):
+        s, e = _periods(np.nan_to_num(smooth * sign) >= RATE_Z, days)
+        starts.append(s)
+        ends.append(e)
+    starts, ends = np.concatenate(starts), np.concatenate(ends)
+    order = np.argsort(starts, kind="stable")
+    starts, ends = starts[order], ends[order]
+
+    clusters = pd.DataFrame({
+        "cluster_start": dates[starts].astype("datetime64[ns]"),
+        "cluster_end": dates[ends - 1].astype("datetime64[ns]"),
+        "cluster_days": days[ends - 1] - days[starts] + 1,
+        "n_anomalies": _window_sum(_prefix(daily["n_anomalies"].to_numpy(float)), starts, ends).astype(np.int64),
+        "anomaly_z": _window_sum(csum, starts, ends) / np.maximum(_window_sum(ccount, starts, ends), 1),
+    })
+
+    # Local baseline: the BASELINE_DAYS rows (by date) immediately before each cluster
+    base_lo = np.searchsorted(days, days[starts] - BASELINE_DAYS, "left")
+    local = []
+    for column, name in METRICS.items():
+        x = daily[column].to_numpy(float)
+        valid = ~np.isnan(x)
+        x = np.where(valid, x, 0.0)
+        s1, s2, n = _prefix(x), _prefix(x * x), _prefix(valid)
+        cluster_mean = _window_sum(s1, starts, ends) / np.maximum(_window_sum(n, starts, ends), 1)
+        bn = _window_sum(n, base_lo, starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            base_mean = _window_sum(s1, base_lo, starts) / bn
+            base_var = (_window_sum(s2, base_lo, starts) - bn * base_mean ** 2) / (bn - 1)
+            clusters[f"{name}_z"] = np.where(bn > 1, (cluster_mean - base_mean) / np.sqrt(np.maximum(base_var, 0)), np.nan)
+        local.append(clusters[f"{name}_z"].to_numpy())
+    local = np.vstack(local)
+    scored = (~np.isnan(local)).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Clusters at the very start of history have no baseline, so stay NaN
+        clusters["composite_z"] = np.where(scored > 0, np.nansum(local, axis=0) / scored, np.nan)
+    return clusters[COLUMNS]
+
+
+def run(input_path=None, output=OUTPUT_CSV, start_date=None, end_date=None):
+    source = input_path or next(p for p in DAILY_INPUTS if os.path.exists(p))
+    daily = load_daily(source)
+    start = datetime.now()
+    clusters = detect_clusters(daily)
+    elapsed = (datetime.now() - start).total_seconds()
+
+    if start_date:
+        clusters = clusters[clusters["cluster_start"] >= start_date]
+    if end_date:
+        clusters = clusters[clusters["cluster_end"] <= end_date]
+
+    tmp = output + ".tmp"
+    clusters.to_csv(tmp, index=False, date_format="%Y-%m-%d")
+    os.replace(tmp, output)
+    catalog.record(output, sources=[source], producer="anomaly_clusters", frame=clusters)
+    log(f"[DONE] {len(clusters)} clusters from {len(daily)} days in {elapsed * 1000:.1f} ms -> {output}")
+    return clusters
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", help="Daily table (default: first of %s that exists)" % ", ".join(DAILY_INPUTS))
+    parser.add_argument("--output", default=OUTPUT_CSV)
+    parser.add_argument("--start", help="Only keep clusters starting on or after this date")
+    parser.add_argument("--end", help="Only keep clusters ending on or before this date")
+    args = parser.parse_args()
+    run(args.input, args.output, args.start, args.end)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+import argparse
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import duckdb
+import numpy as np
+import pandas as pd
+from sklearn.cluster import DBSCAN
+from sklearn.neighbors import KDTree
+
+import catalog
+import trip_store
+from anomaly_clusters import OUTPUT_CSV as CLUSTERS_CSV, detect_clusters
+from update_ingest import RAW_DIR, download_parquet
+
+# ───────────── DBSCAN anomaly pipeline ───────────── #
+# Produces the trip-level anomalies behind the Anomalies tab from raw monthly
+# TLC files. Pass 1 computes per-month feature moments in DuckDB (nothing is
+# materialized in Python) and merges them into global means/stds. Pass 2 then
+# standardizes each month with those global stats and runs DBSCAN on it. Both
+# passes process months in parallel, one month per worker, so memory stays at
+# roughly one month of features per worker.
+#
+# The full run persists the core cells and reference stats; each later month
+# is scored incrementally against them by score_new_month() from update_ingest.
+#
+#   python anomaly_pipeline.py --start 2020-03 --end 2025-03 --workers 4
+ANOMALY_DIR = "data/anomalies"
+DAILY_PARQUET = "data/anomaly_daily.parquet"
+LEGACY_CSV = "data/anomalies_clustered_temporally.csv"
+CLUSTERS_PARQUET = "data/anomaly_clusters.parquet"
+RUN_JSON = os.path.join(ANOMALY_DIR, "_run.json")
+MODEL_PATH = os.path.join(ANOMALY_DIR, "_model.npz")
+
+FEATURES = ["fare_amount", "trip_distance", "trip_duration"]
+
+# In-city trips only: drop EWR/JFK/LGA (1, 132, 138) and unknown/outside-NYC zones
+AIRPORT_ZONES = (1, 132, 138)
+MAX_CITY_ZONE = 263
+
+EPS = 0.3
+MIN_SAMPLES = 50
+
+# Standardized features are snapped to a grid this fine (in units of EPS) and
+# DBSCAN runs on the distinct cells weighted by trip count: a month of trips
+# collapses to a few thousand points and cluster membership changes only for
+# trips within a cell-width of a cluster boundary
+GRID = 0.25
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+def month_range(start, end):
+    return [p.strftime("%Y-%m") for p in pd.period_range(start, end, freq="M")]
+
+
+def raw_path(month_str):
+    return os.path.join(RAW_DIR, f"yellow_tripdata_{month_str}.parquet")
+
+
+def features_sql(parquet_path, month_str):
+    airports = ", ".join(str(z) for z in AIRPORT_ZONES)
+    return f"""
+        SELECT * FROM (
+            SELECT
+                tpep_pickup_datetime AS pickup_datetime,
+                PULocationID, DOLocationID,
+                fare_amount, trip_distance,
+                date_diff('second', tpep_pickup_datetime, tpep_dropoff_datetime) / 60.0 AS trip_duration
+            FROM read_parquet('{parquet_path}')
+            WHERE tpep_pickup_datetime >= DATE '{month_str}-01'
+              AND tpep_pickup_datetime < DATE '{month_str}-01' + INTERVAL 1 MONTH
+              AND PULocationID NOT IN ({airports}) AND DOLocationID NOT IN ({airports})
+              AND PULocationID <= {MAX_CITY_ZONE} AND DOLocationID <= {MAX_CITY_ZONE}
+        )
+        WHERE fare_amount > 0 AND trip_distance > 0 AND trip_duration BETWEEN 1 AND 180
+    """
+
+
+def _connect():
+    # One thread per connection; parallelism comes from running months side by side
+    con = duckdb.connect()
+    con.execute("SET threads = 1")
+    return con
+
+
+def month_moments(month_str):
+    # (n, mean, M2) per feature for one month, computed inside DuckDB
+    path = raw_path(month_str)
+    if not os.path.exists(path):
+        path = download_parquet(month_str)
+    cols = ", ".join(f"avg({f}), var_pop({f})" for f in FEATURES)
+    con = _connect()
+    row = con.execute(f"SELECT count(*), {cols} FROM ({features_sql(path, month_str)})").fetchone()
+    con.close()
+    n = row[0]
+    return month_str, {f: (n, row[1 + 2 * i] or 0.0, (row[2 + 2 * i] or 0.0) * n) for i, f in enumerate(FEATURES)}
+
+
+def merge_moments(parts):
+    # Chan et al. parallel merge of (n, mean, M2)
+    n, mean, m2 = 0, 0.0, 0.0
+    for nb, mb, m2b in parts:
+        if nb == 0:
+            continue
+        delta = mb - mean
+        total = n + nb
+        mean += delta * nb / total
+        m2 += m2b + delta ** 2 * n * nb / total
+        n = total
+    return {"n": n, "mean": mean, "std": (m2 / (n - 1)) ** 0.5 if n > 1 else 0.0}
+
+
+def dbscan_labels(z, eps, min_samples):
+    # Labels per trip, plus the centers of the core cells (the persisted model)
+    cells = np.floor(z / (eps * GRID)).astype(np.int64)
+    uniq, inverse, counts = np.unique(cells, axis=0, return_inverse=True, return_counts=True)
+    centers = (uniq + 0.5) * (eps * GRID)
+    db = DBSCAN(eps=eps, min_samples=min_samples).fit(centers, sample_weight=counts)
+    return db.labels_[inverse.ravel()], centers[db.core_sample_indices_]
+
+
+def load_month(month_str, stats, path=None):
+    con = _connect()
+    trips = con.execute(features_sql(path or raw_path(month_str), month_str)).fetch_df()
+    con.close()
+    mean = np.array([stats[f]["mean"] for f in FEATURES])
+    std = np.array([stats[f]["std"] or 1.0 for f in FEATURES])
+    return trips, (trips[FEATURES].to_numpy(dtype=float) - mean) / std
+
+
+def write_month(month_str, trips, source):
+    # Trip-level anomalies for one month, plus that month's daily rows
+    anomalies = trips[trips["anomaly"]].drop(columns="anomaly").sort_values("pickup_datetime")
+    out_dir = os.path.join(ANOMALY_DIR, f"month={month_str}")
+    os.makedirs(out_dir, exist_ok=True)
+    tmp = os.path.join(out_dir, "part.parquet.tmp")
+    target = os.path.join(out_dir, "part.parquet")
+    anomalies.to_parquet(tmp, index=False)
+    os.replace(tmp, target)
+    catalog.record(target, sources=[source], producer="anomaly_pipeline", frame=anomalies)
+
+    trips["pickup_date"] = trips["pickup_datetime"].dt.normalize()
+    daily = trips.groupby("pickup_date").agg(
+        n_anomalies=("anomaly", "sum"),
+        avg_fare=("fare_amount", "mean"),
+        avg_trip_distance=("trip_distance", "mean"),
+        avg_trip_duration=("trip_duration", "mean"),
+        total_trips=("anomaly", "size"),
+    ).reset_index()
+    return anomalies, daily
+
+
+def score_month(month_str, stats, eps, min_samples, keep_raw):
+    trips, z = load_month(month_str, stats)
+    labels, core = dbscan_labels(z, eps, min_samples)
+    trips["anomaly"] = labels == -1
+    anomalies, daily = write_month(month_str, trips, raw_path(month_str))
+    if not keep_raw:
+        os.remove(raw_path(month_str))
+    return month_str, len(trips), len(anomalies), daily, core
+
+
+def write_daily(daily_parts):
+    daily = pd.concat(daily_parts, ignore_index=True)
+    if os.path.exists(DAILY_PARQUET):
+        # Months not in this run keep their previous counts
+        previous = pd.read_parquet(DAILY_PARQUET)
+        daily = pd.concat([previous[~previous["pickup_date"].isin(daily["pickup_date"])], daily])
+    daily = daily.sort_values("pickup_date").reset_index(drop=True)
+    tmp = DAILY_PARQUET + ".tmp"
+    daily.to_parquet(tmp, index=False)
+    os.replace(tmp, DAILY_PARQUET)
+    catalog.record(DAILY_PARQUET, sources=month_parts(), producer="anomaly_pipeline", frame=daily)
+    return daily
+
+
+def month_parts():
+    return sorted(glob.glob(os.path.join(ANOMALY_DIR, "month=*", "part.parquet")))
+
+
+def write_legacy_csv():
+    # Flat CSV read by visuals/vis1.py
+    con = duckdb.connect()
+    tmp = LEGACY_CSV + ".tmp"
+    con.execute(f"""
+        COPY (SELECT pickup_datetime, trip_distance, fare_amount, trip_duration
+              FROM read_parquet('{ANOMALY_DIR}/month=*/part.parquet') ORDER BY pickup_datetime)
+        TO '{tmp}' (HEADER, DELIMITER ',')
+    """)
+    con.close()
+    os.replace(tmp, LEGACY_CSV)
+    catalog.record(LEGACY_CSV, sources=month_parts(), producer="anomaly_pipeline", date_column="pickup_datetime")
+
+
+def append_legacy_csv(anomalies):
+    # New months land after everything already in the CSV, so append instead of rewriting
+    if not os.path.exists(LEGACY_CSV):
+        write_legacy_csv()
+        return
+    before = catalog.entry(LEGACY_CSV)
+    columns = anomalies[["pickup_datetime", "trip_distance", "fare_amount", "trip_duration"]]
+    columns.to_csv(LEGACY_CSV, mode="a", header=False, index=False)
+    # Extend the previous entry's row count and date range by the appended rows instead of parsing the CSV
+    catalog.record(LEGACY_CSV, sources=month_parts(), producer="anomaly_pipeline",
+                   frame=columns if before else None, extends=before, date_column="pickup_datetime")
+
+
+# ───────────── Temporal clusters of anomalous days ───────────── #
+# Detected by anomaly_clusters.detect_clusters against the reference rate stats
+def rate_stats(daily):
+    rate = daily["n_anomalies"] / daily["total_trips"]
+    return {"mean": float(rate.mean()), "std": float(rate.std())}
+
+
+def update_temporal_clusters(daily, stats):
+    # One vectorized pass over all history (milliseconds); with the fixed reference
+    # stats, earlier clusters come out unchanged, so there is nothing to splice
+    clusters = detect_clusters(daily, stats)
+    tmp = CLUSTERS_PARQUET + ".tmp"
+    clusters.to_parquet(tmp, index=False)
+    os.replace(tmp, CLUSTERS_PARQUET)
+    catalog.record(CLUSTERS_PARQUET, sources=[DAILY_PARQUET], producer="anomaly_pipeline", frame=clusters)
+
+    # Cluster table read by visuals/vis1.py
+    tmp = CLUSTERS_CSV + ".tmp"
+    clusters.to_csv(tmp, index=False, date_format="%Y-%m-%d")
+    os.replace(tmp, CLUSTERS_CSV)
+    catalog.record(CLUSTERS_CSV, sources=[DAILY_PARQUET], producer="anomaly_pipeline", frame=clusters)
+    return clusters
+
+
+# ───────────── Incremental scoring of one new month ───────────── #
+def load_run():
+    with open(RUN_JSON) as f:
+        return json.load(f)
+
+
+def save_run(run):
+    tmp = RUN_JSON + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(run, f, indent=2)
+    os.replace(tmp, RUN_JSON)
+
+
+def score_new_month(month_str, path=None):
+    # Score one month against the persisted model instead of reclustering all history:
+    # a trip is normal iff it lies within eps of a core cell from the reference run
+    if not os.path.exists(RUN_JSON) or not os.path.exists(MODEL_PATH):
+        log("[ANOMALY] No reference model yet — run anomaly_pipeline.py first")
+        return None
+    run = load_run()
+    core = np.load(MODEL_PATH)["core"]
+
+    trips, z = load_month(month_str, run["stats"], path)
+    near = KDTree(core).query_radius(z, r=run["eps"], count_only=True)
+    trips["anomaly"] = near == 0
+    anomalies, daily_month = write_month(month_str, trips, path or raw_path(month_str))
+
+    daily = write_daily([daily_month])
+    if month_str > max(run["months"]):
+        append_legacy_csv(anomalies)
+    else:
+        write_legacy_csv()
+    # The trip store is rebuilt by its own refresh step (jobs.py) or pipeline stage, not here
+    update_temporal_clusters(daily, run["rate_stats"])
+
+    run["months"] = sorted(set(run["months"]) | {month_str})
+    run["incremental"] = sorted(set(run.get("incremental", [])) | {month_str})
+    save_run(run)
+    log(f"[ANOMALY] {month_str}: {len(anomalies):,} anomalies of {len(trips):,} in-city trips (incremental)")
+    return len(anomalies)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--start", default="2020-03", help="First month (YYYY-MM)")
+    parser.add_argument("--end", required=True, help="Last month (YYYY-MM)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--eps", type=float, default=EPS)
+    parser.add_argument("--min-samples", type=int, default=MIN_SAMPLES)
+    parser.add_argument("--keep-raw", action="store_true", help="Keep downloaded monthly files")
+    args = parser.parse_args()
+
+    months = month_range(args.start, args.end)
+    log(f"[ANOMALY] {len(months)} months, {args.workers} workers")
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        moments = dict(pool.map(month_moments, months))
+        stats = {f: merge_moments([moments[m][f] for m in months]) for f in FEATURES}
+        log("[ANOMALY] Global stats: " + ", ".join(f"{f} {s['mean']:.2f}±{s['std']:.2f}" for f, s in stats.items()))
+
+        futures = [pool.submit(score_month, m, stats, args.eps, args.min_samples, args.keep_raw) for m in months]
+        daily_parts, cores = [], []
+        for future in futures:
+            month_str, n_trips, n_anomalies, daily, core = future.result()
+            daily_parts.append(daily)
+            cores.append(core)
+            log(f"[ANOMALY] {month_str}: {n_anomalies:,} anomalies of {n_trips:,} in-city trips")
+
+    daily = write_daily(daily_parts)
+    write_legacy_csv()
+    trip_store.build()
+
+    # Union of every month's core cells; new months are scored against it
+    np.savez_compressed(MODEL_PATH, core=np.unique(np.vstack(cores), axis=0))
+    catalog.record(MODEL_PATH, sources=month_parts(), producer="anomaly_pipeline")
+    reference = rate_stats(daily)
+    clusters = update_temporal_clusters(daily, reference)
+
+    # Parameters and stats needed to reproduce (or extend) this run
+    save_run({"months": months, "eps": args.eps, "min_samples": args.min_samples, "grid": GRID,
+              "stats": stats, "rate_stats": reference, "finished": datetime.now().isoformat(timespec="seconds")})
+    log(f"[DONE] {int(daily['n_anomalies'].sum()):,} anomalies over {len(daily)} days, {len(clusters)} temporal clusters")
+
+
+if __name__ == "__main__":
+    main()
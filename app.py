@@ -1,17 +1,34 @@
+import time
+_STARTUP_T0 = time.perf_counter()
+
 import dash
+import flask
 import os
-from dash import dcc, html, Input, Output, State, ctx
+import pandas as pd
+from dash import dcc, html, Input, Output, State, ctx, ClientsideFunction, Patch
 import dash_bootstrap_components as dbc
 from dash.dependencies import ALL
 
-# Import all 7 visuals
-from visuals.vis1 import fig as fig1
-from visuals.vis2 import fig2
-from visuals.prophet import fig3
-from visuals.prophet_live import fig7
-from visuals.bayesian import fig4
-from visuals.bayesian2 import fig5
-from visuals.bayesian_placebo import fig6
+# Figures are built lazily on first request for their subtab (see visuals/registry.py)
+from visuals.registry import FIGURES, figure_version, get_versioned_figure, log
+from visuals.downsample import parse_x_range, render_figure
+from visuals.aggregate import GRAINS, apply_view
+from visuals import zones
+from visuals.drilldown import clicked_window
+import trip_store
+from metrics import instrument
+import jobs
+import profiling
+
+# Module imports above; recorded with the startup total when TLCML_PROFILE is set
+_IMPORT_SECONDS = time.perf_counter() - _STARTUP_T0
+
+# Seconds from callback entry to response for the first render of each subtab
+first_render_seconds = {}
+
+# key -> (version, downsampled full-range figure), as sent on first fetch; a new
+# version replaces the old one, so memory stays at one rendered figure per subtab
+_rendered = {}
 
 app = dash.Dash(
     __name__,
@@ -24,6 +41,154 @@ app = dash.Dash(
 
 app.title = "NYC Taxi ML Dashboard"
 
+# Subtabs under each main tab; the first one is selected when its tab opens
+SUBTABS = {
+    'forecast-tab': [
+        ("Live Forecast (Latest Month)", 'forecast-live'),
+        ("Historic Forecast (2020-2025)", 'forecast-static')
+    ],
+    'anomaly-tab': [
+        ("2020–2025 Overview", 'anomaly-overview'),
+        ("2022 Cluster Analysis", 'anomaly-zoom')
+    ],
+    'bayes-tab': [
+        ("Feb 10 (NYS Mask Lift)", 'bayes-210'),
+        ("Mar 7 (NYCPS Mask Lift)", 'bayes-307'),
+        ("Placebo (Jan 10)", 'bayes-placebo')
+    ],
+    'zone-tab': [
+        ("Pickups by Zone & Hour", 'zone-map')
+    ],
+}
+
+# Narration shown under each subtab's figure
+NARRATIONS = {
+    'forecast-live': [
+        html.Strong("Current and Forecasted Taxi Trips: "),
+        html.Span("This dynamically updated visual plots the newest available NYC taxi trip totals (in orange), aggregated from individual trip data from NYC Open Data. In blue are predicted values obtained using Meta's Prophet machine learning package, trained on a time series back to March 2020 (ie COVID/post era), and forecasts the next month yet to be released. Historical actuals are plotted in black, and show 24 months of prior activity on a rolling basis.")
+    ],
+    'forecast-static': [
+        html.Strong("Full Visualization of Time Series and Static Q1 2025 Prediction: "),
+        html.Span("This visual shows the full time series back to March 2020, with predicted vs. actual values for the first quarter of 2025. The biggest 'defiers' of the prediction band were Valentine's Day--occurring on a Saturday in 2025--and March 29, when it reached a high of 81°F (both denoted with arrows). Historical actuals are plotted in black, with an inset of predicted Q12025 for greater detail.")
+    ],
+    'anomaly-overview': [
+        html.Strong("Anomaly detection overview (2020–2025): "),
+        html.Span("This visual plots anomalous clusters of taxi activity identified using DBSCAN clustering. Periods shaded in green or red indicate clusters of unusually high or low anomaly rates, relative to rolling baselines, and specific date ranges labeled; grey marks a cluster with no baseline before it. Also plotted are daily trip totals (purple) and citywide COVID-19 hospitalization trends (red), which help contextualize periods of elevated or suppressed activity. Also pictured in dotted vertical lines are the NY State lifting of mask mandates, and NYC lifting of public school mask mandates.")
+    ],
+    'anomaly-zoom': [
+        html.Strong("Detailed anomaly clusters (2022): "),
+        html.Span("This visual focuses on 2022 to highlight clusters of anomalous taxi activity during the post-COVID recovery period. It captures shifting ridership patterns following major reopenings, including the return of international tourism after U.S. border restrictions were lifted. Specific clusters are labeled, with contextual overlays of daily trip totals and COVID hospitalization data to help interpret deviations.")
+    ],
+    'bayes-210': [
+        html.Strong("Bayesian forecast: NYS mask mandate lifted (Feb 10, 2022): "),
+        html.Span("This model estimates the putative effect of NY State's mask mandate being lifted on February 10, 2022, using a Bayesian structural time series framework implemented with Uber's Orbit package, trained on taxi trip volume and covariates like COVID-19 hospitalizations, weather, and subway ridership. It then predicts the counterfactual trajectory had the policy not changed. A clear post-February 10 divergence between actual and predicted trips suggests a credible behavioral response—especially a sharp increase in ridership beginning about a week after the mandate was lifted.")
+    ],
+    'bayes-307': [
+        html.Strong("Bayesian forecast: NYC Public Schools mask mandate lifted (Mar 7, 2022): "),
+        html.Span("The counterfactual forecast, trained on taxi trip volumes and key covariates, shows only a mild and short-lived deviation between actual and predicted rides after the intervention. Unlike the sharper divergence seen in the Feb 10 state-level mandate model, this result suggests a more limited or localized effect. Overall, the signal implies that the school policy had minimal impact on broader taxi ridership.")
+    ],
+    'bayes-placebo': [
+        html.Strong("Bayesian placebo test (Jan 10, 2022): "),
+        html.Span("This model uses January 10, 2022—when no policy change was introduced—as a placebo to test baseline fluctuation. Although actual ridership appeared to diverge somewhat from the forecast, this was accompanied by a wide credible interval, indicating high model uncertainty rather than a meaningful shift. Unlike the Feb 10 or Mar 7 interventions, no statistically significant deviation was detected. This supports the placebo's role as a valid negative control.")
+    ],
+    'zone-map': [
+        html.Strong("Pickups by taxi zone and hour: "),
+        html.Span("Yellow cab pickups in each TLC taxi zone for the selected month or year, summed over the selected hours of the day. Counts are pre-aggregated from the trip records at ingest, so switching period or hours only swaps the per-zone totals.")
+    ],
+}
+
+NARRATION_STYLE = {
+    "margin-bottom": "4px",
+    "margin-top": "0px",
+    "fontSize": "13px",
+    "display": "none"
+}
+
+
+def render_subtab_controls():
+    # All subtab groups are rendered once; the browser toggles which one is shown
+    return [
+        html.Div(
+            [
+                html.Div(label, className='subtab-item', n_clicks=0,
+                         id={'type': 'subtab-item', 'index': value, 'tab': main_tab})
+                for label, value in items
+            ],
+            className='subtab-wrapper',
+            id={'type': 'subtab-group', 'index': main_tab},
+            style={'display': 'none'}
+        )
+        for main_tab, items in SUBTABS.items()
+    ]
+
+
+def render_visual_content():
+    return [
+        html.Div(
+            dcc.Graph(
+                id='main-graph',
+                className="unbound-plot",
+                style={"marginTop": "0px", "paddingTop": "0px"}),
+            className="graph-wrapper",
+            style={"margin-top": "0px"}
+        ),
+        html.Div(id='cluster-drilldown'),
+        *[
+            html.Div(top, id={'type': 'narration', 'index': key},
+                     className="narration-box", style=NARRATION_STYLE)
+            for key, top in NARRATIONS.items()
+        ]
+    ]
+
+
+def render_view_controls():
+    return html.Div([
+        dcc.DatePickerRange(
+            id='date-range',
+            clearable=True,
+            min_date_allowed='2020-01-01',
+            start_date_placeholder_text="Start",
+            end_date_placeholder_text="End"
+        ),
+        dcc.RadioItems(
+            id='grain',
+            options=[{'label': label, 'value': value} for value, label in GRAINS.items()],
+            value='D',
+            inline=True,
+            className='grain-select'
+        )
+    ], id='view-controls', className='view-controls')
+
+
+def _period_label(period):
+    if period == "all":
+        return "All months"
+    return period if len(period) == 4 else time.strftime("%b %Y", time.strptime(period, "%Y-%m"))
+
+
+def render_zone_controls():
+    # Shown only on the zone subtab; options come from the tile index, so no trip data is read
+    try:
+        periods, default = zones.zone_tiles.periods(), zones.default_period()
+    except OSError:
+        periods, default = [], None
+    return html.Div([
+        dcc.Store(id='zone-default-period', data=default),
+        dcc.Dropdown(
+            id='zone-period',
+            options=[{'label': _period_label(p), 'value': p} for p in periods],
+            value=default,
+            clearable=False,
+            className='zone-period'
+        ),
+        dcc.RangeSlider(
+            id='zone-hours', min=0, max=23, step=1, value=[0, 23],
+            marks={h: f"{h}:00" for h in range(0, 24, 3)},
+            className='zone-hours'
+        )
+    ], id='zone-controls', className='view-controls', style={'display': 'none'})
+
+
 def serve_layout():
     return html.Div([
         html.Div([
@@ -34,12 +199,25 @@ def serve_layout():
                 children=[
                     dcc.Tab(label='Forecasting', value='forecast-tab'),
                     dcc.Tab(label='Anomalies', value='anomaly-tab'),
-                    dcc.Tab(label='Bayesian Counterfactuals', value='bayes-tab')
+                    dcc.Tab(label='Bayesian Counterfactuals', value='bayes-tab'),
+                    dcc.Tab(label='Zones', value='zone-tab')
                 ]
             ),
-            html.Div(id='subtab-controls', className='subtab-container'),
+            html.Div(render_subtab_controls(), id='subtab-controls', className='subtab-container'),
+            render_view_controls(),
+            render_zone_controls(),
             dcc.Store(id='subtab-store'),
-            html.Div(id='visual-content', className='visual-container'),
+            html.Div(render_visual_content(), id='visual-content', className='visual-container'),
+
+            # Browser-side figure cache, checked against the versions current at page load
+            dcc.Store(id='figure-versions', data={key: figure_version(key) for key in FIGURES}),
+            dcc.Store(id='figure-cache', data={}),
+            dcc.Store(id='figure-request'),
+            dcc.Store(id='figure-payload'),
+
+            # Background refresh status, polled from jobs.read_status()
+            html.Div(id='refresh-status', className='refresh-status'),
+            dcc.Interval(id='refresh-poll', interval=60_000),
 
             # Footer buttons (centered)
             html.Div([
@@ -94,156 +272,244 @@ def toggle_modal(n, is_open):
     return not is_open
 
 
-@app.callback(
+# ───────────── Navigation (runs in the browser, see assets/clientside.js) ───────────── #
+app.clientside_callback(
+    ClientsideFunction(namespace='tabs', function_name='select_subtab'),
     Output('subtab-store', 'data'),
-    Input('main-tab', 'value')
+    Input('main-tab', 'value'),
+    Input({'type': 'subtab-item', 'index': ALL, 'tab': ALL}, 'n_clicks'),
+    State({'type': 'subtab-item', 'index': ALL, 'tab': ALL}, 'id')
 )
-def initialize_subtab_value(main_tab):
-    if main_tab == 'forecast-tab':
-        return 'forecast-live'
-    elif main_tab == 'anomaly-tab':
-        return 'anomaly-overview'
-    elif main_tab == 'bayes-tab':
-        return 'bayes-210'
-    return None
 
-@app.callback(
-    Output('visual-content', 'children'),
-    Input('main-tab', 'value'),
+app.clientside_callback(
+    ClientsideFunction(namespace='tabs', function_name='render_subtabs'),
+    Output({'type': 'subtab-group', 'index': ALL}, 'style'),
+    Output({'type': 'subtab-item', 'index': ALL, 'tab': ALL}, 'className'),
+    Output({'type': 'narration', 'index': ALL}, 'style'),
+    Input('subtab-store', 'data'),
+    State('main-tab', 'value'),
+    State({'type': 'subtab-group', 'index': ALL}, 'id'),
+    State({'type': 'subtab-item', 'index': ALL, 'tab': ALL}, 'id'),
+    State({'type': 'narration', 'index': ALL}, 'id'),
+    State({'type': 'narration', 'index': ALL}, 'style')
+)
+
+# Figures already fetched are kept in figure-cache keyed by version; the server
+# is only asked for a figure the browser has not seen at its current version.
+app.clientside_callback(
+    ClientsideFunction(namespace='tabs', function_name='show_figure'),
+    Output('main-graph', 'figure', allow_duplicate=True),
+    Output('figure-request', 'data'),
     Input('subtab-store', 'data'),
+    Input('date-range', 'start_date'),
+    Input('date-range', 'end_date'),
+    Input('grain', 'value'),
+    State('figure-cache', 'data'),
+    State('figure-versions', 'data'),
     prevent_initial_call='initial_duplicate'
 )
-def update_visual(main_tab, subtab_value):
-    def wrap_visual(fig, top_text):
-        return html.Div([
-        html.Div(
-            dcc.Graph(
-                    figure=fig,
-                    className="unbound-plot",
-                    style={"marginTop": "0px", "paddingTop": "0px"}),
-            className="graph-wrapper",
-            style={"margin-top": "0px"}
-        ),
-        html.Div(
-            top_text,
-            className="narration-box",
-            style={
-                "margin-bottom": "4px",
-                "margin-top": "0px",
-                "fontSize": "13px"
-            }
-        )
-    ])
 
-    if main_tab == 'forecast-tab':
-        if subtab_value == 'forecast-live':
-            top = [
-                html.Strong("Current and Forecasted Taxi Trips: "),
-                html.Span("This dynamically updated visual plots the newest available NYC taxi trip totals (in orange), aggregated from individual trip data from NYC Open Data. In blue are predicted values obtained using Meta's Prophet machine learning package, trained on a time series back to March 2020 (ie COVID/post era), and forecasts the next month yet to be released. Historical actuals are plotted in black, and show 24 months of prior activity on a rolling basis.")
-            ]
-            return wrap_visual(fig7, top)
+app.clientside_callback(
+    ClientsideFunction(namespace='tabs', function_name='store_figure'),
+    Output('main-graph', 'figure', allow_duplicate=True),
+    Output('figure-cache', 'data'),
+    Input('figure-payload', 'data'),
+    State('figure-cache', 'data'),
+    State('subtab-store', 'data'),
+    prevent_initial_call=True
+)
 
-        elif subtab_value == 'forecast-static':
-            top = [
-                html.Strong("Full Visualization of Time Series and Static Q1 2025 Prediction: "),
-                html.Span("This visual shows the full time series back to March 2020, with predicted vs. actual values for the first quarter of 2025. The biggest 'defiers' of the prediction band were Valentine's Day--occurring on a Saturday in 2025--and March 29, when it reached a high of 81°F (both denoted with arrows). Historical actuals are plotted in black, with an inset of predicted Q12025 for greater detail.")
-            ]
-            return wrap_visual(fig3, top)
 
-    elif main_tab == 'anomaly-tab':
-        if subtab_value == 'anomaly-overview':
-            top = [
-                html.Strong("Anomaly detection overview (2020–2025): "),
-                html.Span("This visual plots anomalous clusters of taxi activity identified using DBSCAN clustering. Periods shaded in green or red indicate clusters of unusually high or low anomaly rates, relative to rolling baselines, and specific date ranges labeled. Also plotted are daily trip totals (purple) and citywide COVID-19 hospitalization trends (red), which help contextualize periods of elevated or suppressed activity. Also pictured in dotted vertical lines are the NY State lifting of mask mandates, and NYC lifting of public school mask mandates.")
-            ]
-            return wrap_visual(fig1, top)
+# Date range / grain apply to the time series; the zone map has its own period and hour controls
+app.clientside_callback(
+    ClientsideFunction(namespace='tabs', function_name='toggle_zone_controls'),
+    Output('zone-controls', 'style'),
+    Output('view-controls', 'style'),
+    Output('zone-period', 'value'),
+    Output('zone-hours', 'value'),
+    Input('subtab-store', 'data'),
+    State('zone-default-period', 'data'),
+    State('zone-period', 'value'),
+    State('zone-hours', 'value')
+)
 
-        elif subtab_value == 'anomaly-zoom':
-            top = [
-                html.Strong("Detailed anomaly clusters (2022): "),
-                html.Span("This visual focuses on 2022 to highlight clusters of anomalous taxi activity during the post-COVID recovery period. It captures shifting ridership patterns following major reopenings, including the return of international tourism after U.S. border restrictions were lifted. Specific clusters are labeled, with contextual overlays of daily trip totals and COVID hospitalization data to help interpret deviations.")
-            ]
-            return wrap_visual(fig2, top)
 
-    elif main_tab == 'bayes-tab':
-        if subtab_value == 'bayes-210':
-            top = [
-                html.Strong("Bayesian forecast: NYS mask mandate lifted (Feb 10, 2022): "),
-                html.Span("This model estimates the putative effect of NY State's mask mandate being lifted on February 10, 2022, using a Bayesian structural time series framework implemented with Uber's Orbit package, trained on taxi trip volume and covariates like COVID-19 hospitalizations, weather, and subway ridership. It then predicts the counterfactual trajectory had the policy not changed. A clear post-February 10 divergence between actual and predicted trips suggests a credible behavioral response—especially a sharp increase in ridership beginning about a week after the mandate was lifted.")
-            ]
-            return wrap_visual(fig4, top)
+def is_default_view(view):
+    return not view or (not view.get('start') and not view.get('end') and view.get('grain', 'D') == 'D')
 
-        elif subtab_value == 'bayes-307':
-            top = [
-                html.Strong("Bayesian forecast: NYC Public Schools mask mandate lifted (Mar 7, 2022): "),
-                html.Span("The counterfactual forecast, trained on taxi trip volumes and key covariates, shows only a mild and short-lived deviation between actual and predicted rides after the intervention. Unlike the sharper divergence seen in the Feb 10 state-level mandate model, this result suggests a more limited or localized effect. Overall, the signal implies that the school policy had minimal impact on broader taxi ridership.")
-            ]
-            return wrap_visual(fig5, top)
 
-        elif subtab_value == 'bayes-placebo':
-            top = [
-                html.Strong("Bayesian placebo test (Jan 10, 2022): "),
-                html.Span("This model uses January 10, 2022—when no policy change was introduced—as a placebo to test baseline fluctuation. Although actual ridership appeared to diverge somewhat from the forecast, this was accompanied by a wide credible interval, indicating high model uncertainty rather than a meaningful shift. Unlike the Feb 10 or Mar 7 interventions, no statistically significant deviation was detected. This supports the placebo's role as a valid negative control.")
-            ]
-            return wrap_visual(fig6, top)
+def render_view(key, view, x_range=None):
+    # Custom date range / grain goes through the aggregation service before downsampling
+    version, fig = get_versioned_figure(key)
+    revision = key
+    if not is_default_view(view):
+        fig = apply_view(fig, key, version, view.get('start'), view.get('end'), view.get('grain', 'D'))
+        revision = f"{key}|{view.get('start')}|{view.get('end')}|{view.get('grain')}"
+    return version, render_figure(fig, x_range, uirevision=revision)
 
-    return html.Div("Invalid selection.")
 
 @app.callback(
-    Output('subtab-controls', 'children'),
-    Input('main-tab', 'value'),
-    Input('subtab-store', 'data')
+    Output('figure-payload', 'data'),
+    Input('figure-request', 'data'),
+    prevent_initial_call=True
 )
-def render_fake_radio_subtabs(main_tab, current_subtab):
-    def make_div(label, value):
-        selected = 'selected-tab' if current_subtab == value else ''
-        return html.Div(
-            label,
-            className=f'subtab-item {selected}',
-            n_clicks=0,
-            id={'type': 'subtab-item', 'index': value}
-        )
+def fetch_figure(request):
+    key = request['key']
+    view = request.get('view')
+    start = time.perf_counter()
+    if not is_default_view(view):
+        version, fig = render_view(key, view)
+        return {'key': key, 'version': version, 'view': True, 'figure': fig}
+
+    version, fig = get_versioned_figure(key)
+    cached = _rendered.get(key)
+    if cached is None or cached[0] != version:
+        cached = _rendered[key] = (version, render_figure(fig, uirevision=key))
+    if key not in first_render_seconds:
+        first_render_seconds[key] = time.perf_counter() - start
+        log(f"[RENDER] First render of {key} took {first_render_seconds[key]:.2f}s")
+    return {'key': key, 'version': version, 'figure': cached[1]}
 
-    if main_tab == 'forecast-tab':
-        return html.Div(
-            [
-                make_div("Live Forecast (Latest Month)", 'forecast-live'),
-                make_div("Historic Forecast (2020-2025)", 'forecast-static')
-            ],
-            className='subtab-wrapper'
-        )
-    elif main_tab == 'anomaly-tab':
-        return html.Div(
-            [
-                make_div("2020–2025 Overview", 'anomaly-overview'),
-                make_div("2022 Cluster Analysis", 'anomaly-zoom')
-            ],
-            className='subtab-wrapper'
-        )
-    elif main_tab == 'bayes-tab':
-        return html.Div(
-            [
-                make_div("Feb 10 (NYS Mask Lift)", 'bayes-210'),
-                make_div("Mar 7 (NYCPS Mask Lift)", 'bayes-307'),
-                make_div("Placebo (Jan 10)", 'bayes-placebo')
-            ],
-            className='subtab-wrapper'
-        )
-    return html.Div()
 
 @app.callback(
-    Output('subtab-store', 'data', allow_duplicate=True),
-    Input({'type': 'subtab-item', 'index': ALL}, 'n_clicks'),
-    State({'type': 'subtab-item', 'index': ALL}, 'id'),
+    Output('main-graph', 'figure', allow_duplicate=True),
+    Input('main-graph', 'relayoutData'),
+    State('subtab-store', 'data'),
+    State('date-range', 'start_date'),
+    State('date-range', 'end_date'),
+    State('grain', 'value'),
     prevent_initial_call=True
 )
-def set_selected_subtab(n_clicks_list, id_list):
-    if not any(n_clicks_list):
+def zoom_figure(relayout, key, start_date, end_date, grain):
+    # Re-render the visible x range at full detail after a zoom or pan
+    changed, x_range = parse_x_range(relayout)
+    if not changed or not key:
         raise dash.exceptions.PreventUpdate
-    triggered_idx = n_clicks_list.index(max(n_clicks_list))
-    return id_list[triggered_idx]['index']
+    view = {'start': start_date, 'end': end_date, 'grain': grain}
+    return render_view(key, view, x_range)[1]
+
+
+@app.callback(
+    Output('main-graph', 'figure', allow_duplicate=True),
+    Input('zone-period', 'value'),
+    Input('zone-hours', 'value'),
+    State('subtab-store', 'data'),
+    prevent_initial_call=True
+)
+def update_zone_map(period, hours, key):
+    # Tile lookup; only the changed values go to the browser, the figure and geometry stay there
+    if key != 'zone-map' or not period or not hours:
+        raise dash.exceptions.PreventUpdate
+    try:
+        props = zones.view_patch(period, hours)
+    except (OSError, KeyError):
+        # Tiles removed or rebuilt without this period since the page loaded
+        raise dash.exceptions.PreventUpdate
+    patched = Patch()
+    for prop, values in props.items():
+        patched['data'][0][prop] = values
+    return patched
+
+
+# ───────────── Anomaly cluster drill-down ───────────── #
+def render_drilldown(start, end, summary, rows):
+    span = f"{pd.Timestamp(start):%b %d, %Y} – {pd.Timestamp(end):%b %d, %Y}"
+    medians = ", ".join(f"{col.replace('_', ' ')} {value:,.2f}" for col, value in summary["median"].items())
+    lines = [
+        html.Strong(f"{span}: {summary['trips']:,} anomalous trips over {summary['days']} days"),
+        html.Div(f"Medians: {medians}" if medians else ""),
+    ]
+    if summary.get("top_pickup_zones"):
+        names = zones.zone_names() if zones.has_geometry() else {}
+        zones_text = ", ".join(f"{names.get(zone, zone)} ({n:,})" for zone, n in summary["top_pickup_zones"].items())
+        lines.append(html.Div(f"Top pickup zones: {zones_text}"))
+    lines.append(html.Div(
+        f"Read {summary['row_groups']} of {summary['row_groups_total']} row groups in {summary['seconds'] * 1000:.0f} ms",
+        className="drilldown-meta"))
+    if len(rows):
+        sample = rows.assign(pickup_datetime=rows["pickup_datetime"].dt.strftime("%Y-%m-%d %H:%M")).round(2)
+        lines.append(dbc.Table.from_dataframe(sample, striped=True, size="sm", className="drilldown-table"))
+    return html.Div(lines, className="narration-box drilldown-box")
+
+
+# Cleared in the browser on every subtab switch, so revisiting a tab still costs no server call
+app.clientside_callback(
+    ClientsideFunction(namespace='tabs', function_name='clear_drilldown'),
+    Output('cluster-drilldown', 'children', allow_duplicate=True),
+    Input('subtab-store', 'data'),
+    prevent_initial_call=True
+)
+
+
+@app.callback(
+    Output('cluster-drilldown', 'children'),
+    Input('main-graph', 'clickData'),
+    State('subtab-store', 'data'),
+    prevent_initial_call=True
+)
+def drill_down(click_data, key):
+    # Summary and sample of the trips behind a clicked cluster
+    if key not in ('anomaly-overview', 'anomaly-zoom'):
+        raise dash.exceptions.PreventUpdate
+    window = clicked_window(click_data)
+    if window is None:
+        raise dash.exceptions.PreventUpdate
+    try:
+        summary, rows = trip_store.drilldown(*window)
+    except FileNotFoundError:
+        return html.Div("Trip store not built yet (python trip_store.py).", className="narration-box drilldown-box")
+    return render_drilldown(*window, summary, rows)
+
+
+# ───────────── Background refresh status ───────────── #
+def describe_refresh(status):
+    steps = status.get('steps', {})
+    timings = ", ".join(f"{name} {step['seconds']:.1f}s" for name, step in steps.items())
+    if status.get('state') == 'running':
+        return f"Refreshing data: {status.get('current')}…" + (f" ({timings})" if timings else "")
+    if status.get('state') in ('done', 'failed', 'interrupted'):
+        when = time.strftime('%Y-%m-%d %H:%M', time.localtime(status.get('finished', status['started'])))
+        failed = [name for name, step in steps.items() if not step['ok']]
+        if status['state'] == 'interrupted':
+            return f"Data refresh started {when} was interrupted"
+        if failed:
+            return f"Data refresh {when} failed at {failed[0]} ({timings})"
+        return f"Data refreshed {when} ({timings})"
+    return ""
+
+
+@app.callback(
+    Output('refresh-status', 'children'),
+    Output('figure-versions', 'data'),
+    Input('refresh-poll', 'n_intervals'),
+    State('figure-versions', 'data'),
+    prevent_initial_call=True
+)
+def poll_refresh(_, versions):
+    # Newer versions make the browser drop its cached copy on the next subtab switch
+    current = {key: figure_version(key) for key in FIGURES}
+    return describe_refresh(jobs.read_status()), current if current != versions else dash.no_update
+
+
+@app.server.route("/jobs/refresh", methods=["POST"])
+def trigger_refresh():
+    # For an external cron; disabled unless TLCML_REFRESH_TOKEN is set
+    token = os.environ.get("TLCML_REFRESH_TOKEN")
+    if not token or flask.request.headers.get("Authorization") != f"Bearer {token}":
+        return flask.jsonify(error="forbidden"), 403
+    started = jobs.start_refresh()
+    return flask.jsonify(started=started, status=jobs.read_status()), 202 if started else 409
+
+
+# Latency/payload histograms and cache hit rates on /metrics
+instrument(app)
 
+_STARTUP_SECONDS = time.perf_counter() - _STARTUP_T0
+profiling.record_timing("imports", "app", _IMPORT_SECONDS)
+profiling.record_timing("startup", "app", _STARTUP_SECONDS)
+log(f"[STARTUP] App ready in {_STARTUP_SECONDS:.2f}s")
 
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 8050))
+    jobs.start_scheduler()
     app.run(host="0.0.0.0", port=port)
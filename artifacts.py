@@ -0,0 +1,153 @@
+import fcntl
+import os
+import shutil
+from contextlib import contextmanager
+
+import catalog
+
+# ───────────── Generation-numbered artifact snapshots ───────────── #
+# The forecast parquets are published together as numbered generations under
+# ARTIFACT_DIR. Writers take an advisory lock, write a complete new generation
+# directory and then atomically swap the CURRENT pointer; readers resolve paths
+# through CURRENT without locking, so they always see one consistent generation
+# and never a half-written file. Each file is also mirrored to its original
+# data/ path (atomically) for scripts that still read it directly, and recorded
+# in the data catalog under that path.
+ARTIFACT_DIR = "data/artifacts"
+CURRENT_PATH = os.path.join(ARTIFACT_DIR, "CURRENT")
+LOCK_PATH = os.path.join(ARTIFACT_DIR, ".lock")
+
+# Older generations are kept briefly for readers that resolved them just before a swap
+KEEP_GENERATIONS = 3
+
+MANAGED = [
+    "data/forecast_input.parquet",
+    "data/forecast_output.parquet",
+    "data/forecast_fitted.parquet",
+    "data/forecast_input_hourly.parquet",
+    "data/forecast_output_hourly.parquet",
+    "data/forecast_fitted_hourly.parquet",
+    "data/forecast_hourly_params.json",
+    "data/forecast_ensemble.parquet",
+    "data/forecast_ensemble_weights.json",
+]
+
+
+def generation_dir(generation):
+    return os.path.join(ARTIFACT_DIR, f"gen-{generation:06d}")
+
+
+def current_generation():
+    try:
+        with open(CURRENT_PATH) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def latest(paths=MANAGED):
+    # Lock-free: map each data/ path to its copy in the current generation
+    generation = current_generation()
+    resolved = {}
+    for path in paths:
+        candidate = os.path.join(generation_dir(generation), os.path.basename(path)) if generation else None
+        resolved[path] = candidate if candidate and os.path.exists(candidate) else path
+    return resolved
+
+
+def read_latest(path):
+    return latest([path])[path]
+
+
+def _link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _replace_from(src, dst):
+    tmp = f"{dst}.{os.getpid()}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    _link_or_copy(src, tmp)
+    os.replace(tmp, dst)
+
+
+class Publication:
+    def __init__(self, generation, directory):
+        self.generation = generation
+        self.directory = directory
+        self.written = []
+
+    def existing(self, path):
+        # The file as of the previous generation, or None
+        candidate = os.path.join(self.directory, os.path.basename(path))
+        return candidate if os.path.exists(candidate) else None
+
+    def path(self, path):
+        # Where to write the new version of a data/ path in this generation
+        target = os.path.join(self.directory, os.path.basename(path))
+        if os.path.exists(target):
+            # Carried-over files are hard links into the previous generation
+            os.remove(target)
+        self.written.append(path)
+        return target
+
+
+def _prune(keep_from):
+    for name in os.listdir(ARTIFACT_DIR):
+        if name.startswith("gen-") and int(name[4:]) < keep_from:
+            shutil.rmtree(os.path.join(ARTIFACT_DIR, name), ignore_errors=True)
+        elif name.startswith(".gen-"):
+            # Partial generation left by a crashed writer
+            shutil.rmtree(os.path.join(ARTIFACT_DIR, name), ignore_errors=True)
+
+
+@contextmanager
+def publish(producer=None, sources=None):
+    # producer/sources are the lineage recorded in the catalog for every file written
+    os.makedirs(ARTIFACT_DIR, exist_ok=True)
+    with open(LOCK_PATH, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            previous = current_generation()
+            generation = (previous or 0) + 1
+            partial = os.path.join(ARTIFACT_DIR, f".gen-{generation:06d}")
+            shutil.rmtree(partial, ignore_errors=True)
+            os.makedirs(partial)
+
+            # Start from the previous generation (or the legacy files) so
+            # untouched artifacts carry over unchanged
+            for path, source in latest().items():
+                if os.path.exists(source):
+                    _link_or_copy(source, os.path.join(partial, os.path.basename(path)))
+
+            publication = Publication(generation, partial)
+            try:
+                yield publication
+            except BaseException:
+                shutil.rmtree(partial, ignore_errors=True)
+                raise
+            if not publication.written:
+                shutil.rmtree(partial, ignore_errors=True)
+                return
+
+            for name in os.listdir(partial):
+                with open(os.path.join(partial, name), "rb") as f:
+                    os.fsync(f.fileno())
+            os.rename(partial, generation_dir(generation))
+
+            tmp = f"{CURRENT_PATH}.tmp"
+            with open(tmp, "w") as f:
+                f.write(str(generation))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, CURRENT_PATH)
+
+            for path in publication.written:
+                _replace_from(os.path.join(generation_dir(generation), os.path.basename(path)), path)
+                catalog.record(path, sources=sources, producer=producer, generation=generation)
+            _prune(generation - KEEP_GENERATIONS + 1)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,73 @@
+// Tab navigation and figure caching run in the browser. The server is only
+// asked for a figure when the browser has no copy of its current version.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    tabs: {
+        select_subtab: function(main_tab, n_clicks, ids) {
+            const triggered = window.dash_clientside.callback_context.triggered_id;
+            if (triggered && triggered.type === 'subtab-item') {
+                const i = ids.findIndex(id => id.index === triggered.index);
+                if (n_clicks[i]) {
+                    return triggered.index;
+                }
+            }
+            // Main tab changed: default to its first subtab
+            const first = ids.find(id => id.tab === main_tab);
+            return first ? first.index : null;
+        },
+
+        render_subtabs: function(subtab, main_tab, group_ids, item_ids, narration_ids, narration_styles) {
+            const groups = group_ids.map(id => id.index === main_tab ? {} : {display: 'none'});
+            const items = item_ids.map(id => 'subtab-item' + (id.index === subtab ? ' selected-tab' : ''));
+            const narrations = narration_ids.map((id, i) => Object.assign(
+                {}, narration_styles[i], {display: id.index === subtab ? 'block' : 'none'}
+            ));
+            return [groups, items, narrations];
+        },
+
+        show_figure: function(subtab, start_date, end_date, grain, cache, versions) {
+            const no_update = window.dash_clientside.no_update;
+            if (!subtab) {
+                return [no_update, no_update];
+            }
+            // Custom date ranges and grains are aggregated on the server and never cached
+            if (start_date || end_date || (grain && grain !== 'D')) {
+                const view = {start: start_date, end: end_date, grain: grain};
+                return [no_update, {key: subtab, view: view, requested: Date.now()}];
+            }
+            const cached = (cache || {})[subtab];
+            if (cached && versions && cached.version === versions[subtab]) {
+                return [cached.figure, no_update];
+            }
+            // Timestamp makes repeated requests for the same subtab distinct
+            return [no_update, {key: subtab, requested: Date.now()}];
+        },
+
+        toggle_zone_controls: function(subtab, default_period, period, hours) {
+            const no_update = window.dash_clientside.no_update;
+            const on_zones = subtab === 'zone-map';
+            const styles = [{display: on_zones ? 'flex' : 'none'}, on_zones ? {display: 'none'} : {}];
+            // The cached zone figure shows the default selection, so reset the controls to match;
+            // unchanged values are left alone so no patch is requested
+            const reset_period = on_zones && default_period && period !== default_period;
+            const reset_hours = on_zones && hours && (hours[0] !== 0 || hours[1] !== 23);
+            return styles.concat([reset_period ? default_period : no_update, reset_hours ? [0, 23] : no_update]);
+        },
+
+        clear_drilldown: function(subtab) {
+            return null;
+        },
+
+        store_figure: function(payload, cache, subtab) {
+            const no_update = window.dash_clientside.no_update;
+            if (!payload) {
+                return [no_update, no_update];
+            }
+            if (payload.view) {
+                return [payload.key === subtab ? payload.figure : no_update, no_update];
+            }
+            const updated = Object.assign({}, cache);
+            updated[payload.key] = {version: payload.version, figure: payload.figure};
+            return [payload.key === subtab ? payload.figure : no_update, updated];
+        }
+    }
+});
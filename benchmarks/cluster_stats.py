@@ -0,0 +1,69 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from visuals.cluster_stats import composite_z
+
+# Per-cluster composite z: the old clusters.apply scan against the vectorized
+# interval lookup in visuals/cluster_stats.py, on synthetic anomalous rides.
+#   python -m benchmarks.cluster_stats --rides 5000000 --clusters 60
+
+
+def apply_composite_z(clusters, anomalies):
+    # The original per-row implementation from visuals/vis2.py
+    def compute_composite_z(row, all_rides):
+        cluster_mask = (anomalies['pickup_datetime'] >= row['start_date']) & (anomalies['pickup_datetime'] <= row['end_date'])
+        cluster_rides = anomalies[cluster_mask]
+        mean_dist = all_rides['trip_distance'].mean()
+        std_dist = all_rides['trip_distance'].std()
+        mean_fare = all_rides['fare_amount'].mean()
+        std_fare = all_rides['fare_amount'].std()
+        z_dist = ((cluster_rides['trip_distance'].mean() - mean_dist) / std_dist) if std_dist > 0 else 0
+        z_fare = ((cluster_rides['fare_amount'].mean() - mean_fare) / std_fare) if std_fare > 0 else 0
+        return (z_dist + z_fare) / 2
+
+    return clusters.apply(lambda row: compute_composite_z(row, anomalies), axis=1)
+
+
+def synthetic(n_rides, n_clusters, seed=0):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2020-03-01").value
+    span = pd.Timestamp("2025-03-31").value - start
+    rides = pd.DataFrame({
+        "pickup_datetime": pd.to_datetime(start + rng.integers(0, span, n_rides)),
+        "trip_distance": rng.gamma(2, 1.5, n_rides),
+        "fare_amount": rng.gamma(3, 5, n_rides),
+    })
+    starts = pd.to_datetime(start + np.sort(rng.integers(0, span, n_clusters))).normalize()
+    clusters = pd.DataFrame({
+        "start_date": starts,
+        "end_date": starts + pd.to_timedelta(rng.integers(3, 60, n_clusters), unit="D"),
+    })
+    return clusters, rides
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rides", type=int, default=5_000_000)
+    parser.add_argument("--clusters", type=int, default=60)
+    args = parser.parse_args()
+
+    clusters, rides = synthetic(args.rides, args.clusters)
+
+    start = time.perf_counter()
+    expected = apply_composite_z(clusters, rides)
+    apply_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = composite_z(clusters, rides)
+    vector_s = time.perf_counter() - start
+
+    assert np.allclose(result, expected, equal_nan=True), "vectorized composite z differs from apply"
+    print(f"{args.rides:,} rides x {args.clusters} clusters: apply {apply_s:.2f}s, "
+          f"vectorized {vector_s:.2f}s ({apply_s / vector_s:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_anomalies
+
+# Startup time and per-worker memory: parsing the CSV datasets vs memory-mapping
+# their Arrow copies (visuals/datasets.py). Several "workers" load every dataset
+# at once; PSS shows how much of each worker's RSS is shared with the others.
+#   python -m benchmarks.columnar --workers 4 --anomaly-rows 3000000
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = """
+import json, os, sys, time
+sys.path.insert(0, {repo!r})
+start = time.perf_counter()
+from visuals import datasets
+imported = time.perf_counter()
+frames = [datasets.load(name) for name, d in datasets.DATASETS.items() if os.path.exists(d.path)]
+loaded = time.perf_counter()
+mem = {{}}
+with open("/proc/self/smaps_rollup") as f:
+    for line in f:
+        key, _, value = line.partition(":")
+        if key in ("Rss", "Pss", "Private_Clean", "Private_Dirty", "Shared_Clean"):
+            mem[key] = int(value.split()[0]) / 1024
+print(json.dumps({{"import_seconds": imported - start, "seconds": loaded - imported, "rows": sum(len(f) for f in frames), **mem}}))
+sys.stdout.flush()
+sys.stdin.read()  # hold the mappings until every worker has measured
+"""
+
+
+def run_workers(workdir, columnar, n_workers):
+    env = dict(os.environ, TLCML_COLUMNAR="1" if columnar else "0")
+    procs = [subprocess.Popen([sys.executable, "-c", WORKER.format(repo=REPO)], cwd=workdir, env=env,
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+             for _ in range(n_workers)]
+    results = [json.loads(p.stdout.readline()) for p in procs]
+    for p in procs:
+        p.communicate("")
+    return {
+        "workers": n_workers,
+        "import_seconds": float(np.mean([r["import_seconds"] for r in results])),
+        "load_seconds": float(np.mean([r["seconds"] for r in results])),
+        "rows": results[0]["rows"],
+        "rss_mb": float(np.mean([r["Rss"] for r in results])),
+        "pss_mb": float(np.mean([r["Pss"] for r in results])),
+        "private_mb": float(np.mean([r["Private_Clean"] + r["Private_Dirty"] for r in results])),
+        "shared_mb": float(np.mean([r["Shared_Clean"] for r in results])),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--anomaly-rows", type=int, default=0,
+                        help="Generate a synthetic anomalies CSV of this many rows if it is missing")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    # Work on a scratch copy of data/ so conversion never touches the repo
+    workdir = tempfile.mkdtemp(prefix="tlcml-columnar-")
+    try:
+        shutil.copytree(os.path.join(REPO, "data"), os.path.join(workdir, "data"),
+                        ignore=shutil.ignore_patterns("figures", "columnar", "raw", "anomalies", "artifacts"))
+        anomalies = os.path.join(workdir, "data", "anomalies_clustered_temporally.csv")
+        if args.anomaly_rows and not os.path.exists(anomalies):
+            synthetic_anomalies(anomalies, args.anomaly_rows)
+
+        results = {"csv": run_workers(workdir, False, args.workers)}
+        subprocess.run([sys.executable, os.path.join(REPO, "convert_data.py")], cwd=workdir, check=True,
+                       env=dict(os.environ, PYTHONPATH=REPO), stdout=subprocess.DEVNULL)
+        results["columnar"] = run_workers(workdir, True, args.workers)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for mode, r in results.items():
+        print(f"{mode:>9}: import {r['import_seconds'] * 1000:7.1f} ms  load {r['load_seconds'] * 1000:7.1f} ms  rss {r['rss_mb']:6.1f} MB  "
+              f"pss {r['pss_mb']:6.1f} MB  private {r['private_mb']:6.1f} MB  ({r['rows']:,} rows)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
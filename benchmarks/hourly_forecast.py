@@ -0,0 +1,93 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.suite import REPO, _git_commit, log, measure
+from benchmarks.synthetic import HOURLY
+
+# Fit time of the hourly Prophet model in run_forecast.py against history
+# length, cold and warm-started. The monthly refit warm-starts from the
+# previous month's parameters, so the warm case fits on a window one month
+# later than the fit it is seeded from; the refit case re-runs the same window
+# from its own parameters (a forced re-run). The hourly series is synthetic: the
+# daily totals in data/forecast_input.parquet spread over the hours of the day
+# with the pickup profile from benchmarks/synthetic.py, so it runs before any
+# hourly history has been ingested.
+#   python -m benchmarks.hourly_forecast --days 30 90 180 365 730 --output hourly.json
+MONTH = pd.Timedelta(days=30)
+
+
+def synthetic_hours(seed=0):
+    daily = pd.read_parquet(os.path.join(REPO, "data", "forecast_input.parquet"))
+    daily = daily.dropna().drop_duplicates("trip_date").sort_values("trip_date")
+    rng = np.random.default_rng(seed)
+    share = np.tile(HOURLY / HOURLY.sum(), len(daily)) * rng.lognormal(0, 0.05, 24 * len(daily))
+    return pd.DataFrame({
+        "ds": np.repeat(pd.to_datetime(daily["trip_date"]).values, 24) + np.tile(np.arange(24) * np.timedelta64(1, "h"), len(daily)),
+        "y": (np.repeat(daily["total_rides"].values, 24) * share).round(),
+    })
+
+
+def bench_history(results, hours, days, repeat):
+    import run_forecast
+    from prophet.utilities import warm_start_params
+
+    end = hours["ds"].max()
+    window = run_forecast.add_hourly_conditions(hours[hours["ds"] > end - pd.Timedelta(days=days)].copy())
+    previous = run_forecast.add_hourly_conditions(
+        hours[(hours["ds"] > end - MONTH - pd.Timedelta(days=days)) & (hours["ds"] <= end - MONTH)].copy())
+    label = f"{days}d"
+
+    r, model = measure(lambda: run_forecast.fit_hourly(window, days)[0], repeat)
+    results[f"hourly.fit_cold[{label}]"] = dict(r, rows=len(window))
+
+    init = warm_start_params(run_forecast.fit_hourly(previous, days)[0])
+    r, _ = measure(lambda: run_forecast.fit_hourly(window, days, init)[0], repeat)
+    results[f"hourly.fit_warm[{label}]"] = dict(r, rows=len(window))
+
+    r, _ = measure(lambda: run_forecast.fit_hourly(window, days, warm_start_params(model))[0], repeat)
+    results[f"hourly.refit[{label}]"] = dict(r, rows=len(window))
+
+    future = run_forecast.add_hourly_conditions(pd.DataFrame({"ds": pd.date_range(end, periods=24 * 31, freq="h")}))
+    r, _ = measure(lambda: model.predict(future), repeat)
+    results[f"hourly.predict_month[{label}]"] = dict(r, rows=len(future))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, nargs="+", default=[30, 90, 180, 365, 730],
+                        help="History lengths to fit on")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    hours = synthetic_hours(args.seed)
+    results = {}
+    for days in args.days:
+        log(f"Fitting {days} days of hourly history")
+        bench_history(results, hours, days, args.repeat)
+
+    print(f"\n{'benchmark':<36} {'rows':>8} {'median':>12} {'min':>12}")
+    for name, r in results.items():
+        print(f"{name:<36} {r['rows']:>8} {r['median'] * 1000:9.1f} ms {r['min'] * 1000:9.1f} ms")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "commit": _git_commit(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "host": {"python": platform.python_version(), "cpus": os.cpu_count()},
+                "repeat": args.repeat,
+                "results": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from app import SUBTABS
+from benchmarks.serving import SERVERS, fetch_figure_body, start_server, stop_server
+
+# Load test for the dashboard's server-side callbacks. For every tab/subtab in
+# app.SUBTABS it replays what the browser sends to /_dash-update-component:
+# the initial figure fetch, a weekly re-aggregation and a zoom. Each concurrency
+# level runs for a fixed duration; throughput, latency percentiles and server RSS
+# are written as JSON so runs can be compared across commits with --compare.
+#
+#   python -m benchmarks.loadtest --server gunicorn --concurrency 1 8 32 --output report.json
+#   python -m benchmarks.loadtest --url https://example.onrender.com --compare report.json
+PERCENTILES = (50, 90, 95, 99)
+
+
+def view_body(key):
+    body = fetch_figure_body(key)
+    body["inputs"][0]["value"]["view"] = {"start": None, "end": None, "grain": "W"}
+    return body
+
+
+def zoom_body(key, x_range):
+    return {
+        "output": "main-graph.figure",
+        "outputs": {"id": "main-graph", "property": "figure"},
+        "inputs": [{"id": "main-graph", "property": "relayoutData",
+                    "value": {"xaxis.range[0]": x_range[0], "xaxis.range[1]": x_range[1]}}],
+        "state": [
+            {"id": "subtab-store", "property": "data", "value": key},
+            {"id": "date-range", "property": "start_date", "value": None},
+            {"id": "date-range", "property": "end_date", "value": None},
+            {"id": "grain", "property": "value", "value": "D"},
+        ],
+        "changedPropIds": ["main-graph.relayoutData"],
+    }
+
+
+def resolve_outputs(base_url, scenarios):
+    # allow_duplicate outputs are registered as "main-graph.figure@<hash>"; look the zoom one up
+    deps = requests.get(base_url + "/_dash-dependencies", timeout=30).json()
+    zoom_output = next(d["output"] for d in deps
+                       if any(i["id"] == "main-graph" and i["property"] == "relayoutData" for i in d["inputs"]))
+    for scenario in scenarios:
+        if scenario["name"].startswith("zoom:"):
+            scenario["body"]["output"] = zoom_output
+            scenario["body"]["outputs"]["property"] = zoom_output.split(".", 1)[1]
+
+
+def build_scenarios(keys, zoom_range):
+    scenarios = []
+    for main_tab, items in SUBTABS.items():
+        for _, key in items:
+            if key not in keys:
+                continue
+            scenarios.append({"name": f"fetch:{key}", "tab": main_tab, "body": fetch_figure_body(key)})
+            scenarios.append({"name": f"weekly:{key}", "tab": main_tab, "body": view_body(key)})
+            scenarios.append({"name": f"zoom:{key}", "tab": main_tab, "body": zoom_body(key, zoom_range)})
+    return scenarios
+
+
+def _tree_rss_bytes(pid):
+    # RSS of a process and all its descendants (gunicorn master + workers)
+    total = 0
+    pending = [pid]
+    while pending:
+        p = pending.pop()
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+            for task in os.listdir(f"/proc/{p}/task"):
+                with open(f"/proc/{p}/task/{task}/children") as f:
+                    pending += [int(c) for c in f.read().split()]
+        except (OSError, ValueError):
+            continue
+    return total
+
+
+def _scraped_rss_bytes(base_url):
+    # Remote servers: fall back to the worker that answers /metrics
+    try:
+        text = requests.get(base_url + "/metrics", timeout=5).text
+    except requests.RequestException:
+        return None
+    for line in text.splitlines():
+        if line.startswith("process_resident_memory_bytes"):
+            return int(float(line.split()[-1]))
+    return None
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, pid, base_url, interval=0.5):
+        super().__init__(daemon=True)
+        self.pid, self.base_url, self.interval = pid, base_url, interval
+        self.samples = []
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            rss = _tree_rss_bytes(self.pid) if self.pid else _scraped_rss_bytes(self.base_url)
+            if rss:
+                self.samples.append(rss)
+            self._done.wait(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        if not self.samples:
+            return {}
+        return {"rss_mean_mb": float(np.mean(self.samples)) / 2**20, "rss_peak_mb": max(self.samples) / 2**20}
+
+
+def _summary(latencies, errors, nbytes, elapsed):
+    latencies = np.array(latencies) * 1000
+    summary = {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "mean_bytes": float(np.mean(nbytes)) if nbytes else 0.0,
+    }
+    for p in PERCENTILES:
+        summary[f"p{p}_ms"] = float(np.percentile(latencies, p)) if len(latencies) else None
+    return summary
+
+
+def run_level(base_url, scenarios, concurrency, duration):
+    url = base_url + "/_dash-update-component"
+    local = threading.local()
+    lock = threading.Lock()
+    results = {s["name"]: ([], [0], []) for s in scenarios}
+    deadline = time.perf_counter() + duration
+
+    def client(worker):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        i = worker
+        while time.perf_counter() < deadline:
+            scenario = scenarios[i % len(scenarios)]
+            i += concurrency
+            start = time.perf_counter()
+            try:
+                resp = local.session.post(url, json=scenario["body"], timeout=120)
+                ok, size = resp.status_code in (200, 204), len(resp.content)
+            except requests.RequestException:
+                ok, size = False, 0
+            elapsed = time.perf_counter() - start
+            latencies, errors, nbytes = results[scenario["name"]]
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                    nbytes.append(size)
+                else:
+                    errors[0] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client, range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    per_scenario = {name: _summary(l, e[0], b, elapsed) for name, (l, e, b) in results.items()}
+    all_latencies = [x for l, _, _ in results.values() for x in l]
+    all_bytes = [x for _, _, b in results.values() for x in b]
+    total_errors = sum(e[0] for _, e, _ in results.values())
+    return {"overall": _summary(all_latencies, total_errors, all_bytes, elapsed), "scenarios": per_scenario}
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    print(f"\nvs baseline {baseline.get('commit')}:")
+    for level, result in report["levels"].items():
+        base = baseline.get("levels", {}).get(level)
+        if not base:
+            continue
+        new, old = result["overall"], base["overall"]
+        print(f"  c={level:>3}: throughput {new['throughput_rps'] / old['throughput_rps'] - 1:+.1%}  "
+              f"p95 {new['p95_ms'] / old['p95_ms'] - 1:+.1%}  p99 {new['p99_ms'] / old['p99_ms'] - 1:+.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--server", choices=list(SERVERS), default="gunicorn", help="Server to start locally")
+    parser.add_argument("--url", help="Test an already-running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8070)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per concurrency level")
+    all_keys = [key for items in SUBTABS.values() for _, key in items]
+    parser.add_argument("--keys", nargs="+", default=all_keys, choices=all_keys)
+    parser.add_argument("--zoom", nargs=2, default=["2024-01-01", "2024-04-01"], metavar=("START", "END"),
+                        help="x range sent by the zoom scenarios")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    parser.add_argument("--compare", help="Baseline JSON report to diff against")
+    args = parser.parse_args()
+
+    proc = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        proc, base_url = start_server(args.server, args.port)
+
+    try:
+        scenarios = build_scenarios(args.keys, args.zoom)
+        resolve_outputs(base_url, scenarios)
+
+        # Warm every figure and view once so levels measure steady-state serving
+        for scenario in scenarios:
+            requests.post(base_url + "/_dash-update-component", json=scenario["body"], timeout=300)
+
+        report = {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "server": args.url or args.server,
+            "host": {"python": platform.python_version(), "cpus": os.cpu_count()},
+            "duration_s": args.duration,
+            "levels": {},
+        }
+        for concurrency in args.concurrency:
+            sampler = RssSampler(proc.pid if proc else None, base_url)
+            sampler.start()
+            result = run_level(base_url, scenarios, concurrency, args.duration)
+            result["overall"].update(sampler.stop())
+            report["levels"][str(concurrency)] = result
+            o = result["overall"]
+            print(f"c={concurrency:>3}: {o['throughput_rps']:8.1f} req/s  p50 {o['p50_ms']:7.1f} ms  "
+                  f"p95 {o['p95_ms']:7.1f} ms  p99 {o['p99_ms']:7.1f} ms  "
+                  f"errors {o['errors']}  rss peak {o.get('rss_peak_mb', float('nan')):.0f} MB")
+    finally:
+        if proc:
+            stop_server(proc)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
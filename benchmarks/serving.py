@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from visuals.registry import FIGURES
+
+# Compare the Flask dev server against the preloaded multi-worker gunicorn setup.
+# Run from the repo root: python -m benchmarks.serving --concurrency 8 --requests 400
+SERVERS = {
+    "dev": [sys.executable, "app.py"],
+    "gunicorn": [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:server"],
+}
+
+
+def start_server(mode, port, timeout=300):
+    env = dict(os.environ, PORT=str(port))
+    proc = subprocess.Popen(SERVERS[mode], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{mode} server exited with code {proc.returncode}")
+        try:
+            if requests.get(base_url + "/", timeout=2).status_code == 200:
+                return proc, base_url
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError(f"{mode} server did not come up within {timeout}s")
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def fetch_figure_body(key):
+    # Same payload the browser sends when it has no cached copy of a figure
+    return {
+        "output": "figure-payload.data",
+        "outputs": {"id": "figure-payload", "property": "data"},
+        "inputs": [{"id": "figure-request", "property": "data", "value": {"key": key, "requested": 0}}],
+        "changedPropIds": ["figure-request.data"],
+        "state": [],
+    }
+
+
+def run_load(base_url, bodies, concurrency, n_requests):
+    url = base_url + "/_dash-update-component"
+    local = threading.local()
+
+    def one(i):
+        # One keep-alive session per client thread
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        resp = local.session.post(url, json=bodies[i % len(bodies)], timeout=300)
+        return time.perf_counter() - start, resp.status_code == 200, len(resp.content)
+
+    # Warm every figure once so the run measures steady-state serving
+    for i in range(len(bodies)):
+        one(i)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(n_requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array([r[0] for r in results])
+    return {
+        "requests": n_requests,
+        "concurrency": concurrency,
+        "errors": sum(not r[1] for r in results),
+        "requests_per_sec": n_requests / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000),
+        "mean_bytes": float(np.mean([r[2] for r in results])),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modes", nargs="+", default=list(SERVERS), choices=list(SERVERS))
+    parser.add_argument("--keys", nargs="+", default=list(FIGURES), choices=list(FIGURES))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--port", type=int, default=8060)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    bodies = [fetch_figure_body(key) for key in args.keys]
+    results = {}
+    for mode in args.modes:
+        proc, base_url = start_server(mode, args.port)
+        try:
+            results[mode] = run_load(base_url, bodies, args.concurrency, args.requests)
+        finally:
+            stop_server(proc)
+        r = results[mode]
+        print(f"{mode:>9}: {r['requests_per_sec']:8.1f} req/s  p50 {r['p50_ms']:7.1f} ms  "
+              f"p95 {r['p95_ms']:7.1f} ms  errors {r['errors']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
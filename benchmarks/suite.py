@@ -0,0 +1,236 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_month, synthetic_anomalies
+
+# Offline benchmark suite for the data path: monthly ingest aggregation,
+# append_and_save, the Prophet fit/predict from run_forecast.py, every figure
+# module's build and the fetch / weekly-view / zoom callbacks. It runs against
+# a scratch copy of data/ with synthetic TLC months from benchmarks/synthetic.py,
+# so nothing in the repo is touched and no network is needed. Results are
+# written as JSON and can be diffed against an older run with --compare.
+#   python -m benchmarks.suite --rows 3000000 20000000 --output bench.json
+#   python -m benchmarks.suite --only figures callbacks --compare bench.json
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GROUPS = ["ingest", "append", "forecast", "figures", "callbacks"]
+
+
+def log(msg):
+    print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {msg}", flush=True)
+
+
+def measure(fn, repeat):
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return {"seconds": times, "median": statistics.median(times), "min": min(times)}, result
+
+
+def _label(rows):
+    return f"{rows / 1e6:g}M"
+
+
+# ───────────── Benchmarks, one function per group ───────────── #
+def bench_ingest(results, args, month):
+    import update_ingest
+
+    for rows in args.rows:
+        path = os.path.join("data", "raw", f"yellow_tripdata_{month}.parquet")
+        start = time.perf_counter()
+        generate_month(month, rows, path, seed=args.seed)
+        log(f"Generated {rows:,} synthetic trips in {time.perf_counter() - start:.1f}s")
+
+        def aggregate():
+            # The scan update_ingest.main runs: hourly counts, daily totals summed from them
+            df_hours = update_ingest.summarize_month_hourly(path, month)
+            return df_hours, update_ingest.daily_from_hourly(df_hours)
+
+        r, (df_hours, df) = measure(aggregate, args.repeat)
+        # Stray out-of-month pickups must be filtered out
+        r.update(rows=rows, days=len(df), hours=len(df_hours), kept=int(df["total_rides"].sum()))
+        results[f"ingest.aggregate[{_label(rows)}]"] = r
+        os.remove(path)
+        yield df_hours, df
+
+
+def bench_append(results, args, df_hours, df_month):
+    import update_ingest
+
+    r, _ = measure(lambda: update_ingest.append_and_save(df_month, df_hours=df_hours), args.repeat)
+    results["append.append_and_save"] = r
+    r, _ = measure(update_ingest.get_latest_month_from_parquet, args.repeat)
+    results["append.latest_month"] = r
+
+
+def bench_forecast(results, args):
+    import pandas as pd
+    import run_forecast
+
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    df = run_forecast.load_training(run_forecast.INPUT_PARQUET)
+    forecast_start, forecast_end = run_forecast.get_next_forecast_window(df.copy())
+
+    def fit():
+        model = run_forecast.make_model()
+        model.fit(df[["ds", "y"]])
+        return model
+
+    r, model = measure(fit, args.repeat)
+    results["forecast.fit"] = dict(r, rows=len(df))
+    future = pd.DataFrame({"ds": pd.date_range(forecast_start, forecast_end, freq="D")})
+    results["forecast.predict_month"], _ = measure(lambda: model.predict(future), args.repeat)
+    results["forecast.predict_fitted"], _ = measure(lambda: model.predict(df[["ds"]]), args.repeat)
+
+
+def bench_figures(results, args):
+    from visuals import datasets, registry
+
+    for key, (module_name, attr) in registry.FIGURES.items():
+        def build():
+            # Cold build: fresh module import and empty dataset cache
+            datasets.clear()
+            sys.modules.pop(module_name, None)
+            return registry._build(module_name, attr)
+
+        try:
+            r, fig_json = measure(build, args.repeat)
+            results[f"figures.{key}"] = dict(r, bytes=len(fig_json))
+        except Exception as e:
+            results[f"figures.{key}"] = {"error": str(e)}
+            log(f"[WARN] figures.{key}: {e}")
+
+
+def bench_callbacks(results, args):
+    import app
+    from visuals import aggregate
+
+    relayout = {"xaxis.range[0]": args.zoom[0], "xaxis.range[1]": args.zoom[1]}
+    for key in app.FIGURES:
+        try:
+            app.get_versioned_figure(key)
+        except Exception as e:
+            log(f"[WARN] callbacks.{key}: {e}")
+            continue
+
+        def fetch():
+            app._rendered.clear()
+            return app.fetch_figure({"key": key})
+
+        def weekly():
+            aggregate._aggregate.cache_clear()
+            return app.fetch_figure({"key": key, "view": {"grain": "W"}})
+
+        for name, fn in [("fetch", fetch), ("weekly", weekly),
+                         ("zoom", lambda: app.zoom_figure(relayout, key, None, None, "D"))]:
+            r, payload = measure(fn, args.repeat)
+            results[f"callbacks.{key}.{name}"] = dict(r, bytes=len(json.dumps(payload, default=str)))
+
+
+# ───────────── Runner ───────────── #
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    print(f"\nvs baseline {baseline.get('commit')}:")
+    for name, r in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or "median" not in base or "median" not in r:
+            continue
+        print(f"  {name:<44} {r['median'] * 1000:10.1f} ms  {r['median'] / base['median'] - 1:+7.1%}")
+
+
+def run(args):
+    results = {}
+    groups = args.only or GROUPS
+    if "ingest" in groups or "append" in groups:
+        import update_ingest
+        month = update_ingest.get_latest_month_from_parquet()
+        df_hours = df_month = None
+        for df_hours, df_month in bench_ingest(results, args, month):
+            pass
+        if "append" in groups:
+            bench_append(results, args, df_hours, df_month)
+    if "forecast" in groups:
+        bench_forecast(results, args)
+    if "figures" in groups:
+        bench_figures(results, args)
+    if "callbacks" in groups:
+        bench_callbacks(results, args)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[3_000_000],
+                        help="Synthetic month sizes for the ingest benchmark")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--anomaly-rows", type=int, default=500_000,
+                        help="Rows of synthetic anomalies to use where the anomaly CSVs are missing (0 to skip)")
+    parser.add_argument("--only", nargs="+", choices=GROUPS)
+    parser.add_argument("--zoom", nargs=2, default=["2024-01-01", "2024-04-01"], metavar=("START", "END"),
+                        help="x range sent by the zoom callback")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    parser.add_argument("--compare", help="Baseline JSON report to diff against")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = os.path.abspath(args.compare) if args.compare else None
+
+    # Scratch copy of data/ without generated state, so every run starts the same way
+    workdir = tempfile.mkdtemp(prefix="tlcml-bench-")
+    cwd = os.getcwd()
+    try:
+        shutil.copytree(os.path.join(REPO, "data"), os.path.join(workdir, "data"),
+                        ignore=shutil.ignore_patterns("figures", "columnar", "raw", "anomalies", "artifacts",
+                                                      "catalog.json", "pipeline_state.json", ".*.lock"))
+        os.chdir(workdir)
+        # The DBSCAN outputs aren't checked in; stand-ins let the anomaly figures be measured
+        for name, start, end in [("anomalies_clustered_temporally.csv", "2020-03-01", "2025-03-31"),
+                                 ("anomalies_clustered_2022.csv", "2022-01-01", "2022-12-31")]:
+            if args.anomaly_rows and not os.path.exists(os.path.join("data", name)):
+                synthetic_anomalies(os.path.join("data", name), args.anomaly_rows, args.seed, start, end)
+        results = run(args)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {"python": platform.python_version(), "cpus": os.cpu_count()},
+        "rows": args.rows,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    print(f"\n{'benchmark':<44} {'median':>12} {'min':>12}")
+    for name, r in results.items():
+        if "median" in r:
+            print(f"{name:<44} {r['median'] * 1000:9.1f} ms {r['min'] * 1000:9.1f} ms")
+        else:
+            print(f"{name:<44} {'error':>12}  {r['error']}")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+    if baseline:
+        with open(baseline) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
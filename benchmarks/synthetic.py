@@ -0,0 +1,192 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Synthetic yellow-taxi months in the TLC trip-record schema, for running the
+# ingest and anomaly code offline at realistic sizes (a real month is 3–4M
+# trips; 20M stress-tests memory). Pickups follow the hour-of-day and weekday
+# shape of the real data; distances are lognormal with a fixed-fare airport
+# mode, durations follow an hour-dependent speed, and fares follow the meter.
+# Like the real files, a small share of rows has pickups outside the month
+# (including years like 2002 and 2009), zero distances, refunds and nulls.
+#   python -m benchmarks.synthetic --month 2024-03 --rows 3000000 --output data/raw/yellow_tripdata_2024-03.parquet
+SCHEMA = pa.schema([
+    ("VendorID", pa.int32()),
+    ("tpep_pickup_datetime", pa.timestamp("us")),
+    ("tpep_dropoff_datetime", pa.timestamp("us")),
+    ("passenger_count", pa.int64()),
+    ("trip_distance", pa.float64()),
+    ("RatecodeID", pa.int64()),
+    ("store_and_fwd_flag", pa.string()),
+    ("PULocationID", pa.int32()),
+    ("DOLocationID", pa.int32()),
+    ("payment_type", pa.int64()),
+    ("fare_amount", pa.float64()),
+    ("extra", pa.float64()),
+    ("mta_tax", pa.float64()),
+    ("tip_amount", pa.float64()),
+    ("tolls_amount", pa.float64()),
+    ("improvement_surcharge", pa.float64()),
+    ("total_amount", pa.float64()),
+    ("congestion_surcharge", pa.float64()),
+    ("Airport_fee", pa.float64()),
+])
+
+# Share of a day's pickups starting in each hour, and relative volume Mon–Sun
+HOURLY = np.array([2.9, 2.0, 1.4, 0.9, 0.6, 0.7, 1.5, 2.9, 3.9, 4.2, 4.4, 4.7,
+                   5.0, 5.1, 5.6, 5.7, 5.6, 6.2, 6.9, 6.4, 5.7, 5.4, 5.1, 4.3])
+WEEKDAY = np.array([0.92, 1.0, 1.05, 1.08, 1.08, 1.0, 0.85])
+
+# Typical speed (mph) by hour: free-flowing at night, slow midday
+SPEED = np.array([17, 18, 19, 20, 20, 18, 15, 12, 10, 10, 10, 10,
+                  10, 10, 9.5, 9.5, 9.5, 9.5, 10, 11, 13, 14, 15, 16], dtype=float)
+
+# Busiest Manhattan pickup zones, weighted Zipf-like; then airports and unknown zones
+BUSY_ZONES = [237, 161, 236, 162, 230, 186, 142, 170, 163, 48, 68, 234, 79, 239, 107,
+              140, 141, 249, 263, 262, 164, 113, 100, 246, 90, 229, 233, 43, 50, 151]
+JFK, LGA = 132, 138
+UNKNOWN_ZONES = [264, 265]
+
+# Real files contain a few pickups far outside their month
+STRAY_DATES = ["2002-12-31 23:10", "2008-12-31 22:00", "2009-01-01 00:15"]
+
+
+def _zone_weights():
+    weights = np.full(266, 0.02)
+    weights[0] = 0.0
+    weights[BUSY_ZONES] = 1.0 / np.arange(1, len(BUSY_ZONES) + 1) ** 0.6
+    weights[JFK], weights[LGA] = 0.4, 0.3
+    weights[UNKNOWN_ZONES] = 0.25
+    return weights / weights.sum()
+
+
+def _pickups(rng, month_start, n, stray_fraction):
+    days = pd.date_range(month_start, month_start + pd.offsets.MonthEnd(0), freq="D")
+    day_weights = WEEKDAY[days.dayofweek]
+    day = rng.choice(len(days), n, p=day_weights / day_weights.sum())
+    hour = rng.choice(24, n, p=HOURLY / HOURLY.sum())
+    offset_us = (day * 86_400 + hour * 3_600 + rng.integers(0, 3_600, n)) * 1_000_000
+    pickup = month_start.value // 1_000 + offset_us
+
+    # Stray rows: half an hour either side of the month, or one of the odd old dates
+    stray = np.flatnonzero(rng.random(n) < stray_fraction)
+    edges = np.array([(month_start - pd.Timedelta(minutes=30)).value,
+                      (month_start + pd.offsets.MonthBegin(1) + pd.Timedelta(minutes=30)).value,
+                      *[pd.Timestamp(d).value for d in STRAY_DATES]]) // 1_000
+    pickup[stray] = edges[rng.integers(0, len(edges), len(stray))]
+    return pickup, hour
+
+
+def generate_chunk(rng, month_start, n, stray_fraction=0.0005):
+    pickup, hour = _pickups(rng, month_start, n, stray_fraction)
+    zones = _zone_weights()
+    pu = rng.choice(len(zones), n, p=zones).astype(np.int32)
+    do = rng.choice(len(zones), n, p=zones).astype(np.int32)
+    airport = np.isin(pu, (JFK, LGA)) | np.isin(do, (JFK, LGA))
+
+    distance = rng.lognormal(np.log(1.8), 0.75, n)
+    distance[airport] = np.abs(rng.normal(np.where(np.isin(pu[airport], JFK) | np.isin(do[airport], JFK), 17.5, 9.5), 2.5))
+    distance[rng.random(n) < 0.015] = 0.0
+    distance = distance.round(2)
+
+    speed = SPEED[hour] * rng.lognormal(0, 0.25, n)
+    minutes = distance / speed * 60 + rng.exponential(2.0, n)
+    dropoff = pickup + (minutes * 60_000_000).astype(np.int64)
+
+    # Meter: $3 flag drop, $0.70 per 1/5 mile moving or per minute stopped; JFK trips are flat rate
+    fare = 3.0 + 3.5 * distance + 0.35 * minutes + rng.normal(0, 0.8, n)
+    jfk_flat = (pu == JFK) | (do == JFK)
+    fare[jfk_flat] = 70.0
+    fare = np.maximum(fare, 3.0).round(2)
+    ratecode = np.where(jfk_flat, 2, 1).astype(np.int64)
+
+    payment = rng.choice([1, 2, 3, 4], n, p=[0.76, 0.2, 0.02, 0.02]).astype(np.int64)
+    tip = np.where(payment == 1, (fare * rng.normal(0.2, 0.06, n)).clip(0), 0.0).round(2)
+    extra = np.where((hour >= 20) | (hour < 6), 1.0, 0.0) + np.where((hour >= 16) & (hour < 20), 2.5, 0.0)
+    tolls = np.where(airport & (rng.random(n) < 0.4), 6.94, 0.0)
+    airport_fee = np.where(np.isin(pu, (JFK, LGA)), 1.75, 0.0)
+    congestion = np.where(np.isin(pu, BUSY_ZONES) | np.isin(do, BUSY_ZONES), 2.5, 0.0)
+
+    # Refunds: every amount negated, as in the published files
+    refund = rng.random(n) < 0.01
+    sign = np.where(refund, -1.0, 1.0)
+    payment[refund] = 4
+    total = fare + extra + 0.5 + tip + tolls + 1.0 + congestion + airport_fee
+
+    # Street-hail app trips arrive without passenger count, rate code or flag
+    missing = rng.random(n) < 0.03
+    passengers = rng.choice(np.arange(1, 7), n, p=[0.72, 0.15, 0.04, 0.02, 0.04, 0.03]).astype(np.int64)
+
+    return pa.table({
+        "VendorID": rng.choice([1, 2], n, p=[0.25, 0.75]).astype(np.int32),
+        "tpep_pickup_datetime": pa.array(pickup, pa.timestamp("us")),
+        "tpep_dropoff_datetime": pa.array(dropoff, pa.timestamp("us")),
+        "passenger_count": pa.array(passengers, mask=missing),
+        "trip_distance": distance,
+        "RatecodeID": pa.array(ratecode, mask=missing),
+        "store_and_fwd_flag": pa.array(np.where(rng.random(n) < 0.005, "Y", "N"), mask=missing),
+        "PULocationID": pu,
+        "DOLocationID": do,
+        "payment_type": np.where(missing, 0, payment),
+        "fare_amount": fare * sign,
+        "extra": extra * sign,
+        "mta_tax": 0.5 * sign,
+        "tip_amount": tip * sign,
+        "tolls_amount": tolls * sign,
+        "improvement_surcharge": 1.0 * sign,
+        "total_amount": (total * sign).round(2),
+        "congestion_surcharge": congestion * sign,
+        "Airport_fee": airport_fee * sign,
+    }, schema=SCHEMA)
+
+
+def generate_month(month_str, rows, path, seed=0, stray_fraction=0.0005, chunk_rows=2_000_000):
+    # Written in row groups of chunk_rows so 20M-row months stay within a few GB
+    rng = np.random.default_rng(seed)
+    month_start = pd.Timestamp(f"{month_str}-01")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with pq.ParquetWriter(tmp, SCHEMA) as writer:
+        for start in range(0, rows, chunk_rows):
+            writer.write_table(generate_chunk(rng, month_start, min(chunk_rows, rows - start), stray_fraction))
+    os.replace(tmp, path)
+    return path
+
+
+def synthetic_anomalies(path, rows, seed=0, start="2020-03-01", end="2025-03-31"):
+    # Stand-in for the DBSCAN output CSVs (anomalies_clustered_*.csv) read by the anomaly figures
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp(start).value
+    span = pd.Timestamp(end).value - start
+    pd.DataFrame({
+        "pickup_datetime": pd.to_datetime(np.sort(start + rng.integers(0, span, rows))),
+        "trip_distance": rng.gamma(2, 1.5, rows).round(2),
+        "fare_amount": rng.gamma(3, 5, rows).round(2),
+        "trip_duration": rng.gamma(3, 4, rows).round(2),
+    }).to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--month", default="2024-03", help="YYYY-MM")
+    parser.add_argument("--rows", type=int, default=3_000_000)
+    parser.add_argument("--output", help="Default: data/raw/yellow_tripdata_<month>.parquet")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stray-fraction", type=float, default=0.0005,
+                        help="Share of rows with pickups outside the month")
+    args = parser.parse_args()
+
+    output = args.output or os.path.join("data", "raw", f"yellow_tripdata_{args.month}.parquet")
+    start = time.perf_counter()
+    generate_month(args.month, args.rows, output, args.seed, args.stray_fraction)
+    print(f"{args.rows:,} trips for {args.month} in {time.perf_counter() - start:.1f}s -> {output} "
+          f"({os.path.getsize(output) / 2**20:.0f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from benchmarks.suite import _git_commit, log
+
+# Date-window queries against trip_store.py at several row-group sizes, on
+# synthetic anomalous trips spread over several years. For each size it
+# reports the build time, file and footer size, the time to open the store
+# and parse its zone map, and the latency and row groups read for random
+# cluster-sized windows (a few days to a month).
+#   python -m benchmarks.trip_store --rows 20000000 --row-group-rows 16384 65536 262144 1048576
+WINDOWS = [3, 7, 14, 30]
+
+
+def synthetic_trips(path, rows, seed=0, start="2020-03-01", end="2025-03-31"):
+    rng = np.random.default_rng(seed)
+    start_ns = pd.Timestamp(start).value
+    span = pd.Timestamp(end).value - start_ns
+    pd.DataFrame({
+        "pickup_datetime": pd.to_datetime(start_ns + rng.integers(0, span, rows)),
+        "PULocationID": rng.integers(1, 264, rows).astype("int32"),
+        "DOLocationID": rng.integers(1, 264, rows).astype("int32"),
+        "fare_amount": rng.gamma(3, 5, rows).round(2),
+        "trip_distance": rng.gamma(2, 1.5, rows).round(2),
+        "trip_duration": rng.gamma(3, 4, rows).round(2),
+    }).to_parquet(path, index=False)
+
+
+def bench_size(store, source, row_group_rows, queries, repeat):
+    import trip_store
+
+    start = time.perf_counter()
+    trip_store.build(f"read_parquet('{source}')", [source], store, row_group_rows)
+    result = {"build_seconds": time.perf_counter() - start, "bytes": os.path.getsize(store),
+              "row_groups": pq.read_metadata(store).num_row_groups,
+              "footer_bytes": pq.read_metadata(store).serialized_size}
+
+    trip_store._store = None
+    start = time.perf_counter()
+    trip_store._open(store)
+    result["open_seconds"] = time.perf_counter() - start
+
+    for days in WINDOWS:
+        times, groups, rows = [], [], []
+        for q_start in queries:
+            for _ in range(repeat):
+                began = time.perf_counter()
+                trips, n_groups = trip_store.query(q_start, q_start + pd.Timedelta(days=days), path=store)
+                times.append(time.perf_counter() - began)
+            groups.append(n_groups)
+            rows.append(len(trips))
+        result[f"query_{days}d"] = {"median": statistics.median(times), "p95": float(np.percentile(times, 95)),
+                                    "row_groups": statistics.median(groups), "rows": statistics.median(rows)}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000, help="Synthetic anomalous trips over 2020-03..2025-03")
+    parser.add_argument("--row-group-rows", type=int, nargs="+", default=[16_384, 65_536, 262_144, 1_048_576])
+    parser.add_argument("--queries", type=int, default=20, help="Random windows per size")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    # Scratch cwd, so the stores (and their catalog entries) land in a throwaway data/
+    workdir = tempfile.mkdtemp(prefix="tlcml-trips-")
+    cwd = os.getcwd()
+    os.makedirs(os.path.join(workdir, "data"))
+    os.chdir(workdir)
+    try:
+        source = "data/trips.parquet"
+        start = time.perf_counter()
+        synthetic_trips(source, args.rows, args.seed)
+        log(f"Generated {args.rows:,} synthetic trips in {time.perf_counter() - start:.1f}s")
+
+        rng = np.random.default_rng(args.seed)
+        span = pd.date_range("2020-03-01", "2025-02-28", freq="D")
+        queries = [span[i] for i in rng.integers(0, len(span), args.queries)]
+
+        results = {}
+        for size in args.row_group_rows:
+            results[str(size)] = bench_size(f"data/store-{size}.parquet", source, size, queries, args.repeat)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n{'row group':>10} {'groups':>7} {'MiB':>6} {'open ms':>8}" + "".join(f"{f'{d}d ms':>9}" for d in WINDOWS))
+    for size, r in results.items():
+        print(f"{size:>10} {r['row_groups']:>7} {r['bytes'] / 2**20:>6.0f} {r['open_seconds'] * 1000:>8.1f}"
+              + "".join(f"{r[f'query_{d}d']['median'] * 1000:>9.1f}" for d in WINDOWS))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"commit": _git_commit(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "host": {"python": platform.python_version(), "cpus": os.cpu_count()},
+                       "rows": args.rows, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
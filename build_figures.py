@@ -0,0 +1,6 @@
+from visuals.registry import FIGURE_INPUTS, preload
+
+# Render every static figure to data/figures/ ahead of deploy so app workers
+# load snapshots instead of rebuilding. Up-to-date snapshots are left as is.
+if __name__ == "__main__":
+    preload(FIGURE_INPUTS)
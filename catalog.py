@@ -0,0 +1,266 @@
+import argparse
+import fcntl
+import glob
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from visuals.figure_cache import file_hash
+
+# ───────────── Data catalog ───────────── #
+# data/catalog.json describes every artifact the pipeline writes under data/:
+# schema, row count, date range, content hash, the stage that produced it and
+# the files it was built from (with their hashes at the time). Writers call
+# record() right after replacing a file. Readers call entry() or max_date(),
+# which trust an entry only while the file's mtime and size still match it.
+# Freshness and skip checks are then a stat plus a JSON lookup, not a read of
+# the data itself.
+#
+#   python catalog.py           # list entries and whether each is fresh
+#   python catalog.py --scan    # (re)record every data file that has no fresh entry
+CATALOG_PATH = "data/catalog.json"
+LOCK_PATH = "data/.catalog.lock"
+
+SCAN_PATTERNS = ["data/*.parquet", "data/*.csv", "data/anomalies/month=*/part.parquet", "data/columnar/*.arrow"]
+
+# (mtime_ns, size, entries) of the last catalog read by this process
+_loaded = None
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+def load():
+    global _loaded
+    try:
+        st = os.stat(CATALOG_PATH)
+    except FileNotFoundError:
+        return {}
+    if _loaded is None or _loaded[:2] != (st.st_mtime_ns, st.st_size):
+        with open(CATALOG_PATH) as f:
+            _loaded = (st.st_mtime_ns, st.st_size, json.load(f))
+    return _loaded[2]
+
+
+def _save(entries):
+    tmp = f"{CATALOG_PATH}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(entries, f, indent=2, sort_keys=True)
+    os.replace(tmp, CATALOG_PATH)
+
+
+def _is_fresh(e, st):
+    return e is not None and e["mtime_ns"] == st.st_mtime_ns and e["size"] == st.st_size
+
+
+def entry(path):
+    # The catalog entry for path, or None if it is missing or the file changed since
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    e = load().get(path)
+    return e if _is_fresh(e, st) else None
+
+
+# ───────────── Describing a file ───────────── #
+def _date_column(schema, date_column):
+    if date_column:
+        return date_column
+    for field in schema:
+        if pa.types.is_timestamp(field.type) or pa.types.is_date(field.type):
+            return field.name
+    return None
+
+
+def _iso(value):
+    return None if value is None or pd.isna(value) else pd.Timestamp(value).isoformat()
+
+
+def _range(column):
+    bounds = pc.min_max(column)
+    return _iso(bounds["min"].as_py()), _iso(bounds["max"].as_py())
+
+
+def _describe_parquet(path, date_column):
+    meta = pq.read_metadata(path)
+    schema = meta.schema.to_arrow_schema()
+    date_column = _date_column(schema, date_column)
+    lo = hi = None
+    if date_column and meta.num_rows:
+        # Row-group statistics from the footer; read the column only if they're missing
+        idx = meta.schema.names.index(date_column)
+        stats = [meta.row_group(i).column(idx).statistics for i in range(meta.num_row_groups)]
+        if all(s is not None and s.has_min_max for s in stats):
+            lo = _iso(min(pd.Timestamp(s.min) for s in stats))
+            hi = _iso(max(pd.Timestamp(s.max) for s in stats))
+        else:
+            lo, hi = _range(pq.read_table(path, columns=[date_column])[date_column])
+    return schema, meta.num_rows, date_column, lo, hi
+
+
+def _describe_arrow(path, date_column):
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    date_column = _date_column(table.schema, date_column)
+    lo, hi = _range(table[date_column]) if date_column and table.num_rows else (None, None)
+    return table.schema, table.num_rows, date_column, lo, hi
+
+
+def _describe_csv(path, date_column):
+    # One streaming pass in DuckDB rather than loading the CSV into pandas; imported here
+    # because the app imports this module for freshness checks only
+    import duckdb
+
+    con = duckdb.connect()
+    con.execute("SET threads TO 1")
+    relation = con.read_csv(path)
+    schema = relation.limit(0).arrow().schema
+    date_column = _date_column(schema, date_column)
+    if date_column:
+        rows, lo, hi = con.execute(
+            f'SELECT count(*), min("{date_column}"), max("{date_column}") FROM read_csv_auto(?)', [path]).fetchone()
+    else:
+        (rows,), lo, hi = con.execute("SELECT count(*) FROM read_csv_auto(?)", [path]).fetchone(), None, None
+    con.close()
+    return schema, rows, date_column, _iso(lo), _iso(hi)
+
+
+def _describe_frame(frame, date_column):
+    schema = pa.Schema.from_pandas(frame, preserve_index=False)
+    date_column = _date_column(schema, date_column)
+    lo = hi = None
+    if date_column and len(frame):
+        dates = pd.to_datetime(frame[date_column])
+        lo, hi = _iso(dates.min()), _iso(dates.max())
+    return schema, len(frame), date_column, lo, hi
+
+
+def describe(path, frame=None, date_column=None):
+    # (schema, rows, date_column, min_date, max_date); non-tabular files get only a hash
+    if frame is not None:
+        return _describe_frame(frame, date_column)
+    if path.endswith(".parquet"):
+        return _describe_parquet(path, date_column)
+    if path.endswith(".arrow"):
+        return _describe_arrow(path, date_column)
+    if path.endswith(".csv"):
+        return _describe_csv(path, date_column)
+    return None, None, None, None, None
+
+
+def content_hash(path):
+    e = entry(path)
+    if e:
+        return e["hash"]
+    return file_hash(path) if os.path.exists(path) else None
+
+
+# ───────────── Recording writes ───────────── #
+def record(path, sources=None, producer=None, frame=None, date_column=None, extends=None, **extra):
+    # Call after path has been replaced. frame, when the writer still has it in
+    # memory, saves parsing the file. extends is the entry from before an append
+    # of frame's rows, so the schema, row count and date range of an appended CSV
+    # come from the old entry plus frame. The content hash still reads the whole
+    # file: a plain sequential read, but not an incremental one.
+    global _loaded
+    st = os.stat(path)
+    if extends is not None and frame is not None:
+        _, rows, date_column, lo, hi = _describe_frame(frame, date_column or extends["date_column"])
+        schema = extends["schema"]
+        rows += extends["rows"]
+        lo = min(filter(None, [lo, extends["min_date"]]), default=None)
+        hi = max(filter(None, [hi, extends["max_date"]]), default=None)
+    else:
+        schema, rows, date_column, lo, hi = describe(path, frame, date_column)
+        schema = [[f.name, str(f.type)] for f in schema] if schema is not None else None
+
+    new = {
+        "schema": schema,
+        "rows": rows,
+        "date_column": date_column,
+        "min_date": lo,
+        "max_date": hi,
+        "hash": file_hash(path),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "recorded": datetime.now().isoformat(timespec="seconds"),
+        **extra,
+    }
+    resolved = {src: content_hash(src) for src in sources or []}
+
+    os.makedirs(os.path.dirname(LOCK_PATH), exist_ok=True)
+    with open(LOCK_PATH, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            _loaded = None
+            entries = dict(load())
+            previous = entries.get(path, {})
+            # Re-recording a file without lineage (e.g. from a reader) keeps what its writer recorded
+            new["sources"] = resolved if sources is not None else previous.get("sources", {})
+            new["producer"] = producer or previous.get("producer")
+            entries[path] = new
+            _save(entries)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+    return new
+
+
+def record_all(paths, **kwargs):
+    for path in paths:
+        record(path, **kwargs)
+
+
+# ───────────── Lookups ───────────── #
+def max_date(path, date_column=None):
+    # Latest date in path; falls back to the parquet footer (and refreshes the entry) if it's stale
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    e = entry(path)
+    if e is None or (date_column and e["date_column"] != date_column):
+        e = record(path, date_column=date_column)
+    return pd.Timestamp(e["max_date"]) if e["max_date"] else None
+
+
+def stale():
+    # path -> reason, for entries whose file or a (still existing) source changed since recording
+    reasons = {}
+    entries = load()
+    for path, e in entries.items():
+        if not os.path.exists(path):
+            reasons[path] = "missing"
+        elif entry(path) is None:
+            reasons[path] = "modified outside the pipeline"
+        else:
+            changed = [src for src, h in e.get("sources", {}).items()
+                       if h is not None and os.path.exists(src) and content_hash(src) != h]
+            if changed:
+                reasons[path] = "source changed: " + ", ".join(changed)
+    return reasons
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scan", action="store_true", help="Record data files that have no fresh entry")
+    args = parser.parse_args()
+
+    if args.scan:
+        for path in sorted(p for pattern in SCAN_PATTERNS for p in glob.glob(pattern)):
+            if entry(path) is None:
+                record(path)
+                log(f"[CATALOG] Recorded {path}")
+
+    reasons = stale()
+    for path, e in sorted(load().items()):
+        span = f"{e['min_date'][:10]} → {e['max_date'][:10]}" if e["max_date"] else "-"
+        rows = f"{e['rows']:,}" if e["rows"] is not None else "-"
+        print(f"{path:<56} {rows:>12} rows  {span:<25} {e.get('producer') or '-':<16} {reasons.get(path, 'fresh')}")
+
+
+if __name__ == "__main__":
+    main()
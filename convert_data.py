@@ -0,0 +1,7 @@
+from visuals.datasets import convert_all, log_sizes
+
+# Write memory-mappable Arrow copies of the CSV datasets to data/columnar/.
+# Run at build time (before build_figures.py); a copy older than its CSV is
+# ignored until this is run again.
+if __name__ == "__main__":
+    log_sizes(convert_all())
@@ -0,0 +1,288 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+from scipy.optimize import nnls
+
+import artifacts
+import catalog
+import profiling
+import run_forecast
+
+# ───────────── Stacked ensemble forecast ───────────── #
+# Fits several models to the daily series in forecast_input.parquet in
+# parallel worker processes, backtests each one on the last BACKTEST_FOLDS
+# full months (train on everything before the month, forecast the month) and
+# combines them with non-negative weights fitted to the backtest forecasts
+# (NNLS, normalised to sum to 1). The ensemble band is the ensemble's own
+# 10th–90th percentile backtest error around its forecast, so its width is
+# learned from how the combination actually missed, not from any one model.
+#
+# The ensemble and every component are written to ENSEMBLE_PARQUET with the
+# forecast_output.parquet columns; `type` names the model ("ensemble",
+# "prophet", ...). Weights and backtest scores go to WEIGHTS_JSON.
+#   python ensemble.py [--folds 3] [--workers 4] [--force]
+INPUT_PARQUET = run_forecast.INPUT_PARQUET
+ENSEMBLE_PARQUET = "data/forecast_ensemble.parquet"
+WEIGHTS_JSON = "data/forecast_ensemble_weights.json"
+
+BACKTEST_FOLDS = 3
+WORKERS = int(os.environ.get("TLCML_ENSEMBLE_WORKERS", 0)) or os.cpu_count()
+
+# Central 80% band, the same width as Prophet's default interval
+LOWER_Q, UPPER_Q = 0.1, 0.9
+
+# Covariates from the Orbit models in visuals/bayesian*.py; a covariate is used
+# only if it reaches the end of training. Every fold (backtest or live) sees
+# only values up to its training end: each covariate is standardised on the
+# fold's training window and its last training value is carried forward over
+# the forecast month.
+COVARIATES = {
+    "mta_ridership": ("mta_weekly", "weekly_subway_rides"),
+    "covid_hospitalized": ("covid", "hospitalizations"),
+    "tempmax": ("temperatures", "tempmax"),
+}
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+# ───────────── Component models ───────────── #
+# Each takes the training frame (ds, y, covariates) and a future frame (ds,
+# covariates) and returns ds, yhat, yhat_lower, yhat_upper for the future days.
+def fit_prophet(train, future):
+    model = run_forecast.make_model()
+    model.fit(train[["ds", "y"]])
+    return model.predict(future[["ds"]])[["ds", "yhat", "yhat_lower", "yhat_upper"]]
+
+
+def fit_dlt(train, future):
+    from orbit.models import DLT
+
+    regressors = [c for c in COVARIATES if c in train]
+    model = DLT(response_col="y", date_col="ds", regressor_col=regressors or None, seasonality=7,
+                estimator="stan-map", seed=8888,
+                prediction_percentiles=[int(LOWER_Q * 100), int(UPPER_Q * 100)])
+    model.fit(train[["ds", "y", *regressors]])
+    pred = model.predict(future[["ds", *regressors]])
+    return pd.DataFrame({
+        "ds": pred["ds"],
+        "yhat": pred["prediction"],
+        "yhat_lower": pred[f"prediction_{int(LOWER_Q * 100)}"],
+        "yhat_upper": pred[f"prediction_{int(UPPER_Q * 100)}"],
+    })
+
+
+def fit_seasonal_naive(train, future, weeks=4):
+    # Mean of the same weekday over the last `weeks` weeks; band from the same rule's in-sample errors
+    y = train.set_index("ds")["y"].asfreq("D")
+    lagged = pd.concat([y.shift(7 * k) for k in range(1, weeks + 1)], axis=1).mean(axis=1, skipna=False)
+    errors = (y - lagged).dropna().tail(91)
+    recent = y.tail(7 * weeks)
+    by_weekday = recent.groupby(recent.index.dayofweek).mean()
+    yhat = by_weekday.reindex(future["ds"].dt.dayofweek).to_numpy()
+    return pd.DataFrame({
+        "ds": future["ds"].to_numpy(),
+        "yhat": yhat,
+        "yhat_lower": yhat + errors.quantile(LOWER_Q),
+        "yhat_upper": yhat + errors.quantile(UPPER_Q),
+    })
+
+
+MODELS = {
+    "prophet": fit_prophet,
+    "dlt": fit_dlt,
+    "seasonal_naive": fit_seasonal_naive,
+}
+
+
+def fit_predict(name, train, future):
+    # Runs in a worker process
+    out = MODELS[name](train, future).reset_index(drop=True)
+    out["ds"] = pd.to_datetime(out["ds"])
+    return out
+
+
+# ───────────── Data ───────────── #
+def load_covariates(df):
+    # Raw daily covariates over df's dates; standardised per fold in fold_frames()
+    from visuals.datasets import load
+
+    end = df["ds"].max()
+    days = pd.date_range(df["ds"].min(), end, freq="D")
+    covariates = pd.DataFrame({"ds": days})
+    for name, (dataset, column) in COVARIATES.items():
+        try:
+            series = load(dataset)[["date", column]].dropna()
+        except (OSError, KeyError) as e:
+            log(f"[WARN] Covariate {name} unavailable: {e}")
+            continue
+        series = series.drop_duplicates("date").set_index("date")[column].sort_index()
+        if series.index.max() < end:
+            log(f"[INFO] Covariate {name} ends {series.index.max().date()}, before training ends — not used")
+            continue
+        covariates[name] = series.reindex(days).ffill().bfill().to_numpy()
+    return covariates
+
+
+def fold_frames(df, start, end):
+    # (train, future) for one month, with no covariate value from start onwards
+    train = df[df["ds"] < start].copy()
+    future = pd.DataFrame({"ds": pd.date_range(start, end, freq="D")})
+    for name in [c for c in COVARIATES if c in df]:
+        # Standardised as in visuals/bayesian.py, on the training window only
+        values = train[name]
+        train[name] = (values - values.mean()) / values.std()
+        future[name] = train[name].iloc[-1]
+    return train, future
+
+
+def month_windows(df, folds):
+    # (month_start, month_end) for each backtest month, then the live forecast month
+    forecast_start, forecast_end = run_forecast.get_next_forecast_window(df.copy())
+    if forecast_start is None:
+        return []
+    windows = []
+    for k in range(folds, 0, -1):
+        start = forecast_start - relativedelta(months=k)
+        windows.append((start, start + relativedelta(months=1) - pd.Timedelta(days=1)))
+    windows.append((forecast_start, forecast_end))
+    return windows
+
+
+# ───────────── Stacking ───────────── #
+def stack_weights(backtest, names):
+    # Non-negative least squares on the pooled backtest forecasts, normalised to a convex combination
+    X = backtest[names].to_numpy()
+    weights, _ = nnls(X, backtest["y"].to_numpy())
+    if weights.sum() == 0:
+        weights = np.ones(len(names))
+    return dict(zip(names, weights / weights.sum()))
+
+
+def score(backtest, column, lower=None, upper=None):
+    err = backtest["y"] - backtest[column]
+    out = {"mape": float((err.abs() / backtest["y"]).mean()), "rmse": float(np.sqrt((err ** 2).mean()))}
+    if lower is not None:
+        out["coverage"] = float(backtest["y"].between(backtest[lower], backtest[upper]).mean())
+    return out
+
+
+def forecast_and_save(folds=BACKTEST_FOLDS, workers=WORKERS, force=False):
+    paths = artifacts.latest([INPUT_PARQUET])
+    if not os.path.exists(paths[INPUT_PARQUET]):
+        log("[ERROR] Input file not found.")
+        return
+
+    with profiling.stage("load", "ensemble") as stage:
+        df = run_forecast.load_training(paths[INPUT_PARQUET])[["ds", "y"]].reset_index(drop=True)
+        covariates = load_covariates(df)
+        df = df.merge(covariates, on="ds", how="left")
+        stage.update(rows=len(df), covariates=[c for c in COVARIATES if c in covariates])
+
+    windows = month_windows(df, folds)
+    if not windows:
+        return
+    forecast_start, forecast_end = windows[-1]
+
+    if not force and os.path.exists(ENSEMBLE_PARQUET):
+        latest = catalog.max_date(ENSEMBLE_PARQUET, "ds")
+        if latest is not None and latest >= forecast_end:
+            log(f"[SKIP] Ensemble already up to date through {latest.date()}")
+            return
+
+    # ─── Every (model, month) fit is independent; run them all in the pool ───
+    with profiling.stage("fit", "ensemble") as stage:
+        jobs = {}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for start, end in windows:
+                train, future = fold_frames(df, start, end)
+                for name in MODELS:
+                    jobs[name, start] = pool.submit(fit_predict, name, train, future)
+            results = {}
+            for (name, start), job in jobs.items():
+                try:
+                    results[name, start] = job.result()
+                except ImportError as e:
+                    log(f"[WARN] {name} skipped: {e}")
+                except Exception as e:
+                    log(f"[WARN] {name} failed for {start:%Y-%m}: {e}")
+        stage.update(fits=len(results))
+
+    # Only models that produced every backtest month and the live month take part
+    names = [n for n in MODELS if all((n, start) in results for start, _ in windows)]
+    if not names:
+        log("[ERROR] No model completed every fold.")
+        return
+
+    # ─── Learn weights and the ensemble band from the backtest months ───
+    backtest = []
+    for start, _ in windows[:-1]:
+        month = df[["ds", "y"]].merge(results[names[0], start][["ds"]], on="ds")
+        for name in names:
+            r = results[name, start].set_index("ds")
+            month[name] = month["ds"].map(r["yhat"])
+            month[f"{name}_lower"] = month["ds"].map(r["yhat_lower"])
+            month[f"{name}_upper"] = month["ds"].map(r["yhat_upper"])
+        backtest.append(month)
+    backtest = pd.concat(backtest, ignore_index=True).dropna()
+
+    weights = stack_weights(backtest, names)
+    backtest["ensemble"] = sum(backtest[n] * w for n, w in weights.items())
+    residuals = backtest["y"] - backtest["ensemble"]
+    band = (float(residuals.quantile(LOWER_Q)), float(residuals.quantile(UPPER_Q)))
+    scores = {n: score(backtest, n, f"{n}_lower", f"{n}_upper") for n in names}
+    scores["ensemble"] = score(backtest, "ensemble")
+
+    # ─── Live month: ensemble plus each component, forecast_output.parquet columns ───
+    parts = []
+    for name in names:
+        part = results[name, forecast_start].copy()
+        part["type"] = name
+        parts.append(part)
+    ensemble = parts[0][["ds"]].copy()
+    ensemble["yhat"] = sum(p["yhat"].to_numpy() * weights[p["type"].iloc[0]] for p in parts)
+    ensemble["yhat_lower"] = ensemble["yhat"] + band[0]
+    ensemble["yhat_upper"] = ensemble["yhat"] + band[1]
+    ensemble["type"] = "ensemble"
+    out = pd.concat([ensemble, *parts], ignore_index=True)
+    out[["yhat", "yhat_lower", "yhat_upper"]] = out[["yhat", "yhat_lower", "yhat_upper"]].clip(lower=0)
+
+    with profiling.stage("publish", "ensemble") as stage:
+        with artifacts.publish(producer="ensemble", sources=[INPUT_PARQUET]) as pub:
+            out.to_parquet(pub.path(ENSEMBLE_PARQUET), index=False)
+            with open(pub.path(WEIGHTS_JSON), "w") as f:
+                json.dump({
+                    "forecast_month": forecast_start.strftime("%Y-%m"),
+                    "backtest_months": [start.strftime("%Y-%m") for start, _ in windows[:-1]],
+                    "covariates": [c for c in COVARIATES if c in covariates],
+                    "weights": weights,
+                    "band": band,
+                    "backtest": scores,
+                }, f, indent=2)
+        stage["rows"] = len(out)
+
+    log(f"[DONE] Ensemble for {forecast_start.strftime('%B %Y')} (generation {pub.generation}): "
+        + ", ".join(f"{n} {w:.2f}" for n, w in weights.items()))
+    for name, s in scores.items():
+        log(f"[BACKTEST] {name:<15} MAPE {s['mape']:.1%}  RMSE {s['rmse']:,.0f}"
+            + (f"  band coverage {s['coverage']:.0%}" if "coverage" in s else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--folds", type=int, default=BACKTEST_FOLDS, help="Backtest months used to fit the weights")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--force", action="store_true", help="Refit even if the ensemble covers the next month")
+    args = parser.parse_args()
+    forecast_and_save(args.folds, args.workers, args.force)
+
+
+if __name__ == "__main__":
+    main()
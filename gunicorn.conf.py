@@ -0,0 +1,22 @@
+import multiprocessing
+import os
+
+# Production serving: gunicorn -c gunicorn.conf.py wsgi:server
+bind = f"0.0.0.0:{os.environ.get('PORT', 8050)}"
+
+# Render sets WEB_CONCURRENCY from the instance size
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 2))
+
+# Build figures in the master once; forked workers share them copy-on-write
+preload_app = True
+
+# A cold Prophet fit can take a while on first request if a snapshot is missing
+timeout = 120
+
+
+def post_fork(server, worker):
+    # Threads don't survive fork, so each worker starts its own scheduler;
+    # the refresh file lock lets only one of them run a given refresh
+    import jobs
+    jobs.start_scheduler()
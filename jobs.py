@@ -0,0 +1,129 @@
+import fcntl
+import importlib
+import json
+import os
+import threading
+import time
+import traceback
+
+from visuals.registry import log
+
+# ───────────── Background data refresh (ingest → forecast) ───────────── #
+# The monthly ETL runs here on a daemon thread instead of as unrelated cron
+# scripts. A thread lock keeps it single-flight within a process and an fcntl
+# lock on LOCK_PATH keeps it single-flight across gunicorn workers. Every
+# artifact the steps write is published with os.replace, and the live forecast
+# figure keeps serving its previous version while it is rebuilt (see
+# visuals/registry.py), so requests never wait on or observe a refresh.
+LOCK_PATH = "data/.refresh.lock"
+STATUS_PATH = "data/refresh_status.json"
+
+# Hours between scheduled refreshes; 0 disables the scheduler
+REFRESH_HOURS = float(os.environ.get("TLCML_REFRESH_HOURS", 0))
+
+# "module:function" targets, imported on the job thread so app startup never loads Prophet or DuckDB
+STEPS = [
+    ("ingest", "update_ingest:main"),
+    ("forecast", "run_forecast:forecast_and_save"),
+    ("forecast-hourly", "run_forecast:forecast_hourly_and_save"),
+    # Picks up ingest's incremental anomaly scoring; DuckDB sorts outside the GIL, so requests keep flowing
+    ("trip-store", "trip_store:build"),
+]
+
+_lock = threading.Lock()
+_scheduler = None
+
+
+def _write_status(status):
+    # Shared through a file so every worker reports the same job
+    os.makedirs(os.path.dirname(STATUS_PATH), exist_ok=True)
+    tmp = f"{STATUS_PATH}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(status, f)
+    os.replace(tmp, STATUS_PATH)
+
+
+def _lock_held():
+    try:
+        with open(LOCK_PATH) as f:
+            fcntl.flock(f, fcntl.LOCK_SH | fcntl.LOCK_NB)
+        return False
+    except BlockingIOError:
+        return True
+    except OSError:
+        return False
+
+
+def read_status():
+    try:
+        with open(STATUS_PATH) as f:
+            status = json.load(f)
+    except (OSError, ValueError):
+        return {"state": "idle"}
+    # A process that died mid-refresh leaves "running" behind without holding the lock
+    if status.get("state") == "running" and not _lock_held():
+        status["state"] = "interrupted"
+    return status
+
+
+def _run(lock_file):
+    status = {"state": "running", "started": time.time(), "steps": {}}
+    try:
+        for name, target in STEPS:
+            status["current"] = name
+            _write_status(status)
+            start = time.perf_counter()
+            try:
+                module, func = target.split(":")
+                getattr(importlib.import_module(module), func)()
+                status["steps"][name] = {"ok": True, "seconds": time.perf_counter() - start}
+            except Exception as e:
+                status["steps"][name] = {"ok": False, "seconds": time.perf_counter() - start, "error": str(e)}
+                log(f"[JOB] {name} failed:\n{traceback.format_exc()}")
+                break
+        status["state"] = "done" if all(s["ok"] for s in status["steps"].values()) else "failed"
+        status.pop("current", None)
+        status["finished"] = time.time()
+        _write_status(status)
+        log(f"[JOB] Refresh {status['state']} in {status['finished'] - status['started']:.1f}s")
+    finally:
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+        _lock.release()
+
+
+def start_refresh():
+    # Returns False without waiting if a refresh is already running anywhere
+    if not _lock.acquire(blocking=False):
+        return False
+    os.makedirs(os.path.dirname(LOCK_PATH), exist_ok=True)
+    lock_file = open(LOCK_PATH, "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        _lock.release()
+        return False
+
+    log("[JOB] Starting data refresh")
+    threading.Thread(target=_run, args=(lock_file,), daemon=True, name="refresh").start()
+    return True
+
+
+def start_scheduler():
+    # Call once per serving process (after fork under gunicorn)
+    global _scheduler
+    if not REFRESH_HOURS or _scheduler is not None:
+        return
+
+    def loop():
+        while True:
+            last = read_status().get("finished", 0)
+            wait = last + REFRESH_HOURS * 3600 - time.time()
+            if wait <= 0:
+                start_refresh()
+                wait = REFRESH_HOURS * 3600
+            time.sleep(min(wait, 600))
+
+    _scheduler = threading.Thread(target=loop, daemon=True, name="refresh-scheduler")
+    _scheduler.start()
@@ -0,0 +1,167 @@
+import cProfile
+import functools
+import os
+import re
+import resource
+import threading
+import time
+from collections import defaultdict
+
+from flask import Response
+
+from visuals import registry
+from visuals.aggregate import cache_info
+
+# ───────────── Callback / figure instrumentation ───────────── #
+# instrument(app) wraps every server-side Dash callback and subscribes to figure
+# registry events, then serves everything in Prometheus text format on /metrics.
+# Set TLCML_PROFILE_SLOW_MS to profile each callback and keep a cProfile dump
+# (in TLCML_PROFILE_DIR) for any call slower than that many milliseconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES_BUCKETS = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6)
+
+PROFILE_SLOW_MS = float(os.environ.get("TLCML_PROFILE_SLOW_MS", 0))
+PROFILE_DIR = os.environ.get("TLCML_PROFILE_DIR", "profiles")
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # labels tuple -> [bucket counts..., sum, count]
+        self._series = defaultdict(lambda: [0] * len(self.buckets) + [0.0, 0])
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series[labels]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self, label_names):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                base = _labels(label_names, labels)
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f'{self.name}_bucket{{{base},le="{bound:g}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {series[-1]}')
+                lines.append(f"{self.name}_sum{{{base}}} {series[-2]}")
+                lines.append(f"{self.name}_count{{{base}}} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._lock = threading.Lock()
+        self._values = defaultdict(int)
+
+    def inc(self, labels, value=1):
+        with self._lock:
+            self._values[labels] += value
+
+    def render(self, label_names):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{{{_labels(label_names, labels)}}} {value}")
+        return lines
+
+
+def _labels(names, values):
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+
+
+callback_seconds = Histogram("tlcml_callback_seconds", "Dash callback latency.", LATENCY_BUCKETS)
+callback_bytes = Histogram("tlcml_callback_response_bytes", "Dash callback response size.", BYTES_BUCKETS)
+callback_errors = Counter("tlcml_callback_errors_total", "Dash callbacks that raised.")
+figure_seconds = Histogram("tlcml_figure_load_seconds", "Time to build or load a figure.", LATENCY_BUCKETS)
+figure_bytes = Histogram("tlcml_figure_bytes", "Serialized figure size.", BYTES_BUCKETS)
+figure_cache = Counter("tlcml_figure_cache_requests_total", "Figure registry lookups by result.")
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/status") as f:
+            return int(re.search(r"VmRSS:\s+(\d+) kB", f.read()).group(1)) * 1024
+    except (OSError, AttributeError):
+        # ru_maxrss is peak RSS in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _on_figure_event(event, key, seconds, nbytes):
+    figure_cache.inc((key, event))
+    if event in ("snapshot", "build"):
+        figure_seconds.observe((key, event), seconds)
+        figure_bytes.observe((key,), nbytes)
+
+
+def _timed(name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profiler = cProfile.Profile() if PROFILE_SLOW_MS else None
+        start = time.perf_counter()
+        try:
+            if profiler:
+                profiler.enable()
+            response = func(*args, **kwargs)
+        except Exception:
+            callback_errors.inc((name,))
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            if profiler:
+                profiler.disable()
+            callback_seconds.observe((name,), elapsed)
+
+        if profiler and elapsed * 1000 >= PROFILE_SLOW_MS:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(os.path.join(PROFILE_DIR, f"{name}-{int(time.time() * 1000)}-{elapsed * 1000:.0f}ms.prof"))
+        # Dash's wrapped callbacks return the serialized JSON response
+        if isinstance(response, (str, bytes)):
+            callback_bytes.observe((name,), len(response))
+        return response
+
+    return wrapper
+
+
+def render_metrics():
+    lines = []
+    lines += callback_seconds.render(("callback",))
+    lines += callback_bytes.render(("callback",))
+    lines += callback_errors.render(("callback",))
+    lines += figure_seconds.render(("figure", "source"))
+    lines += figure_bytes.render(("figure",))
+    lines += figure_cache.render(("figure", "result"))
+
+    info = cache_info()
+    lines += [
+        "# HELP tlcml_aggregate_cache_requests_total Aggregation service LRU lookups by result.",
+        "# TYPE tlcml_aggregate_cache_requests_total counter",
+        f'tlcml_aggregate_cache_requests_total{{result="hit"}} {info.hits}',
+        f'tlcml_aggregate_cache_requests_total{{result="miss"}} {info.misses}',
+        "# HELP process_resident_memory_bytes Resident memory of this worker.",
+        "# TYPE process_resident_memory_bytes gauge",
+        f"process_resident_memory_bytes {_rss_bytes()}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def instrument(app):
+    for spec in app.callback_map.values():
+        # Clientside callbacks have no server function to wrap
+        func = spec.get("callback")
+        if func is not None:
+            spec["callback"] = _timed(getattr(func, "__name__", "callback"), func)
+
+    registry.FIGURE_HOOKS.append(_on_figure_event)
+
+    @app.server.route("/metrics")
+    def metrics():
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,241 @@
+import argparse
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+import catalog
+from visuals.datasets import DATASETS, columnar_path
+from visuals.registry import FIGURE_INPUTS, FIGURES, LIVE_INPUTS
+
+# ───────────── Pipeline DAG ───────────── #
+# Every stage declares the files it reads and writes; a stage depends on the
+# stages that write its inputs. A stage is re-run only when the hash of its
+# inputs (content hashes from the data catalog, plus its own source code)
+# differs from the last successful run recorded in STATE_PATH, or when one of
+# its outputs is missing. Stages whose dependencies are done run in parallel
+# worker processes, and a timing report is printed at the end.
+#
+#   python pipeline.py                      # everything that is out of date
+#   python pipeline.py figure:forecast-live  # one target and whatever it depends on
+#   python pipeline.py --dry-run            # show what would run and why
+STATE_PATH = "data/pipeline_state.json"
+
+INPUT_PARQUET = "data/forecast_input.parquet"
+OUTPUT_PARQUET = "data/forecast_output.parquet"
+FITTED_PARQUET = "data/forecast_fitted.parquet"
+HOURLY_INPUT_PARQUET = "data/forecast_input_hourly.parquet"
+HOURLY_OUTPUT_PARQUET = "data/forecast_output_hourly.parquet"
+HOURLY_FITTED_PARQUET = "data/forecast_fitted_hourly.parquet"
+HOURLY_PARAMS_JSON = "data/forecast_hourly_params.json"
+ENSEMBLE_PARQUET = "data/forecast_ensemble.parquet"
+ENSEMBLE_WEIGHTS_JSON = "data/forecast_ensemble_weights.json"
+ZONE_HOURS_PARQUET = "data/zone_hours.parquet"
+ZONE_TILES = "data/zone_tiles.npz"
+# Listed here rather than imported: anomaly_pipeline pulls in scikit-learn and DuckDB
+ANOMALY_DAILY_PARQUET = "data/anomaly_daily.parquet"
+CLUSTERS_CSV = "data/anomaly_clusters_detected.csv"
+TRIP_STORE = "data/anomaly_trips.parquet"
+
+
+class Stage:
+    # target is "module:function", resolved in the worker so the parent stays light
+    def __init__(self, name, target, inputs=(), outputs=(), args=(), code=(), always=False):
+        self.name = name
+        self.target = target
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.args = tuple(args)
+        self.code = [target.split(":")[0], *code]
+        # Always runs: its real input (e.g. the TLC site) isn't a local file
+        self.always = always
+
+
+def _csv_datasets():
+    return [name for name, d in DATASETS.items() if not d.path.endswith(".parquet") and os.path.exists(d.path)]
+
+
+STAGES = {s.name: s for s in [
+    # Fails (and blocks everything downstream) when update_ingest.main raises; it also scores
+    # the new month for anomalies, so the anomaly stages wait for it
+    Stage("ingest", "update_ingest:main", outputs=[INPUT_PARQUET, HOURLY_INPUT_PARQUET, ZONE_HOURS_PARQUET, ZONE_TILES,
+                                                  ANOMALY_DAILY_PARQUET, DATASETS["anomalies"].path], always=True),
+    Stage("forecast", "run_forecast:forecast_and_save",
+          inputs=[INPUT_PARQUET], outputs=[OUTPUT_PARQUET, FITTED_PARQUET]),
+    # The saved params only seed the next fit's warm start, so they aren't an input
+    Stage("forecast-hourly", "run_forecast:forecast_hourly_and_save", inputs=[HOURLY_INPUT_PARQUET],
+          outputs=[HOURLY_OUTPUT_PARQUET, HOURLY_FITTED_PARQUET, HOURLY_PARAMS_JSON]),
+    Stage("ensemble", "ensemble:forecast_and_save",
+          inputs=[INPUT_PARQUET, *[DATASETS[name].path for name in ("mta_weekly", "covid", "temperatures")]],
+          outputs=[ENSEMBLE_PARQUET, ENSEMBLE_WEIGHTS_JSON], code=["run_forecast"]),
+    Stage("anomaly-clusters", "anomaly_clusters:run", inputs=[ANOMALY_DAILY_PARQUET], outputs=[CLUSTERS_CSV],
+          args=(ANOMALY_DAILY_PARQUET,)),
+    Stage("trip-store", "trip_store:build", inputs=[DATASETS["anomalies"].path], outputs=[TRIP_STORE]),
+    Stage("convert", "visuals.datasets:convert_all",
+          inputs=[DATASETS[name].path for name in _csv_datasets()],
+          outputs=[columnar_path(name) for name in _csv_datasets()]),
+    # Figure snapshots are keyed by their own digest (visuals/figure_cache.py), so they have no fixed output path
+    *[Stage(f"figure:{key}", "visuals.registry:get_figure", inputs=FIGURE_INPUTS.get(key, LIVE_INPUTS.get(key, [])),
+            args=(key,), code=[module]) for key, (module, _) in FIGURES.items()],
+]}
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+def dependencies(stages=None):
+    stages = STAGES if stages is None else stages
+    writers = {path: s.name for s in stages.values() for path in s.outputs}
+    return {s.name: sorted({writers[p] for p in s.inputs if p in writers} - {s.name}) for s in stages.values()}
+
+
+def with_ancestors(targets, deps):
+    selected, todo = set(), list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in selected:
+            selected.add(name)
+            todo.extend(deps[name])
+    return selected
+
+
+def input_hash(stage):
+    h = hashlib.sha256()
+    for module in stage.code:
+        h.update(catalog.content_hash(importlib.util.find_spec(module).origin).encode())
+    for path in sorted(stage.inputs):
+        h.update(path.encode())
+        h.update((catalog.content_hash(path) or "missing").encode())
+    h.update(json.dumps(stage.args).encode())
+    return h.hexdigest()
+
+
+def load_state():
+    try:
+        with open(STATE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state):
+    tmp = f"{STATE_PATH}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, STATE_PATH)
+
+
+def why_run(stage, digest, state, force=False):
+    # Reason to run the stage, or None if it is up to date
+    if force:
+        return "forced"
+    if stage.always:
+        return "always"
+    if state.get(stage.name, {}).get("inputs") != digest:
+        return "inputs changed" if stage.name in state else "never run"
+    missing = [p for p in stage.outputs if not os.path.exists(p)]
+    return f"missing {missing[0]}" if missing else None
+
+
+def execute(name):
+    # Runs in a worker process
+    stage = STAGES[name]
+    module, func = stage.target.split(":")
+    start = time.perf_counter()
+    getattr(importlib.import_module(module), func)(*stage.args)
+    return time.perf_counter() - start
+
+
+def run(targets=None, workers=None, force=False, dry_run=False):
+    deps = dependencies()
+    selected = with_ancestors(targets, deps) if targets else set(STAGES)
+    state = load_state()
+    pending = {name: set(deps[name]) & selected for name in selected}
+    report = {}
+    running = {}
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        while pending or running:
+            # Dispatch every stage whose dependencies have finished
+            for name in sorted(n for n, waiting in pending.items() if not waiting):
+                del pending[name]
+                failed = [d for d in deps[name] if report.get(d, {}).get("status") in ("failed", "blocked")]
+                if failed:
+                    report[name] = {"status": "blocked", "seconds": 0.0, "reason": f"{failed[0]} failed"}
+                    _finish(name, pending)
+                    continue
+                if STAGES[name].inputs and not any(os.path.exists(p) for p in STAGES[name].inputs):
+                    report[name] = {"status": "skipped", "seconds": 0.0, "reason": "no inputs yet"}
+                    _finish(name, pending)
+                    continue
+                # Hashed only now, after upstream stages have rewritten their outputs
+                digest = input_hash(STAGES[name])
+                reason = why_run(STAGES[name], digest, state, force)
+                if reason is None or dry_run:
+                    report[name] = {"status": "would run" if reason else "skipped", "seconds": 0.0,
+                                    "reason": reason or "up to date"}
+                    _finish(name, pending)
+                    continue
+                running[pool.submit(execute, name)] = (name, digest, reason)
+                log(f"[PIPELINE] Running {name} ({reason})")
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, digest, reason = running.pop(future)
+                try:
+                    seconds = future.result()
+                    report[name] = {"status": "ran", "seconds": seconds, "reason": reason}
+                    state[name] = {"inputs": digest, "finished": datetime.now().isoformat(timespec="seconds"),
+                                   "seconds": seconds}
+                    save_state(state)
+                except Exception as e:
+                    report[name] = {"status": "failed", "seconds": 0.0, "reason": str(e)}
+                    log(f"[PIPELINE] {name} failed: {e}")
+                _finish(name, pending)
+
+    print_report(report, time.perf_counter() - start)
+    return report
+
+
+def _finish(name, pending):
+    for waiting in pending.values():
+        waiting.discard(name)
+
+
+def print_report(report, wall):
+    print(f"\n{'stage':<28} {'status':<10} {'seconds':>9}  reason")
+    for name, r in sorted(report.items(), key=lambda item: -item[1]["seconds"]):
+        print(f"{name:<28} {r['status']:<10} {r['seconds']:>9.2f}  {r['reason']}")
+    busy = sum(r["seconds"] for r in report.values())
+    print(f"{'total':<28} {'':<10} {wall:>9.2f}  ({busy:.2f}s of stage time)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("targets", nargs="*", help="Stages to bring up to date, with their dependencies (default: all)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--force", action="store_true", help="Run selected stages even if up to date")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would run")
+    parser.add_argument("--list", action="store_true", help="Print stages and their dependencies")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, upstream in dependencies().items():
+            print(f"{name:<28} <- {', '.join(upstream) or '-'}")
+        return
+    unknown = [t for t in args.targets if t not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+    run(args.targets, args.workers, args.force, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import cProfile
+import json
+import os
+import re
+import resource
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+# ───────────── Stage-level profiling ───────────── #
+# Wrap the steps of a script in stage(name) to get one JSON line per stage in
+# PROFILE_DIR/runs.jsonl: seconds, rows/bytes if the stage reports them, peak
+# RSS of the process during the stage and of its largest child (Prophet fits in
+# a cmdstan subprocess). Off unless TLCML_PROFILE is set to a comma-separated
+# mix of:
+#   time      stage records only
+#   cprofile  + a cProfile dump per stage (<run>-<stage>.prof; snakeviz, flameprof)
+#   sample    + a sampled stack profile per stage in folded format
+#             (<run>-<stage>.folded; flamegraph.pl, speedscope, inferno)
+# TLCML_PROFILE_DIR is shared with the callback profiler in metrics.py.
+MODES = {m.strip() for m in os.environ.get("TLCML_PROFILE", "").split(",") if m.strip()}
+ENABLED = bool(MODES)
+PROFILE_DIR = os.environ.get("TLCML_PROFILE_DIR", "profiles")
+SAMPLE_INTERVAL = float(os.environ.get("TLCML_PROFILE_INTERVAL_MS", 5)) / 1000
+RUNS_PATH = os.path.join(PROFILE_DIR, "runs.jsonl")
+
+# Groups the records of one script run; set TLCML_RUN_ID to group several processes
+RUN_ID = os.environ.get("TLCML_RUN_ID") or f"{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}"
+
+_local = threading.local()
+
+
+def _status_kb(field):
+    try:
+        with open("/proc/self/status") as f:
+            return int(re.search(rf"{field}:\s+(\d+) kB", f.read()).group(1))
+    except (OSError, AttributeError):
+        return None
+
+
+def _reset_peak_rss():
+    # Linux: writing 5 to clear_refs resets VmHWM, so each stage sees its own peak
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_kb():
+    return _status_kb("VmHWM") or resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class StackSampler(threading.Thread):
+    # Samples one thread's Python stack every `interval` seconds into folded-stack counts
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True, name="stack-sampler")
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        return self.counts
+
+
+def write_folded(counts, path):
+    with open(path, "w") as f:
+        for stack, count in counts.most_common():
+            f.write(f"{stack} {count}\n")
+
+
+def record(entry):
+    # One JSON line per stage; O_APPEND keeps concurrent writers' lines whole
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(RUNS_PATH, "a") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def record_timing(name, process, seconds, **info):
+    # For spans measured without stage(), e.g. module imports before this module was loaded
+    if ENABLED:
+        record({"run": RUN_ID, "process": process, "stage": name, "seconds": round(seconds, 6),
+                "rss_mb": round((_status_kb("VmRSS") or 0) / 1024, 1), "peak_rss_mb": round(_peak_rss_kb() / 1024, 1),
+                "pid": os.getpid(), **info})
+
+
+def _profile_path(process, name, ext):
+    safe = re.sub(r"[^\w.-]+", "_", f"{process}.{name}")
+    return os.path.join(PROFILE_DIR, f"{RUN_ID}-{safe}.{ext}")
+
+
+@contextmanager
+def stage(name, process=None):
+    # Yields a dict; set "rows" / "bytes" (or anything JSON-able) on it to include them in the record
+    info = {}
+    if not ENABLED:
+        yield info
+        return
+
+    process = process or os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0]
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(info)
+    exact_peak = _reset_peak_rss()
+
+    # Only one cProfile can be active; an outer stage's profile already covers nested ones
+    profiler = cProfile.Profile() if "cprofile" in MODES and len(stack) == 1 else None
+    sampler = StackSampler(threading.get_ident()) if "sample" in MODES else None
+    if sampler:
+        sampler.start()
+    if profiler:
+        profiler.enable()
+    started = time.time()
+    start = time.perf_counter()
+    error = None
+    try:
+        yield info
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        if profiler:
+            profiler.disable()
+        counts = sampler.stop() if sampler else None
+        stack.pop()
+
+        # Nested stages reset the high-water mark, so they hand their peak up to the enclosing stage
+        peak_kb = max(_peak_rss_kb(), info.pop("_peak_kb", 0))
+        if stack:
+            stack[-1]["_peak_kb"] = max(stack[-1].get("_peak_kb", 0), peak_kb)
+
+        entry = {
+            "run": RUN_ID,
+            "process": process,
+            "stage": name,
+            "started": datetime.fromtimestamp(started).isoformat(timespec="milliseconds"),
+            "seconds": round(seconds, 6),
+            "rss_mb": round((_status_kb("VmRSS") or 0) / 1024, 1),
+            "peak_rss_mb": round(peak_kb / 1024, 1),
+            "peak_rss_exact": exact_peak,
+            "child_peak_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+            "pid": os.getpid(),
+            **info,
+        }
+        if error:
+            entry["error"] = error
+        if profiler:
+            entry["cprofile"] = _profile_path(process, name, "prof")
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(entry["cprofile"])
+        if counts is not None:
+            entry["folded"] = _profile_path(process, name, "folded")
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            write_folded(counts, entry["folded"])
+        record(entry)
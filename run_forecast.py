@@ -1,14 +1,30 @@
 import pandas as pd
 import numpy as np
+import json
 from prophet import Prophet
+from prophet.utilities import warm_start_params
 from datetime import datetime
 import os
 from dateutil.relativedelta import relativedelta
 
+import artifacts
+import catalog
+import profiling
+
 INPUT_PARQUET = "data/forecast_input.parquet"
 OUTPUT_PARQUET = "data/forecast_output.parquet"
 FITTED_PARQUET = "data/forecast_fitted.parquet"
 
+# Hourly mode: trip counts per pickup hour from update_ingest.py
+HOURLY_INPUT_PARQUET = "data/forecast_input_hourly.parquet"
+HOURLY_OUTPUT_PARQUET = "data/forecast_output_hourly.parquet"
+HOURLY_FITTED_PARQUET = "data/forecast_fitted_hourly.parquet"
+HOURLY_PARAMS_JSON = "data/forecast_hourly_params.json"
+
+# Days of hourly history to fit on (8760 points/year); fitted values are kept for the last HOURLY_FITTED_DAYS
+HOURLY_HISTORY_DAYS = int(os.environ.get("TLCML_HOURLY_HISTORY_DAYS", 365))
+HOURLY_FITTED_DAYS = 62
+
 def log(msg):
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
 
@@ -25,15 +41,50 @@ def get_next_forecast_window(df):
     forecast_end = (forecast_start + relativedelta(months=1)) - pd.Timedelta(days=1)
     return forecast_start, forecast_end
 
+def make_model():
+    model = Prophet(
+        daily_seasonality=False,
+        weekly_seasonality=True,
+        yearly_seasonality=True,
+        changepoint_prior_scale=0.1
+    )
+    return model
+
+def make_hourly_model(history_days):
+    # Intraday shape differs between workdays and weekends, so daily seasonality is conditional;
+    # yearly seasonality needs two years of history to be told apart from trend
+    model = Prophet(
+        daily_seasonality=False,
+        weekly_seasonality=False,
+        yearly_seasonality=history_days >= 730,
+        changepoint_prior_scale=0.1
+    )
+    model.add_seasonality(name="daily_weekday", period=1, fourier_order=12, condition_name="weekday")
+    model.add_seasonality(name="daily_weekend", period=1, fourier_order=12, condition_name="weekend")
+    model.add_seasonality(name="weekly", period=7, fourier_order=6)
+    return model
+
+def add_hourly_conditions(df):
+    df["weekend"] = df["ds"].dt.dayofweek >= 5
+    df["weekday"] = ~df["weekend"]
+    return df
+
+def load_training(path):
+    df = pd.read_parquet(path).rename(columns={"trip_date": "ds", "total_rides": "y"})
+    df["ds"] = pd.to_datetime(df["ds"]).dt.normalize()
+    df = df.dropna(subset=["ds", "y"]).drop_duplicates("ds").sort_values("ds")
+    return df[df["ds"] >= "2020-03-01"]  # Enforce start date for seasonality stability
+
 def forecast_and_save():
-    if not os.path.exists(INPUT_PARQUET):
+    # Lock-free read of one consistent generation; the fit runs outside the writer lock
+    paths = artifacts.latest([INPUT_PARQUET, OUTPUT_PARQUET])
+    if not os.path.exists(paths[INPUT_PARQUET]):
         log("[ERROR] Input file not found.")
         return
 
-    df = pd.read_parquet(INPUT_PARQUET).rename(columns={"trip_date": "ds", "total_rides": "y"})
-    df["ds"] = pd.to_datetime(df["ds"]).dt.normalize()
-    df = df.dropna(subset=["ds", "y"]).drop_duplicates("ds").sort_values("ds")
-    df = df[df["ds"] >= "2020-03-01"]  # Enforce start date for seasonality stability
+    with profiling.stage("load", "run_forecast") as stage:
+        df = load_training(paths[INPUT_PARQUET])
+        stage.update(rows=len(df), bytes=os.path.getsize(paths[INPUT_PARQUET]))
 
     log(f"[DEBUG] Training from {df['ds'].min().date()} to {df['ds'].max().date()} — {len(df)} rows")
 
@@ -44,28 +95,24 @@ def forecast_and_save():
     # 🔒 Skip if forecast already covers this month
     if os.path.exists(OUTPUT_PARQUET):
         try:
-            df_forecast = pd.read_parquet(OUTPUT_PARQUET)
-            df_forecast["ds"] = pd.to_datetime(df_forecast["ds"])
-            latest_forecast_date = df_forecast["ds"].max()
-            if latest_forecast_date >= forecast_end:
+            latest_forecast_date = catalog.max_date(OUTPUT_PARQUET, "ds")
+            if latest_forecast_date is not None and latest_forecast_date >= forecast_end:
                 log(f"[SKIP] Forecast already up to date through {latest_forecast_date.date()}")
                 return
         except Exception as e:
             log(f"[WARN] Could not read existing forecast file: {e} — proceeding with forecast.")
 
     # ─── Forecast model ───
-    model = Prophet(
-        daily_seasonality=False,
-        weekly_seasonality=True,
-        yearly_seasonality=True,
-        changepoint_prior_scale=0.1
-    )
-    model.add_seasonality(name="daily", period=1, fourier_order=5)
-    model.fit(df[["ds", "y"]])
+    with profiling.stage("fit", "run_forecast") as stage:
+        model = make_model()
+        model.fit(df[["ds", "y"]])
+        stage["rows"] = len(df)
 
     # ─── Forecast next month ───
     future_df = pd.DataFrame({"ds": pd.date_range(start=forecast_start, end=forecast_end, freq="D")})
-    forecast = model.predict(future_df)
+    with profiling.stage("predict", "run_forecast") as stage:
+        forecast = model.predict(future_df)
+        stage["rows"] = len(future_df)
 
     forecast_df = forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]].copy()
     forecast_df[["yhat", "yhat_lower", "yhat_upper"]] = forecast_df[
@@ -73,18 +120,127 @@ def forecast_and_save():
     ].clip(lower=0)
     forecast_df["type"] = "forecast"
 
-    temp_path = OUTPUT_PARQUET + ".tmp"
-    forecast_df.to_parquet(temp_path, index=False)
-    os.replace(temp_path, OUTPUT_PARQUET)
-    log(f"[DONE] Forecasted {len(forecast_df)} days for {forecast_start.strftime('%B %Y')}")
-
-    # ─── Save fitted values for entire training range ───
-    fitted = model.predict(df[["ds"]])
+    # ─── Fitted values for entire training range ───
+    with profiling.stage("predict_fitted", "run_forecast") as stage:
+        fitted = model.predict(df[["ds"]])
+        stage["rows"] = len(df)
     fitted_df = fitted[["ds", "yhat", "yhat_lower", "yhat_upper"]].copy()
     fitted_df["type"] = "fitted"
 
-    fitted_df.to_parquet(FITTED_PARQUET, index=False)
+    # Forecast and fitted values are published together as one generation
+    with profiling.stage("publish", "run_forecast") as stage:
+        with artifacts.publish(producer="run_forecast", sources=[INPUT_PARQUET]) as pub:
+            forecast_df.to_parquet(pub.path(OUTPUT_PARQUET), index=False)
+            fitted_df.to_parquet(pub.path(FITTED_PARQUET), index=False)
+        stage.update(rows=len(forecast_df) + len(fitted_df),
+                     bytes=os.path.getsize(OUTPUT_PARQUET) + os.path.getsize(FITTED_PARQUET))
+    log(f"[DONE] Forecasted {len(forecast_df)} days for {forecast_start.strftime('%B %Y')} (generation {pub.generation})")
     log(f"[DONE] Saved fitted values for training range ({df['ds'].min().date()} to {df['ds'].max().date()})")
 
+def load_hourly_training(path, history_days=HOURLY_HISTORY_DAYS):
+    # Windowed: only the last history_days days are fitted
+    df = pd.read_parquet(path).rename(columns={"trip_hour": "ds", "total_rides": "y"})
+    df["ds"] = pd.to_datetime(df["ds"]).dt.floor("h")
+    df = df.dropna(subset=["ds", "y"]).drop_duplicates("ds").sort_values("ds")
+    df = df[df["ds"] >= max(df["ds"].max() - pd.Timedelta(days=history_days), pd.Timestamp("2020-03-01"))]
+    return add_hourly_conditions(df.reset_index(drop=True))
+
+def load_warm_start(config):
+    # Previous fit's parameters, only if they came from a model with the same seasonality setup
+    try:
+        with open(HOURLY_PARAMS_JSON) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if saved.get("config") != config:
+        return None
+    return {k: np.asarray(v) if isinstance(v, list) else v for k, v in saved["params"].items()}
+
+def fit_hourly(df, history_days, init=None):
+    model = make_hourly_model(history_days)
+    if init is not None:
+        try:
+            return model.fit(df[["ds", "y", "weekday", "weekend"]], init=init), True
+        except Exception as e:
+            log(f"[WARN] Warm start rejected ({e}) — fitting from scratch.")
+            model = make_hourly_model(history_days)
+    return model.fit(df[["ds", "y", "weekday", "weekend"]]), False
+
+def forecast_hourly_and_save(history_days=HOURLY_HISTORY_DAYS):
+    paths = artifacts.latest([HOURLY_INPUT_PARQUET])
+    if not os.path.exists(paths[HOURLY_INPUT_PARQUET]):
+        log("[ERROR] Hourly input file not found — run update_ingest.py --backfill-hourly first.")
+        return
+
+    with profiling.stage("load_hourly", "run_forecast") as stage:
+        df = load_hourly_training(paths[HOURLY_INPUT_PARQUET], history_days)
+        stage.update(rows=len(df), bytes=os.path.getsize(paths[HOURLY_INPUT_PARQUET]))
+
+    log(f"[DEBUG] Hourly training from {df['ds'].min()} to {df['ds'].max()} — {len(df)} rows")
+
+    # Same month rule as the daily forecast, applied to the days present in the hourly data
+    forecast_start, forecast_end = get_next_forecast_window(df[["ds"]].assign(ds=df["ds"].dt.normalize()).drop_duplicates())
+    if forecast_start is None:
+        return
+
+    if os.path.exists(HOURLY_OUTPUT_PARQUET):
+        try:
+            latest_forecast_hour = catalog.max_date(HOURLY_OUTPUT_PARQUET, "ds")
+            if latest_forecast_hour is not None and latest_forecast_hour.normalize() >= forecast_end:
+                log(f"[SKIP] Hourly forecast already up to date through {latest_forecast_hour}")
+                return
+        except Exception as e:
+            log(f"[WARN] Could not read existing hourly forecast file: {e} — proceeding with forecast.")
+
+    # ─── Hourly model, warm-started from the last saved fit (see benchmarks/hourly_forecast.py) ───
+    config = {"yearly": history_days >= 730, "daily_fourier": 12, "weekly_fourier": 6}
+    with profiling.stage("fit_hourly", "run_forecast") as stage:
+        model, warm = fit_hourly(df, history_days, load_warm_start(config))
+        stage.update(rows=len(df), warm_start=warm)
+
+    # ─── Forecast next month, hour by hour ───
+    future_df = add_hourly_conditions(pd.DataFrame({"ds": pd.date_range(
+        start=forecast_start, end=forecast_end + pd.Timedelta(hours=23), freq="h")}))
+    with profiling.stage("predict_hourly", "run_forecast") as stage:
+        forecast = model.predict(future_df)
+        stage["rows"] = len(future_df)
+
+    forecast_df = forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]].copy()
+    forecast_df[["yhat", "yhat_lower", "yhat_upper"]] = forecast_df[
+        ["yhat", "yhat_lower", "yhat_upper"]
+    ].clip(lower=0)
+    forecast_df["type"] = "forecast"
+
+    # ─── Fitted values for the recent part of the window ───
+    recent = df[df["ds"] > df["ds"].max() - pd.Timedelta(days=HOURLY_FITTED_DAYS)]
+    with profiling.stage("predict_fitted_hourly", "run_forecast") as stage:
+        fitted = model.predict(recent[["ds", "weekday", "weekend"]])
+        stage["rows"] = len(recent)
+    fitted_df = fitted[["ds", "yhat", "yhat_lower", "yhat_upper"]].copy()
+    fitted_df["type"] = "fitted"
+
+    params = {k: v.tolist() if isinstance(v, np.ndarray) else float(v) for k, v in warm_start_params(model).items()}
+    with profiling.stage("publish_hourly", "run_forecast") as stage:
+        with artifacts.publish(producer="run_forecast", sources=[HOURLY_INPUT_PARQUET]) as pub:
+            forecast_df.to_parquet(pub.path(HOURLY_OUTPUT_PARQUET), index=False)
+            fitted_df.to_parquet(pub.path(HOURLY_FITTED_PARQUET), index=False)
+            with open(pub.path(HOURLY_PARAMS_JSON), "w") as f:
+                json.dump({"config": config, "history_days": history_days, "params": params}, f)
+        stage["rows"] = len(forecast_df) + len(fitted_df)
+    log(f"[DONE] Forecasted {len(forecast_df)} hours for {forecast_start.strftime('%B %Y')} "
+        f"({'warm' if warm else 'cold'} start, generation {pub.generation})")
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hourly", action="store_true", help="Forecast hourly trip counts instead of daily")
+    parser.add_argument("--history-days", type=int, default=HOURLY_HISTORY_DAYS,
+                        help="Days of hourly history to fit on (with --hourly)")
+    args = parser.parse_args()
+    if args.hourly:
+        forecast_hourly_and_save(args.history_days)
+    else:
+        forecast_and_save()
+
 if __name__ == "__main__":
-    forecast_and_save()
+    main()
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+# Modules live at the repo root and are imported as top-level names, as the scripts do
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+
+@pytest.fixture
+def scratch(tmp_path, monkeypatch):
+    # Fresh working directory with an empty data/; every module writes to relative data/ paths
+    import catalog
+    from visuals import figure_cache
+
+    (tmp_path / "data").mkdir()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(catalog, "_loaded", None)
+    monkeypatch.setattr(figure_cache, "_file_hashes", {})
+    return tmp_path
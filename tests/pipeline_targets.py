@@ -0,0 +1,31 @@
+import os
+
+# Stage targets for tests/test_pipeline.py; each appends its name to data/calls.log
+
+
+def _log(name):
+    with open("data/calls.log", "a") as f:
+        f.write(name + "\n")
+
+
+def copy(src, dst):
+    _log(f"copy {dst}")
+    with open(src) as f, open(dst, "w") as out:
+        out.write(f.read())
+
+
+def fail(*args):
+    _log("fail")
+    raise RuntimeError("stage broke")
+
+
+def touch(path):
+    _log(f"touch {path}")
+    open(path, "w").close()
+
+
+def calls():
+    if not os.path.exists("data/calls.log"):
+        return []
+    with open("data/calls.log") as f:
+        return f.read().split()
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from visuals.aggregate import apply_view
+
+DATES = pd.date_range("2024-01-01", periods=56, freq="D")
+
+
+def _labels(dates):
+    return dates.strftime("%Y-%m-%d").tolist()
+
+
+def _band():
+    upper, lower = np.arange(56.0) + 10, np.arange(56.0)
+    return {"type": "scatter", "fill": "toself", "x": _labels(DATES) + _labels(DATES[::-1]),
+            "y": np.concatenate([upper, lower[::-1]]).tolist()}
+
+
+def test_series_aggregated_to_weekly_means():
+    fig = {"data": [{"type": "scatter", "x": _labels(DATES), "y": list(range(56))}]}
+    trace = apply_view(fig, "series", "v1", grain="W")["data"][0]
+    assert len(trace["x"]) == 8 and trace["x"][0] == "2024-01-01"
+
+
+def test_band_halves_aggregated_and_remirrored():
+    trace = apply_view({"data": [_band()]}, "band", "v1", grain="W")["data"][0]
+    x = trace["x"]
+    assert len(x) == 16 and x[:8] == x[8:][::-1]
+
+
+def test_unmirrored_polygon_passed_through():
+    shape = {"type": "scatter", "fill": "toself", "x": _labels(DATES[[0, 10, 20, 5]]), "y": [0, 5, 0, 3]}
+    assert apply_view({"data": [shape]}, "shape", "v1", grain="W")["data"][0] is shape
+
+
+def test_unsorted_line_passed_through():
+    line = {"type": "scatter", "x": _labels(DATES[[3, 1, 2]]), "y": [1, 2, 3]}
+    assert apply_view({"data": [line]}, "line", "v1", grain="W")["data"][0] is line
@@ -0,0 +1,62 @@
+import os
+
+import pandas as pd
+import pytest
+
+import artifacts
+import catalog
+
+INPUT = "data/forecast_input.parquet"
+OUTPUT = "data/forecast_output.parquet"
+
+
+def _write(path, n):
+    pd.DataFrame({"ds": pd.date_range("2024-01-01", periods=n), "y": range(n)}).to_parquet(path, index=False)
+
+
+def test_publish_creates_generation_and_mirror(scratch):
+    with artifacts.publish(producer="test", sources=[]) as pub:
+        _write(pub.path(OUTPUT), 3)
+    assert artifacts.current_generation() == 1
+    resolved = artifacts.read_latest(OUTPUT)
+    assert resolved == os.path.join(artifacts.generation_dir(1), "forecast_output.parquet")
+    assert len(pd.read_parquet(OUTPUT)) == 3
+    assert catalog.entry(OUTPUT)["generation"] == 1
+    assert catalog.entry(OUTPUT)["producer"] == "test"
+
+
+def test_untouched_artifacts_carry_over(scratch):
+    with artifacts.publish() as pub:
+        _write(pub.path(INPUT), 5)
+    with artifacts.publish() as pub:
+        _write(pub.path(OUTPUT), 2)
+    latest = artifacts.latest([INPUT, OUTPUT])
+    assert all(os.path.dirname(p) == artifacts.generation_dir(2) for p in latest.values())
+    assert len(pd.read_parquet(latest[INPUT])) == 5
+
+
+def test_failed_publish_leaves_current_generation(scratch):
+    with artifacts.publish() as pub:
+        _write(pub.path(OUTPUT), 3)
+    with pytest.raises(RuntimeError):
+        with artifacts.publish() as pub:
+            _write(pub.path(OUTPUT), 7)
+            raise RuntimeError("writer crashed")
+    assert artifacts.current_generation() == 1
+    assert len(pd.read_parquet(artifacts.read_latest(OUTPUT))) == 3
+    assert not [n for n in os.listdir(artifacts.ARTIFACT_DIR) if n.startswith(".gen-")]
+
+
+def test_publish_without_writes_is_a_no_op(scratch):
+    with artifacts.publish() as pub:
+        pub.existing(OUTPUT)
+    assert artifacts.current_generation() is None
+
+
+def test_old_generations_pruned(scratch):
+    for n in range(artifacts.KEEP_GENERATIONS + 2):
+        with artifacts.publish() as pub:
+            _write(pub.path(OUTPUT), n + 1)
+    generations = sorted(n for n in os.listdir(artifacts.ARTIFACT_DIR) if n.startswith("gen-"))
+    assert len(generations) == artifacts.KEEP_GENERATIONS
+    assert generations[-1] == os.path.basename(artifacts.generation_dir(artifacts.KEEP_GENERATIONS + 2))
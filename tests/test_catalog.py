@@ -0,0 +1,76 @@
+import os
+
+import pandas as pd
+
+import catalog
+
+
+def _frame(days):
+    return pd.DataFrame({"ds": pd.date_range("2024-01-01", periods=days), "y": range(days)})
+
+
+def test_record_describes_parquet(scratch):
+    path = "data/daily.parquet"
+    _frame(10).to_parquet(path, index=False)
+    e = catalog.record(path, sources=[], producer="test")
+    assert e["rows"] == 10
+    assert e["date_column"] == "ds"
+    assert e["min_date"].startswith("2024-01-01") and e["max_date"].startswith("2024-01-10")
+    assert catalog.max_date(path) == pd.Timestamp("2024-01-10")
+
+
+def test_record_describes_csv(scratch):
+    path = "data/daily.csv"
+    _frame(4).to_csv(path, index=False)
+    e = catalog.record(path)
+    assert e["rows"] == 4 and e["max_date"].startswith("2024-01-04")
+
+
+def test_hash_follows_content(scratch):
+    a, b = "data/a.parquet", "data/b.parquet"
+    _frame(5).to_parquet(a, index=False)
+    _frame(5).to_parquet(b, index=False)
+    assert catalog.record(a)["hash"] == catalog.record(b)["hash"]
+    _frame(6).to_parquet(b, index=False)
+    assert catalog.content_hash(a) != catalog.content_hash(b)
+
+
+def test_entry_goes_stale_when_file_changes(scratch):
+    path = "data/daily.parquet"
+    _frame(5).to_parquet(path, index=False)
+    catalog.record(path)
+    _frame(8).to_parquet(path, index=False)
+    assert catalog.entry(path) is None
+    assert catalog.stale()[path] == "modified outside the pipeline"
+    # max_date re-records a stale entry rather than trusting it
+    assert catalog.max_date(path) == pd.Timestamp("2024-01-08")
+
+
+def test_changed_source_is_reported(scratch):
+    source, derived = "data/source.parquet", "data/derived.parquet"
+    _frame(5).to_parquet(source, index=False)
+    catalog.record(source)
+    _frame(5).to_parquet(derived, index=False)
+    catalog.record(derived, sources=[source])
+    assert derived not in catalog.stale()
+    _frame(9).to_parquet(source, index=False)
+    catalog.record(source)
+    assert catalog.stale()[derived].startswith("source changed")
+
+
+def test_append_extends_entry_without_rescan(scratch):
+    path = "data/rows.csv"
+    _frame(3).to_csv(path, index=False)
+    before = catalog.record(path)
+    extra = pd.DataFrame({"ds": pd.to_datetime(["2024-02-01"]), "y": [99]})
+    extra.to_csv(path, mode="a", header=False, index=False)
+    e = catalog.record(path, frame=extra, extends=before)
+    assert e["rows"] == 4 and e["max_date"].startswith("2024-02-01")
+
+
+def test_missing_file_is_stale(scratch):
+    path = "data/gone.parquet"
+    _frame(2).to_parquet(path, index=False)
+    catalog.record(path)
+    os.remove(path)
+    assert catalog.stale()[path] == "missing"
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.cluster_stats import apply_composite_z, synthetic
+from visuals.cluster_stats import composite_z, interval_means
+
+
+def test_composite_z_matches_apply():
+    clusters, rides = synthetic(20_000, 25)
+    assert np.allclose(composite_z(clusters, rides), apply_composite_z(clusters, rides), equal_nan=True)
+
+
+def test_composite_z_unsorted_rides():
+    clusters, rides = synthetic(5_000, 10)
+    shuffled = rides.sample(frac=1, random_state=1)
+    assert np.allclose(composite_z(clusters, shuffled), apply_composite_z(clusters, rides), equal_nan=True)
+
+
+def test_interval_means_inclusive_bounds_and_nan():
+    times = pd.to_datetime(["2022-01-01", "2022-01-02", "2022-01-03", "2022-01-05"])
+    values = np.array([[1.0, 10.0], [np.nan, 20.0], [3.0, np.nan], [5.0, 50.0]])
+    means = interval_means(times, values, ["2022-01-01", "2022-01-04"], ["2022-01-03", "2022-01-05"])
+    # NaNs are skipped per column, like pandas' mean
+    assert np.allclose(means, [[2.0, 15.0], [5.0, 50.0]])
+
+
+def test_interval_means_empty_window_is_nan():
+    times = pd.to_datetime(["2022-01-01", "2022-01-10"])
+    means = interval_means(times, np.array([1.0, 2.0]), ["2022-01-03"], ["2022-01-05"])
+    assert np.isnan(means).all()
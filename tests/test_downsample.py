@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+from visuals.downsample import GL_THRESHOLD, MAX_POINTS, _render_trace, decode_array, lttb_indices, render_figure, typed_array
+
+
+def _series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.arange(n, dtype=float), rng.normal(size=n).cumsum()
+
+
+def test_lttb_keeps_endpoints_and_size():
+    x, y = _series(10_000)
+    idx = lttb_indices(x, y, 500)
+    assert len(idx) == 500
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert (np.diff(idx) > 0).all()
+
+
+def test_lttb_keeps_spike():
+    x, y = np.arange(1000, dtype=float), np.zeros(1000)
+    y[437] = 100.0
+    assert 437 in lttb_indices(x, y, 50)
+
+
+def test_lttb_short_input_unchanged():
+    x, y = _series(100)
+    assert (lttb_indices(x, y, 500) == np.arange(100)).all()
+
+
+def test_short_trace_untouched():
+    trace = {"type": "scatter", "x": list(range(10)), "y": list(range(10))}
+    assert _render_trace(trace, None, 1000) is trace
+
+
+def test_long_trace_reduced_with_point_arrays():
+    x, y = _series(20_000)
+    trace = {"type": "scatter", "x": typed_array(x), "y": typed_array(y), "customdata": list(range(20_000))}
+    rendered = _render_trace(trace, None, 1000)
+    sent_x = decode_array(rendered["x"])
+    assert len(sent_x) == 1000
+    # customdata stays aligned with x
+    assert rendered["customdata"] == sent_x.astype(int).tolist()
+    assert rendered["type"] == "scatter"
+
+
+def test_webgl_follows_points_sent_with_default_budget():
+    dates = pd.date_range("2020-01-01", periods=50_000, freq="h")
+    y = np.random.default_rng(0).normal(size=len(dates))
+    trace = {"type": "scatter", "x": dates.strftime("%Y-%m-%d %H:%M:%S").tolist(), "y": y.tolist()}
+    fig = {"data": [trace]}
+    # Full view: about MAX_POINTS sent, SVG is fine
+    assert render_figure(fig, max_points=MAX_POINTS)["data"][0]["type"] == "scatter"
+    # Zoomed: visible window plus padding each side, about 3 x MAX_POINTS sent
+    zoomed = render_figure(fig, ("2022-01-01", "2022-03-01"), max_points=MAX_POINTS)["data"][0]
+    assert len(zoomed["x"]) > GL_THRESHOLD and zoomed["type"] == "scattergl"
+
+
+def test_webgl_for_long_traces_sent_whole():
+    x, y = _series(3 * MAX_POINTS)
+    # Not a mirrored polygon, so it can't be reduced and every point is sent
+    trace = {"type": "scatter", "fill": "toself", "x": typed_array(x), "y": typed_array(y)}
+    rendered = _render_trace(trace, None, MAX_POINTS)
+    assert len(decode_array(rendered["x"])) == len(x) and rendered["type"] == "scattergl"
+    assert trace["type"] == "scatter"
+
+
+def test_ci_polygon_stays_symmetric():
+    x, y = _series(5_000)
+    trace = {"type": "scatter", "fill": "toself", "x": np.concatenate([x, x[::-1]]).tolist(),
+             "y": np.concatenate([y + 1, (y - 1)[::-1]]).tolist()}
+    sent = np.asarray(_render_trace(trace, None, 500)["x"])
+    h = len(sent) // 2
+    assert len(sent) == 1000 and (sent[:h] == sent[h:][::-1]).all()
+
+
+def test_zoom_keeps_detail_in_window():
+    dates = pd.date_range("2020-01-01", periods=50_000, freq="h")
+    y = np.random.default_rng(0).normal(size=len(dates))
+    fig = {"data": [{"type": "scatter", "x": dates.strftime("%Y-%m-%d %H:%M:%S").tolist(), "y": y.tolist()}]}
+    window = ("2022-01-01", "2022-01-03")
+    sent = pd.to_datetime(render_figure(fig, window, max_points=1000)["data"][0]["x"])
+    inside = (sent >= window[0]) & (sent <= window[1])
+    # Two days of hourly points fit the budget, so all of them are sent
+    assert inside.sum() == ((dates >= window[0]) & (dates <= window[1])).sum()
@@ -0,0 +1,67 @@
+import pytest
+
+import pipeline
+from pipeline import Stage
+from tests.pipeline_targets import calls
+
+
+@pytest.fixture
+def stages(scratch, monkeypatch):
+    # raw -> a -> b, and c from raw failing; workers are forked, so they see the patched table
+    table = {s.name: s for s in [
+        Stage("a", "tests.pipeline_targets:copy", inputs=["data/raw.txt"], outputs=["data/a.txt"],
+              args=("data/raw.txt", "data/a.txt")),
+        Stage("b", "tests.pipeline_targets:copy", inputs=["data/a.txt"], outputs=["data/b.txt"],
+              args=("data/a.txt", "data/b.txt")),
+        Stage("c", "tests.pipeline_targets:fail", inputs=["data/raw.txt"], outputs=["data/c.txt"]),
+        Stage("d", "tests.pipeline_targets:touch", inputs=["data/c.txt"], outputs=["data/d.txt"],
+              args=("data/d.txt",)),
+    ]}
+    monkeypatch.setattr(pipeline, "STAGES", table)
+    (scratch / "data" / "raw.txt").write_text("v1")
+    return table
+
+
+def test_dependencies_follow_outputs(stages):
+    deps = pipeline.dependencies()
+    assert deps == {"a": [], "b": ["a"], "c": [], "d": ["c"]}
+    assert pipeline.with_ancestors(["b"], deps) == {"a", "b"}
+
+
+def test_runs_then_skips_unchanged(stages):
+    report = pipeline.run(["b"], workers=1)
+    assert [report[n]["status"] for n in ("a", "b")] == ["ran", "ran"]
+    assert calls() == ["copy", "data/a.txt", "copy", "data/b.txt"]
+
+    report = pipeline.run(["b"], workers=1)
+    assert {r["status"] for r in report.values()} == {"skipped"}
+
+
+def test_changed_input_reruns_downstream(stages, scratch):
+    pipeline.run(["b"], workers=1)
+    (scratch / "data" / "raw.txt").write_text("v2")
+    report = pipeline.run(["b"], workers=1)
+    assert report["a"]["reason"] == "inputs changed"
+    assert report["b"]["status"] == "ran"
+    assert (scratch / "data" / "b.txt").read_text() == "v2"
+
+
+def test_missing_output_reruns(stages, scratch):
+    pipeline.run(["a"], workers=1)
+    (scratch / "data" / "a.txt").unlink()
+    assert pipeline.run(["a"], workers=1)["a"]["reason"] == "missing data/a.txt"
+
+
+def test_failure_blocks_downstream(stages):
+    # d's input doesn't exist yet, so it would be skipped; seed it to check blocking wins
+    open("data/c.txt", "w").close()
+    report = pipeline.run(["d"], workers=1)
+    assert report["c"]["status"] == "failed"
+    assert report["d"] == {"status": "blocked", "seconds": 0.0, "reason": "c failed"}
+    assert "touch" not in calls()
+
+
+def test_dry_run_changes_nothing(stages):
+    report = pipeline.run(["b"], workers=1, dry_run=True)
+    assert report["a"]["status"] == "would run"
+    assert calls() == []
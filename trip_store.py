@@ -0,0 +1,146 @@
+import argparse
+import bisect
+import os
+import time
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+import catalog
+
+# ───────────── Time-sorted anomaly trip store ───────────── #
+# Every anomalous trip in one parquet file, sorted by pickup time and written
+# in row groups of ROW_GROUP_ROWS. Sorting makes each row group's min/max
+# pickup_datetime (kept in the footer) a tight, non-overlapping zone map, so a
+# date-window query binary-searches the zone map and reads only the row groups
+# that overlap the window. Backs the cluster drill-down on the Anomalies tab.
+#   python trip_store.py                       # rebuild from the anomaly pipeline output
+#   python trip_store.py --query 2022-02-10 2022-02-20
+STORE_PATH = "data/anomaly_trips.parquet"
+
+# Chosen with benchmarks/trip_store.py (10M trips over five years): a week's
+# window reads one or two row groups in ~7 ms and the zone map parses in ~3 ms;
+# 16k-row groups make the footer 4x slower to open, 256k+ read mostly unused rows
+ROW_GROUP_ROWS = 65_536
+SAMPLE_ROWS = 25
+
+COLUMNS = ["pickup_datetime", "PULocationID", "DOLocationID", "fare_amount", "trip_distance", "trip_duration"]
+
+_store = None
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+# ───────────── Building ───────────── #
+def default_source():
+    # The per-month trip parquets when the anomaly pipeline has run here, else the flat CSV
+    from anomaly_pipeline import ANOMALY_DIR, LEGACY_CSV, month_parts
+
+    parts = month_parts()
+    if parts:
+        return f"read_parquet('{ANOMALY_DIR}/month=*/part.parquet')", parts
+    if os.path.exists(LEGACY_CSV):
+        return f"read_csv('{LEGACY_CSV}', auto_detect=true)", [LEGACY_CSV]
+    return None, []
+
+
+def build(source=None, sources=None, path=STORE_PATH, row_group_rows=ROW_GROUP_ROWS):
+    # source is any DuckDB relation with a pickup_datetime column; DuckDB sorts out of core
+    import duckdb  # build only; the app just reads row groups
+
+    if source is None:
+        source, sources = default_source()
+        if source is None:
+            log("[SKIP] No anomaly output to store yet (run anomaly_pipeline.py)")
+            return 0
+    con = duckdb.connect()
+    available = {row[0] for row in con.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()}
+    columns = ", ".join(c for c in COLUMNS if c in available)
+    tmp = path + ".tmp"
+    con.execute(f"""
+        COPY (SELECT {columns} FROM {source} ORDER BY pickup_datetime)
+        TO '{tmp}' (FORMAT PARQUET, ROW_GROUP_SIZE {row_group_rows}, COMPRESSION ZSTD)
+    """)
+    con.close()
+    os.replace(tmp, path)
+    catalog.record(path, sources=sources, producer="trip_store", date_column="pickup_datetime")
+    meta = pq.read_metadata(path)
+    log(f"[STORE] {meta.num_rows:,} trips in {meta.num_row_groups} row groups -> {path}")
+    return meta.num_rows
+
+
+# ───────────── Queries ───────────── #
+def _open(path=STORE_PATH):
+    # (file, row-group mins, row-group maxs), re-read only when the store is replaced
+    global _store
+    st = os.stat(path)
+    stamp = (path, st.st_mtime_ns, st.st_size)
+    if _store is None or _store[0] != stamp:
+        pf = pq.ParquetFile(path)
+        col = pf.schema_arrow.get_field_index("pickup_datetime")
+        mins, maxs = [], []
+        for i in range(pf.metadata.num_row_groups):
+            stats = pf.metadata.row_group(i).column(col).statistics
+            mins.append(pd.Timestamp(stats.min))
+            maxs.append(pd.Timestamp(stats.max))
+        _store = (stamp, pf, mins, maxs)
+    return _store[1:]
+
+
+def row_groups(start, end, path=STORE_PATH):
+    # Row groups whose [min, max] pickup time overlaps [start, end)
+    _, mins, maxs = _open(path)
+    return range(bisect.bisect_left(maxs, start), bisect.bisect_left(mins, end))
+
+
+def query(start, end, columns=None, path=STORE_PATH):
+    # Trips with start <= pickup_datetime < end; returns (frame, row groups read)
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    pf, _, _ = _open(path)
+    groups = row_groups(start, end, path)
+    table = pf.read_row_groups(list(groups), columns=columns)
+    times = table.column("pickup_datetime")
+    mask = pc.and_(pc.greater_equal(times, pa.scalar(start.to_pydatetime(), type=times.type)),
+                   pc.less(times, pa.scalar(end.to_pydatetime(), type=times.type)))
+    return table.filter(mask).to_pandas(), len(groups)
+
+
+def drilldown(start, end, sample=SAMPLE_ROWS, path=STORE_PATH):
+    # Summary and a reproducible random sample of the trips in a cluster's date range (end inclusive)
+    began = time.perf_counter()
+    trips, groups = query(start, pd.Timestamp(end) + pd.Timedelta(days=1), path=path)
+    numeric = [c for c in ("fare_amount", "trip_distance", "trip_duration") if c in trips]
+    summary = {
+        "trips": len(trips),
+        "days": int(trips["pickup_datetime"].dt.normalize().nunique()) if len(trips) else 0,
+        "median": trips[numeric].median().round(2).to_dict() if len(trips) else {},
+        "row_groups": groups,
+        "row_groups_total": len(_open(path)[1]),
+    }
+    if "PULocationID" in trips and len(trips):
+        summary["top_pickup_zones"] = trips["PULocationID"].value_counts().head(5).to_dict()
+    rows = trips.sample(min(sample, len(trips)), random_state=0).sort_values("pickup_datetime")
+    summary["seconds"] = time.perf_counter() - began
+    return summary, rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--query", nargs=2, metavar=("START", "END"), help="Summarize trips from START to END (inclusive)")
+    parser.add_argument("--row-group-rows", type=int, default=ROW_GROUP_ROWS)
+    args = parser.parse_args()
+    if args.query:
+        summary, rows = drilldown(*args.query)
+        print(summary)
+        print(rows.to_string(index=False))
+    else:
+        build(row_group_rows=args.row_group_rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,20 @@ import os
 import requests
 import pandas as pd
 import duckdb
+import pyarrow.parquet as pq
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 
+import artifacts
+import catalog
+import profiling
+
 # Constants
 TLC_BASE_URL = "https://d37ci6vzurychx.cloudfront.net/trip-data/"
 RAW_DIR = "data/raw/"
 INPUT_PARQUET = "data/forecast_input.parquet"
 OUTPUT_PARQUET = "data/forecast_output.parquet"
+HOURLY_INPUT_PARQUET = "data/forecast_input_hourly.parquet"
 
 def log(msg):
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
@@ -20,8 +26,8 @@ def ensure_dir(path):
 def get_latest_month_from_parquet():
     if not os.path.exists(INPUT_PARQUET):
         raise FileNotFoundError("Input Parquet does not exist — can't determine next month.")
-    df = pd.read_parquet(INPUT_PARQUET)
-    latest_date = pd.to_datetime(df["trip_date"]).max()
+    # Catalog lookup; only a file written outside the pipeline costs a footer read
+    latest_date = catalog.max_date(INPUT_PARQUET, "trip_date")
     return (latest_date + pd.offsets.MonthBegin(1)).strftime("%Y-%m")
 
 def check_remote_parquet_exists(month_str):
@@ -50,65 +56,133 @@ def download_parquet(month_str):
     else:
         raise Exception(f"[ERROR] Could not download {url}. Status code {resp.status_code}")
 
-def summarize_month_to_df(parquet_path, month_str):
-    y, m = month_str.split("-")
+def summarize_month_hourly(parquet_path, month_str):
+    # Trips in the month bucketed by pickup hour; daily totals are summed from these
     con = duckdb.connect()
     query = f"""
         SELECT
-            CAST(tpep_pickup_datetime AS DATE) AS trip_date,
+            date_trunc('hour', tpep_pickup_datetime) AS trip_hour,
             COUNT(*) AS total_rides
         FROM read_parquet('{parquet_path}')
-        WHERE CAST(tpep_pickup_datetime AS DATE) BETWEEN DATE '{month_str}-01'
-              AND (DATE '{month_str}-01' + INTERVAL 1 MONTH - INTERVAL 1 DAY)
+        WHERE tpep_pickup_datetime >= DATE '{month_str}-01'
+          AND tpep_pickup_datetime < DATE '{month_str}-01' + INTERVAL 1 MONTH
         GROUP BY 1 ORDER BY 1
     """
     df = con.execute(query).fetch_df()
     con.close()
-    df["trip_date"] = pd.to_datetime(df["trip_date"])
+    df["trip_hour"] = pd.to_datetime(df["trip_hour"])
     return df
 
-def append_and_save(df_month):
-    if os.path.exists(INPUT_PARQUET):
-        df_existing = pd.read_parquet(INPUT_PARQUET)
-        df_all = pd.concat([df_existing, df_month], ignore_index=True)
-    else:
-        df_all = df_month
+def daily_from_hourly(df_hours):
+    daily = df_hours.groupby(df_hours["trip_hour"].dt.normalize().rename("trip_date"))["total_rides"].sum()
+    return daily.reset_index()
 
-    df_all = df_all.drop_duplicates(subset="trip_date", keep="last")
-    df_all = df_all.sort_values("trip_date")
-    df_all.to_parquet(INPUT_PARQUET, index=False)
-    log(f"[DONE] Appended new data — total rows now: {len(df_all)}")
+def _merge_into(pub, path, df_new, key):
+    existing = pub.existing(path)
+    if existing:
+        df_all = pd.concat([pd.read_parquet(existing), df_new], ignore_index=True)
+    else:
+        df_all = df_new
+    df_all = df_all.drop_duplicates(subset=key, keep="last").sort_values(key)
+    df_all.to_parquet(pub.path(path), index=False)
+    return df_all
+
+def append_and_save(df_month, source=None, df_hours=None):
+    # Read-modify-write under the artifact lock so concurrent writers can't drop rows;
+    # daily and hourly counts land in the same generation
+    with artifacts.publish(producer="update_ingest", sources=[source] if source else None) as pub:
+        if df_month is not None:
+            df_all = _merge_into(pub, INPUT_PARQUET, df_month, "trip_date")
+            log(f"[DONE] Appended new data — total rows now: {len(df_all)} (generation {pub.generation})")
+        if df_hours is not None:
+            df_all = _merge_into(pub, HOURLY_INPUT_PARQUET, df_hours, "trip_hour")
+            log(f"[DONE] Appended hourly data — total rows now: {len(df_all)} (generation {pub.generation})")
 
 def prime_forecast_output_if_needed():
-    if not os.path.exists(OUTPUT_PARQUET):
-        df = pd.read_parquet(INPUT_PARQUET)
+    with artifacts.publish(producer="update_ingest", sources=[INPUT_PARQUET]) as pub:
+        if pub.existing(OUTPUT_PARQUET):
+            return
+        df = pd.read_parquet(pub.existing(INPUT_PARQUET))
         df = df.rename(columns={"trip_date": "ds", "total_rides": "y"})
         df["ds"] = pd.to_datetime(df["ds"]).dt.normalize()
         df = df.dropna(subset=["ds", "y"]).sort_values("ds")
         df["yhat"] = df["yhat_lower"] = df["yhat_upper"] = df["y"]
         df["type"] = "actual"
         df.drop(columns="y", inplace=True)
-        df.to_parquet(OUTPUT_PARQUET, index=False)
-        log(f"[INIT] Created forecast_output.parquet with {len(df)} rows of actuals.")
+        df.to_parquet(pub.path(OUTPUT_PARQUET), index=False)
+    log(f"[INIT] Created forecast_output.parquet with {len(df)} rows of actuals.")
 
 def main():
+    # Each step is a profiling stage (TLCML_PROFILE, see profiling.py)
     try:
-        next_month = get_latest_month_from_parquet()
-        if not check_remote_parquet_exists(next_month):
+        with profiling.stage("latest_month", "update_ingest"):
+            next_month = get_latest_month_from_parquet()
+        with profiling.stage("check_remote", "update_ingest"):
+            available = check_remote_parquet_exists(next_month)
+        if not available:
             log(f"[SKIP] No remote file available for {next_month}")
             return
 
-        path = download_parquet(next_month)
-        df_month = summarize_month_to_df(path, next_month)
-        append_and_save(df_month)
+        with profiling.stage("download", "update_ingest") as stage:
+            path = download_parquet(next_month)
+            stage["bytes"] = os.path.getsize(path)
+        with profiling.stage("scan", "update_ingest") as stage:
+            # One scan for both resolutions; daily totals are summed from the hours
+            df_hours = summarize_month_hourly(path, next_month)
+            df_month = daily_from_hourly(df_hours)
+            stage.update(bytes=os.path.getsize(path), rows_in=pq.read_metadata(path).num_rows, rows=len(df_hours))
+        with profiling.stage("append_and_save", "update_ingest") as stage:
+            append_and_save(df_month, path, df_hours)
+            stage.update(rows=len(df_month), bytes=os.path.getsize(INPUT_PARQUET))
+
+        # Score the month's trips for anomalies while the raw file is still on disk
+        try:
+            from anomaly_pipeline import score_new_month
+            with profiling.stage("anomaly_scoring", "update_ingest") as stage:
+                stage["rows"] = score_new_month(next_month, path)
+        except Exception as e:
+            log(f"[WARN] Anomaly scoring failed for {next_month}: {e}")
+
+        # Zone × hour counts for the Zones tab, from the same raw file
+        try:
+            import zone_tiles
+            with profiling.stage("zone_tiles", "update_ingest") as stage:
+                stage["rows"] = zone_tiles.add_month(path, next_month)
+        except Exception as e:
+            log(f"[WARN] Zone tiles failed for {next_month}: {e}")
+
         os.remove(path)
         log(f"[CLEANUP] Removed raw file: {path}")
 
         # Prime forecast_output.parquet if missing
-        prime_forecast_output_if_needed()
+        with profiling.stage("prime_output", "update_ingest"):
+            prime_forecast_output_if_needed()
 
     except Exception as e:
+        # Re-raised so the refresh job and pipeline.py mark ingest failed and skip the forecast
         log(f"[ERROR] Ingestion failed: {e}")
+        raise
+
+def backfill_hourly(start, end):
+    # Hourly history for months ingested before hourly counts existed; daily rows are left as they are
+    month = datetime.strptime(start, "%Y-%m")
+    while month <= datetime.strptime(end, "%Y-%m"):
+        month_str = month.strftime("%Y-%m")
+        month += relativedelta(months=1)
+        if not check_remote_parquet_exists(month_str):
+            log(f"[SKIP] No remote file available for {month_str}")
+            continue
+        path = download_parquet(month_str)
+        append_and_save(None, path, summarize_month_hourly(path, month_str))
+        os.remove(path)
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backfill-hourly", nargs=2, metavar=("START", "END"),
+                        help="Add hourly counts for months START..END (YYYY-MM) instead of ingesting the next month")
+    args = parser.parse_args()
+    if args.backfill_hourly:
+        backfill_hourly(*args.backfill_hourly)
+    else:
+        main()
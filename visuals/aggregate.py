@@ -0,0 +1,145 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from visuals.downsample import decode_array, is_mirrored, to_numeric_x, typed_array
+
+# ───────────── Date-range / granularity aggregation service ───────────── #
+# Every trace on a figure's main x axis is registered once per figure version as
+# a series with prefix sums and per-grain period boundaries. A query for
+# (start, end, grain) is then two binary searches plus one subtraction per
+# returned period, so it costs the same whatever the length of history, and
+# repeated or overlapping queries are served from an LRU cache.
+GRAINS = {"D": "Daily", "W": "Weekly", "M": "Monthly"}
+DAY_NS = 86_400 * 10**9
+
+# ((key, trace index, part), version) -> _Series
+_series = {}
+
+
+class _Series:
+    def __init__(self, x_ns, y):
+        order = np.argsort(x_ns, kind="stable")
+        self.x = x_ns[order]
+        y = y[order]
+        valid = ~np.isnan(y)
+        self.csum = np.concatenate([[0.0], np.cumsum(np.where(valid, y, 0.0))])
+        self.ccount = np.concatenate([[0], np.cumsum(valid)])
+        self._firsts = {}
+
+    def period_firsts(self, grain):
+        # Index of the first point in each period
+        if grain not in self._firsts:
+            days = self.x.astype(np.int64) // DAY_NS
+            if grain == "W":
+                period = (days + 3) // 7  # Monday-based weeks (1970-01-01 was a Thursday)
+            elif grain == "M":
+                period = self.x.astype("datetime64[ns]").astype("datetime64[M]").astype(np.int64)
+            else:
+                period = days
+            self._firsts[grain] = np.flatnonzero(np.r_[True, np.diff(period) != 0])
+        return self._firsts[grain]
+
+    def aggregate(self, start_ns, end_ns, grain):
+        n = len(self.x)
+        lo = np.searchsorted(self.x, start_ns, "left")
+        hi = np.searchsorted(self.x, end_ns, "right")
+        if lo >= hi:
+            return self.x[:0], np.empty(0)
+
+        firsts = self.period_firsts(grain)
+        a = np.searchsorted(firsts, lo, "right") - 1
+        b = np.searchsorted(firsts, hi, "left")
+        starts = np.maximum(firsts[a:b], lo)
+        ends = np.minimum(np.append(firsts[a + 1:b], n), hi)
+
+        counts = self.ccount[ends] - self.ccount[starts]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # Mean per period keeps aggregated series on the same per-day scale as the bands
+            means = (self.csum[ends] - self.csum[starts]) / counts
+        return self.x[starts], np.where(counts > 0, means, np.nan)
+
+
+def _register(series_key, version, x, y):
+    if (series_key, version) not in _series:
+        # Drop series registered from older versions of the same figure
+        for stale in [k for k in _series if k[0] == series_key]:
+            _series.pop(stale, None)
+        _series[(series_key, version)] = _Series(to_numeric_x(x), y.astype(float))
+
+
+@lru_cache(maxsize=1024)
+def _aggregate(series_key, version, start_ns, end_ns, grain):
+    return _series[(series_key, version)].aggregate(start_ns, end_ns, grain)
+
+
+def cache_info():
+    return _aggregate.cache_info()
+
+
+def _bound(value, default):
+    return float(pd.Timestamp(value).as_unit("ns").value) if value else default
+
+
+def _labels(x_ns):
+    return pd.to_datetime(x_ns.astype(np.int64)).strftime("%Y-%m-%d").tolist()
+
+
+def apply_view(fig, key, version, start=None, end=None, grain="D"):
+    start_ns = _bound(start, -np.inf)
+    end_ns = _bound(end, np.inf)
+
+    data = []
+    extent = [np.inf, -np.inf]
+    for i, trace in enumerate(fig.get("data", [])):
+        if (trace.get("type", "scatter") not in ("scatter", "scattergl") or trace.get("xaxis", "x") != "x"
+                or "x" not in trace or "y" not in trace):
+            data.append(trace)
+            continue
+        x = decode_array(trace["x"])
+        y = decode_array(trace["y"]).astype(float)
+        if len(x) < 2 or len(x) != len(y):
+            data.append(trace)
+            continue
+
+        xn = to_numeric_x(x)
+        mirrored = is_mirrored(xn)
+        if not mirrored and (trace.get("fill") == "toself" or (np.diff(xn) < 0).any()):
+            # A shape rather than a series: resampling its points in x order would scramble it
+            data.append(trace)
+            continue
+
+        view = dict(trace)
+        if mirrored:
+            # Aggregate the upper and lower halves of a CI polygon separately, then re-mirror
+            h = len(x) // 2
+            _register((key, i, "upper"), version, x[:h], y[:h])
+            _register((key, i, "lower"), version, x[h:], y[h:])
+            ux, uy = _aggregate((key, i, "upper"), version, start_ns, end_ns, grain)
+            lx, ly = _aggregate((key, i, "lower"), version, start_ns, end_ns, grain)
+            agg_x = np.concatenate([ux, lx[::-1]])
+            agg_y = np.concatenate([uy, ly[::-1]])
+        else:
+            _register((key, i, "all"), version, x, y)
+            agg_x, agg_y = _aggregate((key, i, "all"), version, start_ns, end_ns, grain)
+
+        if len(agg_x):
+            extent = [min(extent[0], agg_x.min()), max(extent[1], agg_x.max())]
+        view["x"] = _labels(agg_x)
+        view["y"] = typed_array(agg_y.astype("f8"))
+        for name in ("text", "hovertext", "customdata"):
+            view.pop(name, None)
+        data.append(view)
+
+    rendered = dict(fig)
+    rendered["data"] = data
+    if (start or end) and extent[0] <= extent[1]:
+        layout = dict(fig.get("layout", {}))
+        xaxis = dict(layout.get("xaxis", {}))
+        lo, hi = _labels(np.array(extent))
+        xaxis["range"] = [start or lo, end or hi]
+        xaxis["autorange"] = False
+        layout["xaxis"] = xaxis
+        rendered["layout"] = layout
+    return rendered
@@ -1,8 +1,10 @@
 import pandas as pd
 import plotly.graph_objects as go
 
+from visuals.datasets import load
+
 # ───────────── Load cached Orbit output ───────────── #
-merged = pd.read_parquet("data/bayes_forecast_210.parquet")
+merged = load("bayes_210")
 
 # Uncomment the following block to retrain with Orbit (not used in production)
 """
@@ -11,23 +13,22 @@ from orbit.models import DLT
 from sklearn.preprocessing import StandardScaler
 
 # Load data
-trips = pd.read_csv('data/daily_total_trips_patched.csv', parse_dates=['pickup_date'])
-weather = pd.read_csv('data/max_daily_temperatures_2020_2022.csv', parse_dates=['datetime'])
-mta = pd.read_csv('data/mta_weekly_subway.csv', parse_dates=['week_start'])
-covid = pd.read_csv('data/covid19.csv', parse_dates=['date_of_interest'])
+trips = load('daily_trips')
+weather = load('temperatures')
+mta = load('mta_weekly')
+covid = load('covid', columns=['date_of_interest', 'HOSPITALIZED_COUNT'])
 
 # Preprocess MTA data
-mta_daily = mta.set_index('week_start').resample('D').ffill().reset_index()
-mta_daily.rename(columns={'week_start': 'date', 'subway_rides': 'mta_ridership'}, inplace=True)
-covid.rename(columns={'date_of_interest': 'date'}, inplace=True)
+mta_daily = mta[['date', 'weekly_subway_rides']].set_index('date').resample('D').ffill().reset_index()
+mta_daily.rename(columns={'weekly_subway_rides': 'mta_ridership'}, inplace=True)
 
 # Merge all data
 trips.rename(columns={'pickup_date': 'date'}, inplace=True)
-df = trips.merge(weather.rename(columns={'datetime': 'date'}), on='date', how='left')
+df = trips.merge(weather, on='date', how='left')
 df = df.merge(mta_daily, on='date', how='left')
-df = df.merge(covid[['date', 'hospitalized']], on='date', how='left')
-df = df[['date', 'total_trips', 'tempmax', 'mta_ridership', 'hospitalized']].dropna()
-df.rename(columns={'date': 'ds', 'total_trips': 'y', 'hospitalized': 'covid_hospitalized'}, inplace=True)
+df = df.merge(covid[['date', 'hospitalizations']], on='date', how='left')
+df = df[['date', 'total_trips', 'tempmax', 'mta_ridership', 'hospitalizations']].dropna()
+df.rename(columns={'date': 'ds', 'total_trips': 'y', 'hospitalizations': 'covid_hospitalized'}, inplace=True)
 
 # Standardize
 scaler = StandardScaler()
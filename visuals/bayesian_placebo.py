@@ -2,8 +2,10 @@ import pandas as pd
 import plotly.graph_objects as go
 import plotly.io as pio
 
+from visuals.datasets import load
+
 # Load precomputed forecast from Parquet
-merged = pd.read_parquet("data/bayes_forecast_placebo.parquet")
+merged = load("bayes_placebo")
 
 pio.renderers.default = 'browser'
 
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+# ───────────── Per-cluster statistics over time intervals ───────────── #
+# Rides (or days) are sorted by time once and prefix-summed; each cluster's
+# [start, end] window then maps to a slice found by binary search, so the
+# mean of every column for every cluster comes out of a few array ops instead
+# of one boolean scan of all rides per cluster.
+
+
+def interval_means(times, values, starts, ends):
+    # Mean of each column of `values` over times in [start, end], NaN-skipping like pandas
+    times = pd.to_datetime(pd.Series(times)).to_numpy("datetime64[ns]")
+    values = np.asarray(values, dtype=float).reshape(len(times), -1)
+    if len(times) > 1 and not (times[1:] >= times[:-1]).all():
+        # Anomaly stores are written in time order, so this sort is usually skipped
+        order = np.argsort(times, kind="stable")
+        times, values = times[order], values[order]
+
+    valid = ~np.isnan(values)
+    csum = np.vstack([np.zeros(values.shape[1]), np.cumsum(np.where(valid, values, 0.0), axis=0)])
+    ccount = np.vstack([np.zeros(values.shape[1], dtype=np.int64), np.cumsum(valid, axis=0)])
+
+    lo = np.searchsorted(times, pd.to_datetime(pd.Series(starts)).to_numpy("datetime64[ns]"), "left")
+    hi = np.searchsorted(times, pd.to_datetime(pd.Series(ends)).to_numpy("datetime64[ns]"), "right")
+    hi = np.maximum(hi, lo)
+    counts = ccount[hi] - ccount[lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (csum[hi] - csum[lo]) / counts
+
+
+def composite_z(clusters, rides, columns=("trip_distance", "fare_amount"), time_col="pickup_datetime",
+                start_col="start_date", end_col="end_date"):
+    # Mean over columns of (cluster mean - global mean) / global std
+    values = rides[list(columns)].to_numpy(dtype=float)
+    means = interval_means(rides[time_col], values, clusters[start_col], clusters[end_col])
+
+    mu = np.nanmean(values, axis=0)
+    sd = np.nanstd(values, axis=0, ddof=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.where(sd > 0, (means - mu) / sd, 0.0)
+    return pd.Series(z.mean(axis=1), index=clusters.index)
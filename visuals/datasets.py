@@ -0,0 +1,190 @@
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+import catalog
+
+# ───────────── Named, typed datasets with a process-wide cache ───────────── #
+# Every data file the figures read is declared once here with its dtypes,
+# date columns and canonical column names. load() parses a file at most once
+# per process (per column projection) and re-parses it only when its mtime or
+# size changes. Callers get a shallow copy; with pandas copy-on-write their
+# edits never leak into the cached frame.
+#
+# convert() (run by convert_data.py at build time) writes each CSV as an
+# uncompressed Arrow IPC file in COLUMNAR_DIR with compact dtypes. When that
+# file is newer than its CSV it is memory-mapped instead of parsed, and columns
+# without nulls are handed to pandas zero-copy, so gunicorn workers share the
+# same page-cache pages instead of each holding a parsed copy.
+COLUMNAR_DIR = "data/columnar"
+USE_COLUMNAR = os.environ.get("TLCML_COLUMNAR", "1") != "0"
+
+
+class Dataset:
+    def __init__(self, path, dates=(), dtypes=None, rename=None):
+        self.path = path
+        self.dates = list(dates)
+        self.dtypes = dtypes or {}
+        self.rename = rename or {}
+
+    def read_source(self, columns=None):
+        # columns use file names; renames are applied by read()
+        if self.path.endswith(".parquet"):
+            df = pd.read_parquet(self.path, columns=columns)
+            for col in self.dates:
+                if col in df:
+                    df[col] = pd.to_datetime(df[col])
+            return df
+        dates = [c for c in self.dates if columns is None or c in columns]
+        dtypes = {c: t for c, t in self.dtypes.items() if columns is None or c in columns}
+        return pd.read_csv(self.path, usecols=columns, parse_dates=dates, dtype=dtypes)
+
+    def read(self, source, columns=None):
+        df = read_columnar(source, columns) if source.endswith(".arrow") else self.read_source(columns)
+        return df.rename(columns=self.rename)
+
+
+def _compact(df, dtypes):
+    # Narrowest safe dtypes for columns the dataset doesn't pin explicitly
+    for col in df.columns:
+        if col in dtypes:
+            continue
+        if pd.api.types.is_integer_dtype(df[col]) and df[col].between(-2**31, 2**31 - 1).all():
+            df[col] = df[col].astype("int32")
+    return df
+
+
+def read_columnar(path, columns=None):
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    if columns:
+        table = table.select(columns)
+    data = {}
+    for name, column in zip(table.column_names, table.columns):
+        arr = column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+        if pa.types.is_dictionary(arr.type):
+            data[name] = pd.Categorical.from_codes(arr.indices.to_numpy(zero_copy_only=False),
+                                                   categories=arr.dictionary.to_pandas())
+        elif arr.null_count == 0 and (pa.types.is_integer(arr.type) or pa.types.is_floating(arr.type)
+                                      or pa.types.is_timestamp(arr.type)):
+            # Read-only view straight into the mapped file
+            data[name] = arr.to_numpy(zero_copy_only=True)
+        else:
+            data[name] = arr.to_pandas()
+    return pd.DataFrame(data, copy=False)
+
+
+DATASETS = {
+    "daily_trips": Dataset(
+        "data/daily_total_trips_patched.csv", dates=["pickup_date"], dtypes={"total_trips": "float64"}),
+    "daily_trips_2025_q1": Dataset(
+        "data/daily_total_trips_2025_Q1.csv", dates=["pickup_date"], dtypes={"total_trips": "int64"}),
+    "daily_summary": Dataset(
+        "data/daily_summary_full.csv", dates=["pickup_date"],
+        dtypes={"n_anomalies": "int64", "total_trips": "int64", "avg_fare": "float64",
+                "avg_trip_distance": "float64", "avg_trip_duration": "float64"}),
+    "covid": Dataset(
+        "data/covid19.csv", dates=["date_of_interest"],
+        rename={"date_of_interest": "date", "HOSPITALIZED_COUNT": "hospitalizations"}),
+    "mta_weekly": Dataset(
+        "data/mta_weekly_subway.csv", dates=["week_start"],
+        dtypes={"Mode": "category", "subway_rides": "float64"},
+        rename={"week_start": "date", "subway_rides": "weekly_subway_rides"}),
+    "temperatures": Dataset(
+        "data/max_daily_temperatures_2020_2022.csv", dates=["datetime"], dtypes={"tempmax": "float64"},
+        rename={"datetime": "date"}),
+    "anomalies": Dataset(
+        "data/anomalies_clustered_temporally.csv", dates=["pickup_datetime"],
+        dtypes={"trip_distance": "float32", "fare_amount": "float32", "trip_duration": "float32"}),
+    "anomalies_2022": Dataset(
+        "data/anomalies_clustered_2022.csv", dates=["pickup_datetime"],
+        dtypes={"trip_distance": "float32", "fare_amount": "float32", "trip_duration": "float32"}),
+    "clusters_local_z": Dataset(
+        "data/filtered_clusters_with_local_z.csv", dates=["cluster_start", "cluster_end"],
+        rename={"cluster_start": "start_date", "cluster_end": "end_date"}),
+    "clusters_detected": Dataset(
+        "data/anomaly_clusters_detected.csv", dates=["cluster_start", "cluster_end"],
+        rename={"cluster_start": "start_date", "cluster_end": "end_date"}),
+    "clusters_2022": Dataset(
+        "data/filtered_clusters_condensed_2022.csv", dates=["start_date", "end_date"]),
+    "merged_forecast_210": Dataset("data/merged_forecast.csv", dates=["ds"]),
+    "merged_forecast_307": Dataset("data/merged_forecast307.csv", dates=["ds"]),
+    "merged_forecast_placebo": Dataset("data/merged_forecast_placebo.csv", dates=["ds"]),
+    "bayes_210": Dataset("data/bayes_forecast_210.parquet", dates=["ds"]),
+    "bayes_307": Dataset("data/bayes_forecast_307.parquet", dates=["ds"]),
+    "bayes_placebo": Dataset("data/bayes_forecast_placebo.parquet", dates=["ds"]),
+}
+
+# (name, columns) -> ((path, mtime_ns, size), DataFrame)
+_cache = {}
+_lock = threading.Lock()
+
+
+def path(name):
+    return DATASETS[name].path
+
+
+def columnar_path(name):
+    return os.path.join(COLUMNAR_DIR, f"{name}.arrow")
+
+
+def source(name):
+    # The columnar copy when it exists and is at least as new as the original
+    original = DATASETS[name].path
+    converted = columnar_path(name)
+    if USE_COLUMNAR and not original.endswith(".parquet") and os.path.exists(converted):
+        if not os.path.exists(original) or os.stat(converted).st_mtime_ns >= os.stat(original).st_mtime_ns:
+            return converted
+    return original
+
+
+def load(name, columns=None):
+    dataset = DATASETS[name]
+    src = source(name)
+    st = os.stat(src)
+    stamp = (src, st.st_mtime_ns, st.st_size)
+    key = (name, tuple(columns) if columns else None)
+
+    with _lock:
+        cached = _cache.get(key)
+    if cached is None or cached[0] != stamp:
+        df = dataset.read(src, list(columns) if columns else None)
+        with _lock:
+            _cache[key] = (stamp, df)
+        cached = (stamp, df)
+    return cached[1].copy(deep=False)
+
+
+def convert(name):
+    dataset = DATASETS[name]
+    df = _compact(dataset.read_source(), dataset.dtypes).reset_index(drop=True)
+    os.makedirs(COLUMNAR_DIR, exist_ok=True)
+    target = columnar_path(name)
+    tmp = target + ".tmp"
+    # One record batch, uncompressed, so every column maps as a single buffer
+    feather.write_feather(df, tmp, compression="uncompressed", chunksize=max(len(df), 1))
+    os.replace(tmp, target)
+    catalog.record(target, sources=[dataset.path], producer="convert_data", frame=df)
+    return target
+
+
+def convert_all():
+    converted = {}
+    for name, dataset in DATASETS.items():
+        if dataset.path.endswith(".parquet") or not os.path.exists(dataset.path):
+            continue
+        converted[name] = convert(name)
+    return converted
+
+
+def log_sizes(converted):
+    for name, target in converted.items():
+        before, after = os.path.getsize(path(name)), os.path.getsize(target)
+        print(f"{name:>24}: {before / 1024:8.1f} KiB csv -> {after / 1024:8.1f} KiB arrow")
+
+
+def clear():
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,165 @@
+import base64
+
+import numpy as np
+import pandas as pd
+
+# ───────────── Rendering layer for large time series ───────────── #
+# Figures are kept at full resolution on the server. Before a figure is sent to
+# the browser each long trace is reduced with LTTB (Largest-Triangle-Three-
+# Buckets) so roughly MAX_POINTS points fall in the visible x range, and traces
+# that still send more than GL_THRESHOLD points are switched to WebGL. Zooming
+# re-renders the visible window (plus one window of padding each side) at full
+# detail.
+MAX_POINTS = 1000
+
+# A zoomed view sends up to three windows (visible plus padding) of MAX_POINTS,
+# and traces LTTB can't reduce are sent whole; above this WebGL pays for its context
+GL_THRESHOLD = 2 * MAX_POINTS
+
+# Per-point arrays that must be subset alongside x/y
+POINT_ARRAYS = ("text", "hovertext", "customdata")
+
+
+def lttb_indices(x, y, n_out):
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # First and last points are always kept; the rest is split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    idx = np.empty(n_out, dtype=int)
+    idx[0], idx[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        # Keep the point forming the largest triangle with the previous pick and the next bucket's mean
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        idx[i + 1] = a
+    return idx
+
+
+def decode_array(values):
+    # Plotly serializes numpy arrays as base64 typed arrays
+    if isinstance(values, dict) and "bdata" in values:
+        dtype = "u1" if values["dtype"] == "u1c" else values["dtype"]
+        return np.frombuffer(base64.b64decode(values["bdata"]), dtype=dtype)
+    return np.asarray(values)
+
+
+def typed_array(arr):
+    arr = np.ascontiguousarray(arr)
+    return {"dtype": arr.dtype.str[1:], "bdata": base64.b64encode(arr.tobytes()).decode()}
+
+
+def encode_like(arr, like):
+    # Re-encode a subset in the same form (typed array or plain list) as the original
+    if isinstance(like, dict) and "bdata" in like:
+        return typed_array(arr)
+    return arr.tolist()
+
+
+def to_numeric_x(x):
+    if x.dtype.kind in "UO":
+        return pd.to_datetime(x).as_unit("ns").asi8.astype(float)
+    return x.astype(float)
+
+
+def is_mirrored(xn):
+    # CI polygons are the upper bound forward followed by the lower bound reversed
+    h = len(xn) // 2
+    return len(xn) % 2 == 0 and np.array_equal(xn[:h], xn[h:][::-1])
+
+
+def _to_numeric_range(x_range):
+    return tuple(float(pd.Timestamp(v).as_unit("ns").value) for v in x_range)
+
+
+def _select(xn, y, x_range, max_points):
+    idx = np.flatnonzero(~np.isnan(xn) & ~np.isnan(y))
+    if x_range is not None and len(idx):
+        lo, hi = x_range
+        width = hi - lo
+        pos = np.flatnonzero((xn[idx] >= lo - width) & (xn[idx] <= hi + width))
+        if not len(pos):
+            return idx[:0]
+        # One extra point each side so lines run off the edge of the padded window
+        idx = idx[max(pos[0] - 1, 0):pos[-1] + 2]
+
+    budget = max_points
+    if x_range is not None and len(idx) > 1:
+        span = xn[idx[-1]] - xn[idx[0]]
+        budget = int(max_points * max(span / (x_range[1] - x_range[0]), 1))
+    return idx[lttb_indices(xn[idx], y[idx], budget)]
+
+
+def _render_trace(trace, x_range, max_points):
+    if trace.get("type", "scatter") != "scatter" or "x" not in trace or "y" not in trace:
+        return trace
+    rendered = _reduce_trace(trace, x_range, max_points)
+    # Decided on what is actually sent, including traces passed through unreduced
+    if len(decode_array(rendered["x"])) > GL_THRESHOLD:
+        rendered = dict(rendered, type="scattergl")
+    return rendered
+
+
+def _reduce_trace(trace, x_range, max_points):
+    x = decode_array(trace["x"])
+    y = decode_array(trace["y"]).astype(float)
+    if len(x) <= max_points or len(x) != len(y):
+        return trace
+    xn = to_numeric_x(x)
+    if trace.get("xaxis", "x") != "x":
+        x_range = None
+
+    if trace.get("fill") == "toself":
+        if not is_mirrored(xn):
+            return trace
+        h = len(x) // 2
+        upper = _select(xn[:h], y[:h], x_range, max_points)
+        keep = np.concatenate([upper, (len(x) - 1 - upper)[::-1]])
+    else:
+        keep = _select(xn, y, x_range, max_points)
+
+    rendered = dict(trace)
+    rendered["x"] = encode_like(x[keep], trace["x"])
+    rendered["y"] = encode_like(decode_array(trace["y"])[keep], trace["y"])
+    for name in POINT_ARRAYS:
+        values = trace.get(name)
+        if isinstance(values, (list, dict)) and len(decode_array(values)) == len(x):
+            rendered[name] = encode_like(decode_array(values)[keep], values)
+    return rendered
+
+
+def parse_x_range(relayout):
+    # Returns (changed, x_range); x_range is None when the x axis was reset
+    if not relayout:
+        return False, None
+    if relayout.get("xaxis.autorange"):
+        return True, None
+    if "xaxis.range[0]" in relayout and "xaxis.range[1]" in relayout:
+        return True, (relayout["xaxis.range[0]"], relayout["xaxis.range[1]"])
+    if "xaxis.range" in relayout:
+        return True, tuple(relayout["xaxis.range"])
+    return False, None
+
+
+def render_figure(fig, x_range=None, max_points=MAX_POINTS, uirevision=None):
+    # Without an explicit range, size the budget for the figure's initial x range
+    if x_range is None:
+        xaxis = fig.get("layout", {}).get("xaxis", {})
+        if xaxis.get("range") and not xaxis.get("autorange"):
+            x_range = xaxis["range"]
+
+    numeric_range = _to_numeric_range(x_range) if x_range is not None else None
+    rendered = dict(fig)
+    rendered["data"] = [_render_trace(trace, numeric_range, max_points) for trace in fig.get("data", [])]
+    if uirevision is not None:
+        # Keeps the user's zoom/pan when the re-rendered figure replaces the current one
+        rendered["layout"] = dict(fig.get("layout", {}), uirevision=uirevision)
+    return rendered
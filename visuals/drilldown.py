@@ -0,0 +1,34 @@
+import pandas as pd
+import plotly.graph_objects as go
+
+# ───────────── Clickable cluster shading ───────────── #
+# Shaded vrects are layout shapes, which plotly never reports clicks on. Each
+# anomaly figure therefore also gets one transparent bar per cluster spanning
+# its shading; clicking it sends the cluster's dates back in clickData, and
+# app.py answers with trips from the time-sorted store in trip_store.py.
+TARGET_NAME = "cluster-targets"
+
+
+def click_targets(starts, ends, top):
+    starts, ends = pd.to_datetime(pd.Series(starts)), pd.to_datetime(pd.Series(ends))
+    # Bars are centred on x; an inclusive end date covers the whole of its last day
+    widths = (ends - starts + pd.Timedelta(days=1)) / pd.Timedelta(milliseconds=1)
+    return go.Bar(
+        x=starts + (ends - starts + pd.Timedelta(days=1)) / 2,
+        y=[top] * len(starts),
+        width=widths.tolist(),
+        customdata=list(zip(starts.dt.strftime("%Y-%m-%d"), ends.dt.strftime("%Y-%m-%d"))),
+        name=TARGET_NAME,
+        marker=dict(color="rgba(0, 0, 0, 0)"),
+        showlegend=False,
+        hovertemplate="%{customdata[0]} to %{customdata[1]}<br>Click for trips<extra></extra>"
+    )
+
+
+def clicked_window(click_data):
+    # (start, end) of the clicked cluster, or None for clicks on other traces
+    for point in (click_data or {}).get("points", []):
+        custom = point.get("customdata")
+        if isinstance(custom, list) and len(custom) == 2:
+            return custom[0], custom[1]
+    return None
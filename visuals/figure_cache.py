@@ -0,0 +1,132 @@
+import ast
+import glob
+import hashlib
+import importlib.util
+import json
+import os
+
+# ───────────── Serialized figure snapshots ───────────── #
+# Snapshots are stored as Plotly JSON, one file per figure, named by a digest of
+# the figure module's source and every data file it reads. Any change to those
+# files yields a new digest, so a stale snapshot is simply never looked up.
+# The module's source includes every repo module it imports, transitively
+# (helpers such as visuals/datasets.py or visuals/drilldown.py).
+SNAPSHOT_DIR = "data/figures"
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# path -> (mtime_ns, size, sha256); avoids rehashing unchanged files per request
+_file_hashes = {}
+
+# path -> (mtime_ns, size, imported module names)
+_file_imports = {}
+
+
+def file_hash(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return "missing"
+
+    cached = _file_hashes.get(path)
+    if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    _file_hashes[path] = (st.st_mtime_ns, st.st_size, h.hexdigest())
+    return h.hexdigest()
+
+
+def _repo_file(name):
+    # Resolved on disk rather than with find_spec, which would import parent packages
+    base = os.path.join(REPO, *name.split("."))
+    for candidate in (base + ".py", os.path.join(base, "__init__.py")):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def _imports(path):
+    st = os.stat(path)
+    cached = _file_imports.get(path)
+    if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            # "from visuals import zones" imports a module, "from visuals.datasets import load" doesn't
+            names.add(node.module)
+            names.update(f"{node.module}.{alias.name}" for alias in node.names)
+    _file_imports[path] = (st.st_mtime_ns, st.st_size, names)
+    return names
+
+
+def module_sources(module_name):
+    # Source files of module_name and of the repo modules it imports, transitively
+    origin = importlib.util.find_spec(module_name).origin
+    seen, todo = set(), [origin]
+    while todo:
+        path = todo.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        todo.extend(f for f in map(_repo_file, _imports(path)) if f)
+    return sorted(seen)
+
+
+def figure_digest(module_name, inputs):
+    h = hashlib.sha256()
+    for source in module_sources(module_name):
+        h.update(os.path.relpath(source, REPO).encode())
+        h.update(file_hash(source).encode())
+    for path in sorted(inputs):
+        h.update(path.encode())
+        h.update(file_hash(path).encode())
+    return h.hexdigest()[:16]
+
+
+def artifact_generation(paths):
+    # Cheap mtime/size signature for artifacts that are rewritten in place
+    h = hashlib.sha256()
+    for path in paths:
+        try:
+            st = os.stat(path)
+            h.update(f"{path}:{st.st_mtime_ns}:{st.st_size}".encode())
+        except FileNotFoundError:
+            h.update(f"{path}:missing".encode())
+    return h.hexdigest()[:16]
+
+
+def snapshot_path(key, digest):
+    return os.path.join(SNAPSHOT_DIR, f"{key}-{digest}.json")
+
+
+def load_snapshot(key, digest):
+    path = snapshot_path(key, digest)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_snapshot(key, digest, fig_json):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    path = snapshot_path(key, digest)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        f.write(fig_json)
+    os.replace(temp_path, path)
+
+    # Drop snapshots built from older inputs
+    for old in glob.glob(os.path.join(SNAPSHOT_DIR, f"{key}-*.json")):
+        if old != path:
+            try:
+                os.remove(old)
+            except FileNotFoundError:
+                pass
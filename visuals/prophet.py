@@ -2,9 +2,11 @@ import pandas as pd
 import plotly.graph_objects as go
 from prophet import Prophet
 
+from visuals.datasets import load
+
 # Load and prep data
-historical = pd.read_csv("data/daily_total_trips_patched.csv", parse_dates=["pickup_date"])
-actual_q1_2025 = pd.read_csv("data/daily_total_trips_2025_Q1.csv", parse_dates=["pickup_date"])
+historical = load("daily_trips")
+actual_q1_2025 = load("daily_trips_2025_q1")
 
 train_df = historical[(historical["pickup_date"] >= "2020-01-01") & (historical["pickup_date"] < "2025-01-01")].copy()
 train_df = train_df.rename(columns={"pickup_date": "ds", "total_trips": "y"})
@@ -0,0 +1,180 @@
+import importlib
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+import artifacts
+from visuals.datasets import path
+from visuals.figure_cache import artifact_generation, figure_digest, load_snapshot, save_snapshot, snapshot_path
+
+# ───────────── Figure registry ───────────── #
+# Each subtab maps to the module attribute holding its figure, or to a builder
+# function returning it. Modules are only imported (and their figures built)
+# the first time a subtab is requested.
+FIGURES = {
+    "forecast-live": ("visuals.prophet_live", "build_fig7"),
+    "forecast-static": ("visuals.prophet", "fig3"),
+    "anomaly-overview": ("visuals.vis1", "fig"),
+    "anomaly-zoom": ("visuals.vis2", "fig2"),
+    "bayes-210": ("visuals.bayesian", "fig4"),
+    "bayes-307": ("visuals.bayesian2", "fig5"),
+    "bayes-placebo": ("visuals.bayesian_placebo", "fig6"),
+    "zone-map": ("visuals.zones", "build_zone_map"),
+}
+
+# Data files read by each static figure. These figures are served from on-disk
+# snapshots (see visuals/figure_cache.py) until one of their inputs changes.
+FIGURE_INPUTS = {
+    "forecast-static": [path("daily_trips"), path("daily_trips_2025_q1")],
+    "anomaly-overview": [path("daily_trips"), path("anomalies"), path("clusters_local_z"), path("clusters_detected"),
+                         path("covid"), path("mta_weekly")],
+    "anomaly-zoom": [path("daily_trips"), path("anomalies_2022"), path("clusters_2022"),
+                     path("covid"), path("mta_weekly")],
+    "bayes-210": [path("bayes_210")],
+    "bayes-307": [path("bayes_307")],
+    "bayes-placebo": [path("bayes_placebo")],
+    "zone-map": ["data/zone_tiles.npz", "assets/taxi_zones.geojson"],
+}
+
+# Forecast artifacts behind the live figure. When the monthly ETL replaces any
+# of them, the figure is rebuilt once in the background while requests keep
+# being served the previous version.
+LIVE_INPUTS = {
+    "forecast-live": [
+        "data/forecast_output.parquet",
+        "data/forecast_fitted.parquet",
+        "data/forecast_input.parquet",
+    ],
+}
+
+# key -> (version, figure dict)
+_figures = {}
+_locks = {key: threading.Lock() for key in FIGURES}
+
+# Live figures with a background rebuild in flight, and versions whose rebuild failed
+_rebuilding = set()
+_failed_versions = {}
+_rebuild_lock = threading.Lock()
+
+# Seconds spent building or loading each figure, filled in as subtabs are requested
+build_seconds = {}
+
+# Called as hook(event, key, seconds, nbytes) on every lookup. Events: "hit"
+# (served from memory), "stale" (live figure served while rebuilding),
+# "snapshot" (loaded from disk) and "build". See metrics.py.
+FIGURE_HOOKS = []
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+def _notify(event, key, seconds=0.0, nbytes=0):
+    for hook in FIGURE_HOOKS:
+        hook(event, key, seconds, nbytes)
+
+
+def figure_version(key):
+    module_name, _ = FIGURES[key]
+    if key in FIGURE_INPUTS:
+        return figure_digest(module_name, FIGURE_INPUTS[key])
+    if key in LIVE_INPUTS:
+        # The inputs resolve into the current artifact generation, so each publish gets a new
+        # version; the module's source is added so a deploy never reuses an older build's snapshot
+        paths = list(artifacts.latest(LIVE_INPUTS[key]).values())
+        return artifact_generation(paths + [importlib.util.find_spec(module_name).origin])
+    return None
+
+
+def _build(module_name, attr):
+    module = sys.modules.get(module_name)
+    if module is None:
+        module = importlib.import_module(module_name)
+        obj = getattr(module, attr)
+    else:
+        obj = getattr(module, attr)
+        if not callable(obj):
+            # Re-executing the module picks up changed inputs after the first build
+            obj = getattr(importlib.reload(module), attr)
+    fig = obj() if callable(obj) else obj
+    return fig.to_json()
+
+
+def _load(key, version):
+    # Snapshots on disk are shared by all worker processes, so a figure rebuilt
+    # by one worker (including a new live-forecast generation) is reused by the rest
+    start = time.perf_counter()
+    fig = load_snapshot(key, version) if version else None
+    if fig is not None:
+        event, nbytes = "snapshot", os.path.getsize(snapshot_path(key, version))
+    else:
+        fig_json = _build(*FIGURES[key])
+        fig = json.loads(fig_json)
+        if version:
+            save_snapshot(key, version, fig_json)
+        event, nbytes = "build", len(fig_json)
+    build_seconds[key] = time.perf_counter() - start
+    _notify(event, key, build_seconds[key], nbytes)
+    source = "Loaded snapshot of" if event == "snapshot" else "Built"
+    log(f"[FIG] {source} {key} in {build_seconds[key]:.2f}s")
+    return fig
+
+
+def _rebuild_in_background(key, version):
+    with _rebuild_lock:
+        if key in _rebuilding or _failed_versions.get(key) == version:
+            return
+        _rebuilding.add(key)
+
+    def run():
+        try:
+            fig = _load(key, version)
+            with _locks[key]:
+                _figures[key] = (version, fig)
+        except Exception as e:
+            # Don't retry until the artifacts change again (e.g. a half-finished ETL run)
+            _failed_versions[key] = version
+            log(f"[WARN] Background rebuild of {key} failed: {e}")
+        finally:
+            with _rebuild_lock:
+                _rebuilding.discard(key)
+
+    threading.Thread(target=run, name=f"rebuild-{key}", daemon=True).start()
+
+
+def get_versioned_figure(key):
+    version = figure_version(key)
+
+    cached = _figures.get(key)
+    if cached is not None and cached[0] == version:
+        _notify("hit", key)
+        return cached
+
+    # Live figures keep serving the stale version until the rebuild lands
+    if cached is not None and key in LIVE_INPUTS:
+        _rebuild_in_background(key, version)
+        _notify("stale", key)
+        return cached
+
+    # One lock per figure so a slow model fit never blocks other subtabs
+    with _locks[key]:
+        cached = _figures.get(key)
+        if cached is None or cached[0] != version:
+            _figures[key] = (version, _load(key, version))
+    return _figures[key]
+
+
+def get_figure(key):
+    return get_versioned_figure(key)[1]
+
+
+def preload(keys=None):
+    for key in keys or FIGURES:
+        try:
+            get_figure(key)
+        except Exception as e:
+            log(f"[WARN] Could not build {key}: {e}")
@@ -4,18 +4,23 @@ import pandas as pd
 import plotly.graph_objects as go
 import numpy as np
 
+from visuals.cluster_stats import composite_z, interval_means
+from visuals.datasets import load
+from visuals.drilldown import click_targets
+
 
 # Load total trip counts
-daily_totals = pd.read_csv("data/daily_total_trips_patched.csv", parse_dates=["pickup_date"])
+daily_totals = load("daily_trips")
 
 # Load your datasets
-anomalies = pd.read_csv("data/anomalies_clustered_2022.csv", parse_dates=["pickup_datetime"])
-clusters = pd.read_csv("data/filtered_clusters_condensed_2022.csv", parse_dates=["start_date", "end_date"])
+anomalies = load("anomalies_2022", columns=["pickup_datetime", "trip_distance", "fare_amount"])
+clusters = load("clusters_2022")
 
 # Aggregate daily anomaly count
 anomalies['pickup_date'] = anomalies['pickup_datetime'].dt.date
 daily = anomalies.groupby('pickup_date').size().reset_index(name='n_anomalies')
-daily['pickup_date'] = pd.to_datetime(daily['pickup_date'])
+# merge_asof needs both keys at the same resolution; parsed dates vary by source under pandas 3
+daily['pickup_date'] = pd.to_datetime(daily['pickup_date']).astype('datetime64[ns]')
 daily['rolling_7'] = daily['n_anomalies'].rolling(window=7, center=True).mean()
 daily = daily.merge(daily_totals, on="pickup_date", how="left")
 
@@ -24,51 +29,28 @@ mean_rate = daily['anomaly_rate'].mean()
 std_rate = daily['anomaly_rate'].std()
 daily['anomaly_z'] = (daily['anomaly_rate'] - mean_rate) / std_rate
 
-cluster_scores = []
-
 # Filter to 2022
 anomalies = anomalies[(anomalies['pickup_datetime'] >= "2022-01-01") & (anomalies['pickup_datetime'] < "2023-01-01")].copy()
 daily_totals = daily_totals[(daily_totals['pickup_date'] >= "2022-01-01") & (daily_totals['pickup_date'] < "2023-01-01")].copy()
 
 
-for _, row in clusters.iterrows():
-    mask = (daily['pickup_date'] >= row['start_date']) & (daily['pickup_date'] <= row['end_date'])
-    avg_z = daily.loc[mask, 'anomaly_z'].mean()
-    cluster_scores.append(avg_z)
-
-clusters['avg_anomaly_z'] = cluster_scores
-
-# Compute composite Z scores (distance + fare) for each cluster
-def compute_composite_z(row, all_rides):
-    cluster_mask = (anomalies['pickup_datetime'] >= row['start_date']) & (anomalies['pickup_datetime'] <= row['end_date'])
-    cluster_rides = anomalies[cluster_mask]
+clusters['avg_anomaly_z'] = interval_means(
+    daily['pickup_date'], daily['anomaly_z'], clusters['start_date'], clusters['end_date']
+)[:, 0]
 
-    # Global stats
-    mean_dist = all_rides['trip_distance'].mean()
-    std_dist = all_rides['trip_distance'].std()
-    mean_fare = all_rides['fare_amount'].mean()
-    std_fare = all_rides['fare_amount'].std()
-
-    # Cluster stats
-    z_dist = ((cluster_rides['trip_distance'].mean() - mean_dist) / std_dist) if std_dist > 0 else 0
-    z_fare = ((cluster_rides['fare_amount'].mean() - mean_fare) / std_fare) if std_fare > 0 else 0
-
-    return (z_dist + z_fare) / 2
-
-# Apply to cluster DataFrame
-clusters['avg_composite_z'] = clusters.apply(lambda row: compute_composite_z(row, anomalies), axis=1)
+# Composite Z scores (distance + fare) for each cluster, in one vectorized pass
+clusters['avg_composite_z'] = composite_z(clusters, anomalies)
 
 
 # Load and process COVID data
 
-covid = pd.read_csv("data/covid19.csv", parse_dates=["date_of_interest"])
-covid = covid.rename(columns={"date_of_interest": "date", "HOSPITALIZED_COUNT": "hospitalizations"})
+covid = load("covid", columns=["date_of_interest", "HOSPITALIZED_COUNT"])
 
 # Load MTA ridership data and merge with daily trips
 
-mta = pd.read_csv("data/mta_weekly_subway.csv", parse_dates=["week_start"])
-mta = mta.rename(columns={"week_start": "date", "subway_rides": "weekly_subway_rides"})
+mta = load("mta_weekly")
 mta = mta.sort_values("date").reset_index(drop=True)
+mta["date"] = mta["date"].astype("datetime64[ns]")
 
 covid = covid[(covid['date'] >= "2022-01-01") & (covid['date'] < "2023-01-01")].copy()
 mta = mta[(mta['date'] >= "2022-01-01") & (mta['date'] < "2023-01-01")].copy()
@@ -99,7 +81,11 @@ fig2 = go.Figure()
 y_max = daily['n_anomalies'].max()
 
 for i, row in clusters.iterrows():
-    fillcolor = 'rgba(0, 200, 0, 0.2)' if row['avg_composite_z'] >= 0 else 'rgba(255, 0, 0, 0.2)'
+    # No local baseline (e.g. the first cluster in the data) leaves the score NaN: shade it neutral
+    if pd.isna(row['avg_composite_z']):
+        fillcolor = 'rgba(128, 128, 128, 0.15)'
+    else:
+        fillcolor = 'rgba(0, 200, 0, 0.2)' if row['avg_composite_z'] >= 0 else 'rgba(255, 0, 0, 0.2)'
 
     fig2.add_vrect(
         x0=row['start_date'],
@@ -133,6 +119,9 @@ monthly = mta.groupby('month')['weekly_subway_rides'].mean().reset_index()
 # Normalize for plotting in paper space
 max_rides = monthly['weekly_subway_rides'].max()
 
+# Transparent bars over the shading, so clicking a cluster opens its trips
+fig2.add_trace(click_targets(clusters['start_date'], clusters['end_date'], 500))
+
 fig2.add_trace(go.Scatter(
     x=daily['pickup_date'],
     y=daily['total_trips'],
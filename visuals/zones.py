@@ -0,0 +1,100 @@
+import json
+import os
+
+import numpy as np
+import plotly.graph_objects as go
+
+import zone_tiles
+
+# Served by Dash from assets/; plotly.js fetches it once and reuses it for every update
+GEOMETRY_URL = "/assets/" + os.path.basename(zone_tiles.GEOMETRY_PATH)
+
+ZONE_IDS = np.arange(1, zone_tiles.N_ZONES + 1)
+COLORSCALE = "Viridis"
+
+
+def default_period():
+    # Latest month; the index lists "all", the years, then months newest first
+    periods = zone_tiles.periods()
+    return periods[1 + len({p[:4] for p in periods if p != "all"})] if len(periods) > 1 else periods[0]
+
+
+def zone_names():
+    with open(zone_tiles.GEOMETRY_PATH) as f:
+        features = json.load(f)["features"]
+    return {f["id"]: f"{f['properties'].get('zone')} ({f['properties'].get('borough')})" for f in features}
+
+
+def has_geometry():
+    return os.path.exists(zone_tiles.GEOMETRY_PATH)
+
+
+def view_values(period, hours):
+    # Per-zone sums on the map, the zones × selected-hours slice on the heatmap
+    if has_geometry():
+        return zone_tiles.zone_values(period, hours)
+    return zone_tiles.tile(period)[:, hours[0]:hours[1] + 1]
+
+
+def view_patch(period, hours):
+    # Trace-0 properties that change with the period/hour selection; everything else stays in the browser
+    props = {"z": view_values(period, hours).tolist()}
+    if not has_geometry():
+        props["x"] = list(range(hours[0], hours[1] + 1))
+    return props
+
+
+def empty_zone_map():
+    fig = go.Figure()
+    fig.add_annotation(
+        text="No zone tiles yet. Run python zone_tiles.py --months YYYY-MM YYYY-MM to build them.",
+        showarrow=False, font=dict(size=14, color="#666")
+    )
+    fig.update_layout(
+        template="plotly_white",
+        height=560,
+        xaxis=dict(visible=False),
+        yaxis=dict(visible=False)
+    )
+    return fig
+
+
+def build_zone_map():
+    try:
+        period = default_period()
+    except OSError:
+        # Missing or unreadable data/zone_tiles.npz; the figure version changes once it is built
+        return empty_zone_map()
+    fig = go.Figure()
+
+    if has_geometry():
+        names = zone_names()
+        fig.add_trace(go.Choroplethmap(
+            geojson=GEOMETRY_URL,
+            locations=ZONE_IDS,
+            z=view_values(period, (0, 23)),
+            text=[names.get(int(z), f"Zone {z}") for z in ZONE_IDS],
+            colorscale=COLORSCALE,
+            marker=dict(line=dict(width=0.3, color="white"), opacity=0.85),
+            colorbar=dict(title="Trips"),
+            hovertemplate="%{text}<br>%{z:,} trips<extra></extra>"
+        ))
+        fig.update_layout(map=dict(style="carto-positron", center=dict(lat=40.72, lon=-73.95), zoom=9.3))
+    else:
+        # No zone outlines fetched yet (python zone_tiles.py --geometry): zones × hours instead
+        fig.add_trace(go.Heatmap(
+            x=list(range(24)),
+            y=ZONE_IDS,
+            z=view_values(period, (0, 23)),
+            colorscale=COLORSCALE,
+            colorbar=dict(title="Trips"),
+            hovertemplate="Zone %{y}, %{x}:00<br>%{z:,} trips<extra></extra>"
+        ))
+        fig.update_layout(xaxis=dict(title="Hour of day", dtick=2), yaxis=dict(title="Pickup zone (LocationID)"))
+
+    fig.update_layout(
+        template="plotly_white",
+        height=560,
+        margin=dict(l=20, r=20, t=20, b=20)
+    )
+    return fig
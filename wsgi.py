@@ -0,0 +1,18 @@
+import gc
+
+import profiling
+from app import app
+from visuals.registry import FIGURES, preload
+
+# Under gunicorn's preload_app this runs once in the master: every figure is
+# built (or loaded from its snapshot) before workers fork, so they share the
+# figures and DataFrames copy-on-write instead of each building their own.
+for key in FIGURES:
+    with profiling.stage(f"preload.{key}", "app"):
+        preload([key])
+
+# Move everything loaded so far out of the GC's reach; otherwise the collector
+# touches these objects in each worker and un-shares their memory pages
+gc.freeze()
+
+server = app.server
@@ -0,0 +1,189 @@
+import argparse
+import json
+import os
+import urllib.request
+import zipfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import catalog
+
+# ───────────── Zone × hour tiles for the Zones tab ───────────── #
+# Ingest adds each month's pickups per taxi zone and hour of day to
+# ZONE_HOURS_PARQUET (a few thousand rows a month). build_tiles() then
+# pre-sums them into one dense zones × 24 tile per period (every month, every
+# year, and "all") in TILES_PATH, with the period → tile index stored
+# alongside. Switching period in the dashboard is an index lookup and a sum
+# over the selected hours; no trip data is read.
+#
+# Zone outlines live in GEOMETRY_PATH, a static asset the browser fetches
+# once by URL; figures only carry per-zone values.
+#   python zone_tiles.py --months 2024-01 2025-03   # backfill from raw TLC files
+#   python zone_tiles.py --geometry                  # fetch the zone outlines
+ZONE_HOURS_PARQUET = "data/zone_hours.parquet"
+TILES_PATH = "data/zone_tiles.npz"
+GEOMETRY_PATH = "assets/taxi_zones.geojson"
+GEOMETRY_URL = "https://data.cityofnewyork.us/api/geospatial/d3c5-ddgc?method=export&format=GeoJSON"
+
+# TLC LocationIDs run 1–265 (264/265 are unknown / outside NYC)
+N_ZONES = 265
+
+_tiles = None
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+# ───────────── Building ───────────── #
+def summarize_month(parquet_path, month_str):
+    import duckdb  # ingest only; the app reads the tiles
+
+    con = duckdb.connect()
+    query = f"""
+        SELECT
+            PULocationID AS zone,
+            hour(tpep_pickup_datetime) AS hour,
+            COUNT(*) AS trips
+        FROM read_parquet('{parquet_path}')
+        WHERE tpep_pickup_datetime >= DATE '{month_str}-01'
+          AND tpep_pickup_datetime < DATE '{month_str}-01' + INTERVAL 1 MONTH
+          AND PULocationID BETWEEN 1 AND {N_ZONES}
+        GROUP BY 1, 2 ORDER BY 1, 2
+    """
+    df = con.execute(query).fetch_df()
+    con.close()
+    df.insert(0, "month", month_str)
+    return df.astype({"zone": "int16", "hour": "int8", "trips": "int32"})
+
+
+def add_month(parquet_path, month_str):
+    # Replaces any earlier rows for the month, then rebuilds the tiles
+    df = summarize_month(parquet_path, month_str)
+    if os.path.exists(ZONE_HOURS_PARQUET):
+        existing = pd.read_parquet(ZONE_HOURS_PARQUET)
+        df = pd.concat([existing[existing["month"] != month_str], df], ignore_index=True)
+    df = df.sort_values(["month", "zone", "hour"]).reset_index(drop=True)
+
+    tmp = ZONE_HOURS_PARQUET + ".tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, ZONE_HOURS_PARQUET)
+    catalog.record(ZONE_HOURS_PARQUET, sources=[parquet_path], producer="zone_tiles")
+    build_tiles(df)
+    return len(df)
+
+
+def build_tiles(df=None):
+    df = pd.read_parquet(ZONE_HOURS_PARQUET) if df is None else df
+    months = sorted(df["month"].unique(), reverse=True)
+    monthly = np.zeros((len(months), N_ZONES, 24), dtype=np.int32)
+    rows = df["month"].map({m: i for i, m in enumerate(months)}).to_numpy()
+    np.add.at(monthly, (rows, df["zone"].to_numpy() - 1, df["hour"].to_numpy()), df["trips"].to_numpy())
+
+    years = sorted({m[:4] for m in months}, reverse=True)
+    yearly = np.stack([monthly[[i for i, m in enumerate(months) if m.startswith(y)]].sum(axis=0) for y in years])
+    periods = ["all", *years, *months]
+    tiles = np.concatenate([monthly.sum(axis=0, keepdims=True), yearly, monthly])
+
+    # Tiles and their index in one file, replaced atomically
+    tmp = TILES_PATH + ".tmp.npz"
+    np.savez(tmp, periods=np.array(periods), tiles=tiles)
+    os.replace(tmp, TILES_PATH)
+    catalog.record(TILES_PATH, sources=[ZONE_HOURS_PARQUET], producer="zone_tiles")
+    log(f"[TILES] {len(periods)} periods × {N_ZONES} zones × 24 hours")
+
+
+# ───────────── Lookups ───────────── #
+def load_tiles():
+    # (index, tiles), re-read only when the file is replaced
+    global _tiles
+    st = os.stat(TILES_PATH)
+    stamp = (st.st_mtime_ns, st.st_size)
+    if _tiles is None or _tiles[0] != stamp:
+        try:
+            with np.load(TILES_PATH) as npz:
+                periods = [str(p) for p in npz["periods"]]
+                _tiles = (stamp, {p: i for i, p in enumerate(periods)}, npz["tiles"])
+        except (ValueError, KeyError, zipfile.BadZipFile) as e:
+            # Truncated or foreign file: reported like a missing one so callers handle both alike
+            raise OSError(f"Unreadable zone tiles {TILES_PATH}: {e}") from e
+    return _tiles[1], _tiles[2]
+
+
+def periods():
+    return list(load_tiles()[0])
+
+
+def tile(period):
+    # zones × 24 trip counts; row i is LocationID i + 1
+    index, tiles = load_tiles()
+    return tiles[index[period]]
+
+
+def zone_values(period, hours=(0, 23)):
+    # Trips per zone over an inclusive hour range
+    return tile(period)[:, hours[0]:hours[1] + 1].sum(axis=1)
+
+
+# ───────────── Geometry ───────────── #
+def _location_id(properties):
+    for key in ("LocationID", "locationid", "location_id"):
+        if key in properties:
+            return int(float(properties[key]))
+    raise KeyError("no LocationID property")
+
+
+def _round_coords(coords, digits=5):
+    if isinstance(coords[0], (int, float)):
+        return [round(c, digits) for c in coords]
+    return [_round_coords(c, digits) for c in coords]
+
+
+def fetch_geometry(url=GEOMETRY_URL, path=GEOMETRY_PATH):
+    # Keeps only the outline, id and name of each zone; ~5-digit coordinates are ~1 m
+    with urllib.request.urlopen(url) as resp:
+        source = json.load(resp)
+    features = []
+    for feature in source["features"]:
+        props = feature["properties"]
+        features.append({
+            "type": "Feature",
+            "id": _location_id(props),
+            "properties": {"zone": props.get("zone"), "borough": props.get("borough")},
+            "geometry": {"type": feature["geometry"]["type"],
+                         "coordinates": _round_coords(feature["geometry"]["coordinates"])},
+        })
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f, separators=(",", ":"))
+    os.replace(tmp, path)
+    log(f"[GEOMETRY] {len(features)} zones -> {path} ({os.path.getsize(path) / 1024:.0f} KiB)")
+
+
+def main():
+    from update_ingest import download_parquet
+    from anomaly_pipeline import month_range, raw_path
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--months", nargs=2, metavar=("START", "END"), help="Add months START..END (YYYY-MM)")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the tiles from the zone × hour table")
+    parser.add_argument("--geometry", action="store_true", help="Fetch the taxi zone outlines")
+    args = parser.parse_args()
+
+    if args.geometry:
+        fetch_geometry()
+    if args.months:
+        for month_str in month_range(*args.months):
+            downloaded = not os.path.exists(raw_path(month_str))
+            path = download_parquet(month_str)
+            log(f"[ZONES] {month_str}: {add_month(path, month_str)} zone-hour rows in total")
+            if downloaded:
+                os.remove(path)
+    elif args.rebuild:
+        build_tiles()
+
+
+if __name__ == "__main__":
+    main()